@@ -0,0 +1,112 @@
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.resilience import set_deadline
+from app.core.security import InvalidTokenError, token_verifier
+from app.db.database import engine, get_db, read_session, recent_writes, replica_router
+from app.db import models
+from app.services.auth_context import AuthContext, UserNotAllowed, auth_context_cache, load_context
+from app.services.catalogue_cache import CATALOGUE_WRITES
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _verify_bearer(credentials: Optional[HTTPAuthorizationCredentials]) -> dict:
+    """Claims of a valid bearer token; 401 otherwise"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return token_verifier.verify(credentials.credentials)
+    except InvalidTokenError as exc:
+        raise HTTPException(
+            status_code=401,
+            detail=f"Invalid token: {exc}",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+) -> AuthContext:
+    """Authenticate the bearer token and return the caller's cached context"""
+    claims = _verify_bearer(credentials)
+
+    context = auth_context_cache.get(claims["sub"])
+    if context is None:
+        try:
+            context = load_context(db, claims)
+        except UserNotAllowed:
+            raise HTTPException(status_code=403, detail="User is not registered or inactive")
+        auth_context_cache.put(context)
+    return context
+
+
+async def get_current_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+) -> models.AdminUser:
+    """Authenticate the bearer token and require an active admin with a role in ADMIN_ROLES"""
+    claims = _verify_bearer(credentials)
+    admin = db.query(models.AdminUser).filter(models.AdminUser.cognito_id == claims["sub"]).first()
+    # Admin routes may stream large uploads before they next need the database
+    db.close()
+    if admin is None or not admin.is_active or admin.role not in settings.ADMIN_ROLES:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    return admin
+
+
+async def request_deadline(request: Request) -> None:
+    """Bound the request to X-Request-Timeout seconds, at most REQUEST_TIMEOUT_SECONDS
+
+    Declare it first in a route's dependencies so authentication is bounded too.
+    """
+    budget = settings.REQUEST_TIMEOUT_SECONDS
+    header = request.headers.get("x-request-timeout")
+    if header:
+        try:
+            budget = min(budget, max(float(header), 0.0))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+    set_deadline(budget)
+
+
+def check_content_length(request: Request, limit: int, detail: str) -> None:
+    """Reject a body declared larger than limit bytes before reading any of it
+
+    The streamed body is still counted, since the header is optional.
+    """
+    header = request.headers.get("content-length")
+    if not header:
+        return
+    try:
+        size = int(header)
+    except ValueError:
+        size = -1
+    if size < 0:
+        raise HTTPException(status_code=400, detail="Content-Length must be a whole number of bytes")
+    if size > limit:
+        raise HTTPException(status_code=413, detail=detail)
+
+
+def catalogue_read_bind():
+    """Engine for catalogue reads: the primary right after a catalogue edit, else a replica"""
+    return engine if recent_writes.recent(CATALOGUE_WRITES) else replica_router.engine_for_read()
+
+
+def user_read_bind(user_id):
+    """Engine for a user's own data: the primary right after they wrote, else a replica"""
+    return engine if recent_writes.recent(user_id) else replica_router.engine_for_read()
+
+
+def get_catalogue_read_db():
+    """Read-only session for catalogue endpoints, on the primary right after a catalogue edit"""
+    yield from read_session(catalogue_read_bind())
@@ -1,16 +1,37 @@
-        from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 from decimal import Decimal
 from uuid import UUID
+import asyncio
+import os
+import uuid
 
-from app.db.database import get_db
+from app.api.deps import check_content_length, get_current_admin
+from app.core.compression import compression_stats
+from app.core.config import settings
+from app.core.profiler import StackSampler, process_profile_lock, profile_store
+from app.core.resilience import dependencies
+from app.db.database import SessionLocal, get_db, replica_router
 from app.db import models
+from app.services.document_pipeline import document_pipeline
+from app.services.jobs import PRIORITY_BULK, enqueue_recommendation_refresh
+from app.services.matching_engine import rule_statistics
+from app.services.catalogue_import import ImportFormatError, detect_format, import_catalogue
+from app.services.catalogue_validation import InvalidRuleError, validate_rule
+from app.services.reach_estimator import GROUPINGS, SnapshotNotReady, reach_estimator
+from app.services.scheme_lifecycle import scheme_lifecycle
+from app.services.storage import create_storage
+from app.services.transcription import transcription_service
+from app.services.tts_cache import tts_cache
 
 router = APIRouter()
 
+document_storage = create_storage(settings.S3_BUCKET_DOCUMENTS)
+
 class SchemeCreate(BaseModel):
     scheme_code: str
     name: str
@@ -31,6 +52,21 @@ class SchemeCreate(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
 
+class RuleDraft(BaseModel):
+    rule_type: str
+    operator: str
+    value_min: Optional[Decimal] = None
+    value_max: Optional[Decimal] = None
+    value_list: Optional[List[str]] = None
+    is_mandatory: bool = True
+
+class ReachRequest(BaseModel):
+    rules: Optional[List[RuleDraft]] = None
+    scheme_id: Optional[UUID] = None
+    exact: bool = False
+    group_by: Optional[str] = None
+    top: int = 50
+
 class AnalyticsResponse(BaseModel):
     total_users: int
     active_users: int
@@ -75,22 +111,161 @@ async def delete_scheme(scheme_id: UUID, db: Session = Depends(get_db)):
     # TODO: Soft delete scheme (set is_active = False)
     return {"message": "Scheme deleted successfully"}
 
-@router.post("/schemes/{scheme_id}/documents")
+@router.post("/schemes/import", dependencies=[Depends(get_current_admin)])
+async def import_schemes(
+    request: Request,
+    file_name: str = Query(..., max_length=255),
+    kind: str = Query("schemes", pattern="^(schemes|rules)$"),
+    dry_run: bool = False,
+    atomic: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import schemes or eligibility rules from a CSV, JSON or JSONL file
+    The request body is the raw file. Scheme records are upserted by scheme_code;
+    rules replace the current rules of the schemes they name. Valid rows load in
+    one transaction and every rejected row is listed in the report.
+    """
+    check_content_length(request, settings.IMPORT_MAX_UPLOAD_BYTES, "Import file too large")
+    try:
+        detect_format(file_name)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    body = bytearray()
+    async for chunk in request.stream():
+        if len(body) + len(chunk) > settings.IMPORT_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Import file too large")
+        body.extend(chunk)
+
+    files = {kind: (bytes(body), file_name)}
+    try:
+        return await asyncio.to_thread(import_catalogue, db, dry_run=dry_run, atomic=atomic, **files)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+@router.post("/schemes/{scheme_id}/documents", status_code=202, dependencies=[Depends(get_current_admin)])
 async def upload_document(
     scheme_id: UUID,
-    file: UploadFile = File(...),
+    request: Request,
+    file_name: str = Query(..., max_length=255),
     db: Session = Depends(get_db)
 ):
     """
     Upload scheme document for processing
-    TODO: Add admin authentication
-    TODO: Integrate S3 upload
+    The request body is the raw file; text is extracted in the background.
     """
-    # TODO: Verify admin role
-    # TODO: Upload to S3
-    # TODO: Trigger document processing
-    # TODO: Save document metadata
-    raise HTTPException(status_code=501, detail="Not implemented")
+    check_content_length(request, settings.DOCUMENT_MAX_UPLOAD_BYTES, "Document too large")
+    if not db.query(models.Scheme.id).filter(models.Scheme.id == scheme_id).first():
+        raise HTTPException(status_code=404, detail="Scheme not found")
+    # Return the connection to the pool while the upload streams in
+    db.close()
+
+    document_id = uuid.uuid4()
+    file_type = request.headers.get("content-type", "application/octet-stream").split(";")[0].strip()
+    extension = os.path.splitext(file_name)[1][:10]
+    key = f"schemes/{scheme_id}/{document_id}{extension}"
+    writer = await asyncio.to_thread(document_storage.writer, key, file_type)
+    try:
+        async for chunk in request.stream():
+            if writer.size + len(chunk) > settings.DOCUMENT_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Document too large")
+            if chunk:
+                await asyncio.to_thread(writer.write, chunk)
+        await asyncio.to_thread(writer.commit)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+
+    document = models.SchemeDocument(
+        id=document_id,
+        scheme_id=scheme_id,
+        s3_key=key,
+        file_name=file_name,
+        file_type=file_type,
+        file_size=writer.size,
+        processing_status="pending",
+    )
+    db.add(document)
+    document_pipeline.claim(db, document_id)
+    db.commit()
+    document_pipeline.submit(document_id, scheme_id, key, file_type)
+    return {"document_id": str(document_id), "status": "processing", "file_size": writer.size}
+
+@router.get("/schemes/{scheme_id}/documents", dependencies=[Depends(get_current_admin)])
+async def list_documents(scheme_id: UUID, db: Session = Depends(get_db)):
+    """
+    Processing status of a scheme's documents
+    """
+    table = models.SchemeDocument
+    rows = db.query(
+        table.id, table.file_name, table.file_type, table.file_size,
+        table.processing_status, table.created_at, table.processed_at,
+    ).filter(table.scheme_id == scheme_id).order_by(table.created_at).all()
+    return {"documents": [dict(row._mapping) for row in rows], "pipeline": document_pipeline.stats()}
+
+def _queue_rescore() -> int:
+    db = SessionLocal()
+    try:
+        queued = 0
+        for (user_id,) in db.query(models.UserProfile.user_id).yield_per(1000):
+            queued += enqueue_recommendation_refresh(user_id, priority=PRIORITY_BULK)
+        return queued
+    finally:
+        db.close()
+
+@router.post("/recommendations/rescore", dependencies=[Depends(get_current_admin)])
+async def rescore_recommendations():
+    """
+    Queue recommendation regeneration for every user with a profile
+    """
+    # Streams every profile id, so it runs off the event loop
+    return {"queued": await asyncio.to_thread(_queue_rescore)}
+
+@router.get("/rules/stats", dependencies=[Depends(get_current_admin)])
+async def get_rule_stats():
+    """
+    Sampled pass/fail counters per eligibility rule
+    Rules flagged never_rejects filter nobody out and may be redundant.
+    """
+    return {"rules": rule_statistics.snapshot()}
+
+@router.post("/estimate-reach", dependencies=[Depends(get_current_admin)])
+async def estimate_reach(request: ReachRequest, db: Session = Depends(get_db)):
+    """
+    Estimate how many citizens a set of eligibility rules would reach
+    Pass draft rules, or a scheme_id to use that scheme's current rules.
+    Sampled by default; exact=true scans every profile in the snapshot.
+    """
+    if (request.rules is None) == (request.scheme_id is None):
+        raise HTTPException(status_code=422, detail="Provide either rules or scheme_id")
+    if request.group_by is not None and request.group_by not in GROUPINGS:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(GROUPINGS)}")
+
+    if request.scheme_id is not None:
+        rules = db.query(models.EligibilityRule).filter(models.EligibilityRule.scheme_id == request.scheme_id).all()
+        if not rules and db.get(models.Scheme, request.scheme_id) is None:
+            raise HTTPException(status_code=404, detail="Scheme not found")
+    else:
+        rules = request.rules
+        try:
+            for rule in rules:
+                validate_rule(rule)
+        except InvalidRuleError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+    db.close()
+
+    try:
+        # numpy releases the GIL, so scans run off the event loop in parallel
+        return await asyncio.to_thread(
+            reach_estimator.estimate, rules, request.exact, request.group_by, max(1, min(request.top, 1000))
+        )
+    except SnapshotNotReady:
+        raise HTTPException(
+            status_code=503,
+            detail="Profile snapshot is still being built",
+            headers={"Retry-After": "60"},
+        )
 
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_analytics(
@@ -120,3 +295,88 @@ async def list_users(
     # TODO: Verify admin role
     # TODO: Query users with pagination
     raise HTTPException(status_code=501, detail="Not implemented")
+
+@router.get("/metrics/compression", dependencies=[Depends(get_current_admin)])
+async def get_compression_metrics():
+    """
+    Bytes saved and CPU spent on response compression, per route
+    """
+    return {"routes": compression_stats.snapshot()}
+
+@router.get("/metrics/tts", dependencies=[Depends(get_current_admin)])
+async def get_tts_metrics():
+    """
+    Text-to-speech cache hits, misses and coalesced concurrent requests
+    """
+    return tts_cache.stats()
+
+@router.get("/metrics/transcription", dependencies=[Depends(get_current_admin)])
+async def get_transcription_metrics():
+    """
+    Transcription jobs by status
+    """
+    return await asyncio.to_thread(transcription_service.stats)
+
+@router.get("/metrics/replicas", dependencies=[Depends(get_current_admin)])
+async def get_replica_metrics():
+    """
+    Read replica lag and how reads were routed
+    """
+    return replica_router.stats()
+
+@router.get("/metrics/reach", dependencies=[Depends(get_current_admin)])
+async def get_reach_metrics():
+    """
+    Profile snapshot size, age and reach queries served
+    """
+    return reach_estimator.stats()
+
+@router.get("/metrics/resilience", dependencies=[Depends(get_current_admin)])
+async def get_resilience_metrics():
+    """
+    Circuit breaker state, timeouts and stale responses per dependency
+    """
+    return {name: dependency.stats() for name, dependency in dependencies.items()}
+
+@router.get("/metrics/lifecycle", dependencies=[Depends(get_current_admin)])
+async def get_lifecycle_metrics():
+    """
+    Upcoming scheme activations and expirations, and transitions applied
+    """
+    return scheme_lifecycle.stats()
+
+@router.get("/profiling/requests", dependencies=[Depends(get_current_admin)])
+async def list_request_profiles():
+    """
+    List recently profiled requests
+    """
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiling/requests/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin)])
+async def get_request_profile(profile_id: str):
+    """
+    Collapsed stacks for one profiled request, ready for flamegraph tools
+    """
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile["stacks"]
+
+@router.post("/profiling/sample", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin)])
+async def sample_process(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(10, ge=1)
+):
+    """
+    Sample every thread in this process for a bounded time and return collapsed stacks
+    """
+    if not process_profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        sampler = StackSampler(interval=interval_ms / 1000)
+        sampler.start()
+        await asyncio.sleep(min(seconds, settings.PROFILING_MAX_SECONDS))
+        sampler.stop()
+    finally:
+        process_profile_lock.release()
+    return sampler.collapsed()
@@ -4,8 +4,11 @@ from pydantic import BaseModel
 from typing import Optional
 from decimal import Decimal
 
-from app.db.database import get_db
+from app.api.deps import get_current_user
+from app.db.database import get_db, recent_writes
 from app.db import models
+from app.services.auth_context import PROFILE_FIELDS, AuthContext, auth_context_cache
+from app.services.jobs import enqueue_recommendation_refresh
 
 router = APIRouter()
 
@@ -34,44 +37,67 @@ class ProfileResponse(ProfileCreate):
     class Config:
         from_attributes = True
 
+def _response(profile: dict) -> ProfileResponse:
+    return ProfileResponse(**{**profile, "id": str(profile["id"]), "user_id": str(profile["user_id"])})
+
+def _save_profile(db: Session, user: AuthContext, profile: ProfileCreate, create: bool) -> ProfileResponse:
+    existing = db.query(models.UserProfile).filter(models.UserProfile.user_id == user.user_id).first()
+    if existing is None:
+        if not create:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        existing = models.UserProfile(user_id=user.user_id)
+        db.add(existing)
+    for field, value in profile.model_dump().items():
+        setattr(existing, field, value)
+    db.commit()
+    auth_context_cache.invalidate(user.cognito_id)
+    recent_writes.mark(user.user_id)
+    # Coalesced, so a burst of edits regenerates recommendations once
+    enqueue_recommendation_refresh(user.user_id)
+    return _response({field: getattr(existing, field) for field in PROFILE_FIELDS})
+
 @router.get("/", response_model=ProfileResponse)
-async def get_profile(db: Session = Depends(get_db)):
+async def get_profile(user: AuthContext = Depends(get_current_user)):
     """
     Get current user's profile
-    TODO: Add authentication dependency
     """
-    # TODO: Get current user from JWT token
-    # TODO: Query user profile
-    raise HTTPException(status_code=404, detail="Profile not found")
+    if user.profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _response(user.profile)
 
 @router.post("/", response_model=ProfileResponse)
-async def create_profile(profile: ProfileCreate, db: Session = Depends(get_db)):
+async def create_profile(
+    profile: ProfileCreate,
+    user: AuthContext = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Create or update user profile
-    TODO: Add authentication dependency
     """
-    # TODO: Get current user from JWT token
-    # TODO: Create or update profile
-    # TODO: Trigger recommendation generation
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return _save_profile(db, user, profile, create=True)
 
 @router.put("/", response_model=ProfileResponse)
-async def update_profile(profile: ProfileCreate, db: Session = Depends(get_db)):
+async def update_profile(
+    profile: ProfileCreate,
+    user: AuthContext = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Update user profile
-    TODO: Add authentication dependency
     """
-    # TODO: Get current user from JWT token
-    # TODO: Update profile
-    # TODO: Regenerate recommendations
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return _save_profile(db, user, profile, create=False)
 
 @router.delete("/")
-async def delete_profile(db: Session = Depends(get_db)):
+async def delete_profile(
+    user: AuthContext = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
-    Delete user profile
-    TODO: Add authentication dependency
+    Delete user profile and the recommendations derived from it
     """
-    # TODO: Get current user from JWT token
-    # TODO: Delete profile and user data
+    db.query(models.Recommendation).filter(models.Recommendation.user_id == user.user_id).delete()
+    db.query(models.UserProfile).filter(models.UserProfile.user_id == user.user_id).delete()
+    db.commit()
+    auth_context_cache.invalidate(user.cognito_id)
+    recent_writes.mark(user.user_id)
     return {"message": "Profile deleted successfully"}
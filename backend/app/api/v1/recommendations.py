@@ -1,15 +1,31 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import func
 from pydantic import BaseModel
 from typing import List, Optional
 from uuid import UUID
 
-from app.db.database import get_db
+from app.api.deps import get_current_user, request_deadline, user_read_bind
+from app.core.config import settings
+from app.core.resilience import Unavailable, create_cache, create_dependency, stale_headers
+from app.core.serialization import ORJSONResponse
+from app.db.database import SessionLocal, get_db, read_scope, recent_writes
 from app.db import models
+from app.schemas.scheme import SchemeResponse
+from app.services.auth_context import AuthContext
+from app.services.jobs import PRIORITY_INTERACTIVE, enqueue_recommendation_refresh
 from app.services.matching_engine import RecommendationEngine
+from app.services.interaction_ingest import interaction_ingestor
 
 router = APIRouter()
 
+# Last good recommendation list per (user, language), served during outages;
+# an empty list never replaces one that had schemes in it
+recommendation_cache = create_cache()
+recommendation_reads = create_dependency("recommendation-reads", recommendation_cache, cache_if=bool)
+recommendation_engine = create_dependency("recommendation-engine", recommendation_cache, cache_if=bool)
+
 class RecommendationResponse(BaseModel):
     id: str
     scheme: dict
@@ -26,57 +42,185 @@ class FeedbackRequest(BaseModel):
     comment: Optional[str] = None
     applied: bool = False
 
-@router.get("/", response_model=List[RecommendationResponse])
-async def get_recommendations(db: Session = Depends(get_db)):
+def _response(recommendation: models.Recommendation, language: str) -> RecommendationResponse:
+    explanation = getattr(recommendation, f"explanation_{language}", None) or recommendation.explanation
+    return RecommendationResponse(
+        id=str(recommendation.id),
+        scheme={field: getattr(recommendation.scheme, field) for field in SchemeResponse.model_fields},
+        match_score=float(recommendation.match_score),
+        explanation=explanation or "",
+        document_checklist=recommendation.document_checklist,
+        viewed_at=recommendation.viewed_at.isoformat() if recommendation.viewed_at else None,
+    )
+
+SCHEME_COLUMNS = [getattr(models.Scheme, field).label(f"scheme_{field}") for field in SchemeResponse.model_fields]
+
+def _stored(db: Session, user_id, language: str) -> List[dict]:
+    """The user's list as response dicts, built from column rows without ORM or validation"""
+    recommendation = models.Recommendation
+    localized = getattr(recommendation, f"explanation_{language}", recommendation.explanation)
+    rows = (
+        db.query(
+            recommendation.id, recommendation.match_score, recommendation.document_checklist,
+            recommendation.viewed_at, func.coalesce(func.nullif(localized, ""), recommendation.explanation, "").label("explanation"),
+            *SCHEME_COLUMNS,
+        )
+        .join(models.Scheme, models.Scheme.id == recommendation.scheme_id)
+        .filter(recommendation.user_id == user_id)
+        .order_by(recommendation.match_score.desc())
+        .all()
+    )
+    return [
+        {
+            "id": str(row.id),
+            "scheme": {field: row._mapping[f"scheme_{field}"] for field in SchemeResponse.model_fields},
+            "match_score": float(row.match_score),
+            "explanation": row.explanation,
+            "document_checklist": row.document_checklist,
+            "viewed_at": row.viewed_at.isoformat() if row.viewed_at else None,
+        }
+        for row in rows
+    ]
+
+def _generated_for_profile(db: Session, user_id) -> bool:
+    """Whether recommendations were generated since the profile last changed"""
+    run = models.RecommendationRun
+    return db.query(run.user_id).join(
+        models.UserProfile, models.UserProfile.user_id == run.user_id
+    ).filter(
+        run.user_id == user_id,
+        run.generated_at >= models.UserProfile.updated_at,
+    ).first() is not None
+
+def _read_stored(bind, user_id, language: str) -> Optional[List[dict]]:
+    """The stored list, or None when it is empty and due to be generated"""
+    with read_scope(bind) as db:
+        recommendations = _stored(db, user_id, language)
+        if recommendations or _generated_for_profile(db, user_id):
+            return recommendations
+        return None
+
+def _generate(user_id, language: str) -> List[dict]:
+    db = SessionLocal()
+    try:
+        RecommendationEngine(db).refresh_recommendations(user_id)
+        recent_writes.mark(user_id)
+        return _stored(db, user_id, language)
+    finally:
+        db.close()
+
+@router.get("/", response_model=List[RecommendationResponse], dependencies=[Depends(request_deadline)])
+async def get_recommendations(user: AuthContext = Depends(get_current_user)):
     """
     Get personalized scheme recommendations for current user
-    TODO: Add authentication dependency
+    Bounded by X-Request-Timeout; while the database or engine is failing the
+    last good list is served with a Warning header.
     """
-    # TODO: Get current user from JWT token
-    # TODO: Check if recommendations exist
-    # TODO: If not, generate using RecommendationEngine
-    # TODO: Return recommendations
-    
-    # Example implementation:
-    # engine = RecommendationEngine(db)
-    # recommendations = engine.generate_recommendations(user_id)
-    
-    raise HTTPException(status_code=501, detail="Not implemented")
+    if user.profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    language = user.profile["preferred_language"]
+    key = (user.user_id, language)
+    try:
+        recommendations = await recommendation_reads.call(
+            key, _read_stored, user_read_bind(user.user_id), user.user_id, language
+        )
+        if recommendations is None:
+            # First visit after creating or changing a profile: generate now
+            # rather than show nothing; a profile matching no scheme stays empty
+            recommendations = await recommendation_engine.call(key, _generate, user.user_id, language)
+    except Unavailable:
+        # An abandoned call keeps running and refreshes the cache for the next visit
+        stale = recommendation_cache.get(key)
+        if stale is None or not stale[0]:
+            raise HTTPException(
+                status_code=503,
+                detail="Recommendations are temporarily unavailable",
+                headers={"Retry-After": str(int(settings.REQUEST_TIMEOUT_SECONDS) + 1)},
+            )
+        return ORJSONResponse(stale[0], headers=stale_headers(stale[1]))
+    # Built from trusted rows, so response_model validation is skipped
+    return ORJSONResponse(recommendations)
 
 @router.post("/refresh")
-async def refresh_recommendations(db: Session = Depends(get_db)):
+async def refresh_recommendations(user: AuthContext = Depends(get_current_user)):
     """
     Regenerate recommendations for current user
-    TODO: Add authentication dependency
     """
-    # TODO: Get current user from JWT token
-    # TODO: Delete existing recommendations
-    # TODO: Generate new recommendations
-    # TODO: Return count
-    raise HTTPException(status_code=501, detail="Not implemented")
+    # Queued ahead of bulk work so the user sees fresh results quickly
+    enqueue_recommendation_refresh(user.user_id, priority=PRIORITY_INTERACTIVE)
+    recent_writes.mark(user.user_id)
+    return {"message": "Recommendations refresh queued"}
 
 @router.get("/{recommendation_id}", response_model=RecommendationResponse)
-async def get_recommendation(recommendation_id: UUID, db: Session = Depends(get_db)):
+async def get_recommendation(
+    recommendation_id: UUID,
+    user: AuthContext = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Get specific recommendation details
-    TODO: Add authentication dependency
     """
-    # TODO: Get current user from JWT token
-    # TODO: Query recommendation
-    # TODO: Mark as viewed
-    raise HTTPException(status_code=404, detail="Recommendation not found")
+    recommendation = (
+        db.query(models.Recommendation)
+        .options(joinedload(models.Recommendation.scheme))
+        .filter(
+            models.Recommendation.id == recommendation_id,
+            models.Recommendation.user_id == user.user_id,
+        )
+        .first()
+    )
+    if recommendation is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+    if recommendation.viewed_at is None:
+        recommendation.viewed_at = func.now()
+        db.commit()
+        db.refresh(recommendation)
+    interaction_ingestor.record_nowait(
+        "view",
+        user_id=user.user_id,
+        scheme_id=recommendation.scheme_id,
+        metadata={"recommendation_id": str(recommendation.id)},
+    )
+    language = user.profile["preferred_language"] if user.profile else "en"
+    return _response(recommendation, language)
 
 @router.post("/{recommendation_id}/feedback")
 async def submit_feedback(
     recommendation_id: UUID,
     feedback: FeedbackRequest,
+    user: AuthContext = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Submit feedback for a recommendation
-    TODO: Add authentication dependency
+    Feedback saying the user applied marks the recommendation as applied.
     """
-    # TODO: Get current user from JWT token
-    # TODO: Save feedback
-    # TODO: Update recommendation status
+    recommendation = models.Recommendation
+    owned = (recommendation.id == recommendation_id) & (recommendation.user_id == user.user_id)
+    if feedback.applied:
+        # Keep the first application time if feedback is sent again
+        row = db.execute(
+            update(recommendation)
+            .where(owned)
+            .values(applied_at=func.coalesce(recommendation.applied_at, func.now()))
+            .returning(recommendation.scheme_id)
+        ).first()
+        db.commit()
+    else:
+        row = db.query(recommendation.scheme_id).filter(owned).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+
+    # Feedback is buffered and written in batches off the request path
+    interaction_ingestor.record_nowait(
+        "feedback",
+        user_id=user.user_id,
+        scheme_id=row.scheme_id,
+        metadata={
+            "recommendation_id": str(recommendation_id),
+            "rating": feedback.rating,
+            "comment": feedback.comment,
+            "applied": feedback.applied,
+        },
+    )
     return {"message": "Feedback submitted successfully"}
@@ -1,77 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from app.db.database import get_db
+from app.api.deps import catalogue_read_bind, get_catalogue_read_db, request_deadline
+from app.core.config import settings
+from app.core.resilience import Unavailable, create_cache, create_dependency, stale_headers
+from app.core.serialization import ORJSONResponse, dumps, rows_to_dicts
+from app.db.database import read_scope
 from app.db import models
 from app.schemas.scheme import SchemeResponse, SchemeListResponse
+from app.services.catalogue_cache import catalogue_cache
+from app.services.catalogue_sync import catalogue_snapshots, changes_since
+from app.services.storage import LocalObjectStorage
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Last good page per search, served while the database is failing
+search_cache = create_cache()
+scheme_search = create_dependency("scheme-search", search_cache)
+
+# Select only the columns SchemeResponse exposes so rows can be serialized
+# directly, skipping ORM hydration and Pydantic validation of trusted data
+SCHEME_COLUMNS = [getattr(models.Scheme, field) for field in SchemeResponse.model_fields]
+
+def _scheme_page(query, skip: int, limit: int) -> dict:
+    return {
+        "total": query.count(),
+        "skip": skip,
+        "limit": limit,
+        "schemes": rows_to_dicts(query.offset(skip).limit(limit).all())
+    }
+
 @router.get("/", response_model=SchemeListResponse)
 async def list_schemes(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     state: Optional[str] = None,
     category: Optional[str] = None,
     is_active: bool = True,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_catalogue_read_db)
 ):
     """List all schemes with optional filters"""
-    query = db.query(models.Scheme).filter(models.Scheme.is_active == is_active)
-    
-    if state:
-        query = query.filter(models.Scheme.state == state)
-    if category:
-        query = query.filter(models.Scheme.category == category)
+    def render() -> bytes:
+        query = db.query(*SCHEME_COLUMNS).filter(models.Scheme.is_active == is_active)
+        
+        if state:
+            query = query.filter(models.Scheme.state == state)
+        if category:
+            query = query.filter(models.Scheme.category == category)
+        
+        return dumps(_scheme_page(query, skip, limit))
     
-    total = query.count()
-    schemes = query.offset(skip).limit(limit).all()
-    
-    return {
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "schemes": schemes
-    }
+    key = catalogue_cache.key(
+        "schemes:list", skip=skip, limit=limit, state=state, category=category, is_active=is_active
+    )
+    return catalogue_cache.serve(request, key, render, db)
 
 @router.get("/{scheme_id}", response_model=SchemeResponse)
 async def get_scheme(
+    request: Request,
     scheme_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_catalogue_read_db)
 ):
     """Get scheme details by ID"""
-    scheme = db.query(models.Scheme).filter(models.Scheme.id == scheme_id).first()
-    if not scheme:
-        raise HTTPException(status_code=404, detail="Scheme not found")
-    return scheme
+    def render() -> bytes:
+        scheme = db.query(*SCHEME_COLUMNS).filter(models.Scheme.id == scheme_id).first()
+        if not scheme:
+            raise HTTPException(status_code=404, detail="Scheme not found")
+        return dumps(scheme._asdict())
+    
+    return catalogue_cache.serve(request, catalogue_cache.key("schemes:get", scheme_id=scheme_id), render, db)
+
+def _search(bind, q: str, skip: int, limit: int) -> dict:
+    with read_scope(bind) as db:
+        query = db.query(*SCHEME_COLUMNS).filter(
+            models.Scheme.is_active == True,
+            (models.Scheme.name.ilike(f"%{q}%") | models.Scheme.description.ilike(f"%{q}%"))
+        )
+        return _scheme_page(query, skip, limit)
+
+def _search_snapshot(q: str, skip: int, limit: int) -> Optional[Tuple[dict, float]]:
+    """Basic substring search over the catalogue snapshot file, without the database
 
-@router.get("/search/", response_model=SchemeListResponse)
+    Returns the page and the snapshot's age in seconds.
+    """
+    manifest = catalogue_snapshots.latest()
+    schemes = catalogue_snapshots.schemes()
+    if manifest is None or schemes is None:
+        return None
+    age = (datetime.utcnow() - datetime.fromisoformat(manifest["created_at"])).total_seconds()
+    needle = q.casefold()
+    matches = [
+        scheme for scheme in schemes
+        if needle in scheme["name"].casefold() or needle in (scheme["description"] or "").casefold()
+    ]
+    return {
+        "total": len(matches),
+        "skip": skip,
+        "limit": limit,
+        "schemes": [{field: scheme.get(field) for field in SchemeResponse.model_fields} for scheme in matches[skip:skip + limit]],
+    }, age
+
+@router.get("/search/", response_model=SchemeListResponse, dependencies=[Depends(request_deadline)])
 async def search_schemes(
     q: str = Query(..., min_length=2),
     skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100)
 ):
-    """Search schemes by name or description"""
-    query = db.query(models.Scheme).filter(
-        models.Scheme.is_active == True,
-        (models.Scheme.name.ilike(f"%{q}%") | models.Scheme.description.ilike(f"%{q}%"))
-    )
-    
-    total = query.count()
-    schemes = query.offset(skip).limit(limit).all()
+    """
+    Search schemes by name or description
+    Bounded by X-Request-Timeout; while the database is failing the last good
+    page for the query, or a basic match over the catalogue snapshot, is served.
+    """
+    key = (q, skip, limit)
+    try:
+        page = await scheme_search.call(key, _search, catalogue_read_bind(), q, skip, limit)
+    except Unavailable:
+        stale = search_cache.get(key)
+        if stale is not None:
+            return ORJSONResponse(stale[0], headers=stale_headers(stale[1]))
+        try:
+            fallback = await asyncio.wait_for(
+                asyncio.to_thread(_search_snapshot, q, skip, limit), settings.REQUEST_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            fallback = None
+        except Exception as exc:
+            # Storage errors, or a snapshot file replaced and deleted meanwhile
+            logger.warning(f"Snapshot search fallback failed: {exc}")
+            fallback = None
+        if fallback is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Search is temporarily unavailable",
+                headers={"Retry-After": str(int(settings.REQUEST_TIMEOUT_SECONDS) + 1)},
+            )
+        page, age = fallback
+        return ORJSONResponse(page, headers=stale_headers(age))
     
-    return {
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "schemes": schemes
-    }
+    return ORJSONResponse(page)
 
 @router.get("/categories/")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: Session = Depends(get_catalogue_read_db)):
     """Get all scheme categories"""
-    categories = db.query(models.Scheme.category).distinct().all()
-    return {"categories": [cat[0] for cat in categories if cat[0]]}
+    def render() -> bytes:
+        categories = db.query(models.Scheme.category).distinct().all()
+        return dumps({"categories": [cat[0] for cat in categories if cat[0]]})
+    
+    return catalogue_cache.serve(request, catalogue_cache.key("schemes:categories"), render, db)
+
+@router.get("/sync/")
+async def sync_catalogue(
+    request: Request,
+    since: int = Query(0, ge=0),
+    limit: int = Query(settings.CATALOGUE_SYNC_PAGE_SIZE, ge=1, le=settings.CATALOGUE_SYNC_PAGE_SIZE),
+    db: Session = Depends(get_catalogue_read_db)
+):
+    """
+    Catalogue changes since the version a client holds
+
+    Clients without a catalogue (since=0) get a snapshot file to download
+    first. Repeat with the returned version while has_more is true.
+    """
+    if since == 0:
+        snapshot = catalogue_snapshots.latest() or catalogue_snapshots.build()
+        return ORJSONResponse({
+            "version": snapshot["version"],
+            "has_more": True,
+            "snapshot_url": catalogue_snapshots.url(snapshot),
+            "schemes": [],
+            "deleted": [],
+        })
+
+    def render() -> bytes:
+        return dumps(changes_since(db, since, limit))
+    
+    return catalogue_cache.serve(request, catalogue_cache.key("schemes:sync", since=since, limit=limit), render, db)
+
+@router.get("/sync/files/{key:path}")
+async def get_snapshot_file(key: str):
+    """
+    Serve catalogue snapshots from local storage (S3 storage hands out presigned URLs instead)
+    """
+    storage = catalogue_snapshots.storage
+    if not isinstance(storage, LocalObjectStorage) or not key.startswith("catalogue/snapshot-"):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    try:
+        path = storage.path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if not storage.exists(key):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    # Snapshots are keyed by catalogue version, so the bytes behind a URL never change
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
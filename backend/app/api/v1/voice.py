@@ -1,42 +1,119 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import logging
+import uuid
+
+from app.api.deps import check_content_length
+from app.core.config import settings
+from app.services.storage import LocalObjectStorage
+from app.services.transcription import QUEUED, RUNNING, transcription_service
+from app.services.tts_cache import UnsupportedLanguageError, tts_cache
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-class TranscribeResponse(BaseModel):
-    text: str
+class TranscriptionJobResponse(BaseModel):
+    job_id: str
+    status: str
     language: str
-    confidence: float
+    text: Optional[str] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
 
 class SynthesizeRequest(BaseModel):
     text: str
     language: str = "en"
+    voice: Optional[str] = None
 
 class SynthesizeResponse(BaseModel):
     audio_url: str
+    cached: bool = False
 
-@router.post("/transcribe", response_model=TranscribeResponse)
-async def transcribe_audio(
-    audio: UploadFile = File(...),
-    language: str = "en"
-):
+@router.post("/transcribe", response_model=TranscriptionJobResponse, status_code=202)
+async def transcribe_audio(request: Request, language: str = "en"):
+    """
+    Start transcribing speech to text using Amazon Transcribe
+    The request body is the raw audio. It is streamed to storage chunk by chunk
+    and transcribed in the background; poll the returned job for the text.
+    """
+    check_content_length(request, settings.TRANSCRIBE_MAX_UPLOAD_BYTES, "Audio file too large")
+    if not transcription_service.reserve():
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription service busy. Try again shortly",
+            headers={"Retry-After": "5"},
+        )
+
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    key = f"voice-uploads/{uuid.uuid4().hex}"
+    writer = await asyncio.to_thread(transcription_service.storage.writer, key, content_type)
+    try:
+        async for chunk in request.stream():
+            if writer.size + len(chunk) > settings.TRANSCRIBE_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Audio file too large")
+            if chunk:
+                await asyncio.to_thread(writer.write, chunk)
+        if writer.size == 0:
+            raise HTTPException(status_code=422, detail="Audio is empty")
+        await asyncio.to_thread(writer.commit)
+    except BaseException:
+        transcription_service.release()
+        await asyncio.to_thread(writer.abort)
+        raise
+
+    job = await asyncio.to_thread(transcription_service.submit, key, language, writer.size)
+    return TranscriptionJobResponse(**job)
+
+@router.get("/transcribe/{job_id}", response_model=TranscriptionJobResponse)
+async def get_transcription(job_id: str, wait: float = Query(0, ge=0, le=30)):
     """
-    Convert speech to text using Amazon Transcribe
-    TODO: Integrate Amazon Transcribe
+    Transcription job status and result
+    With wait, the response is held until the job finishes or wait seconds pass.
     """
-    # TODO: Upload audio to S3
-    # TODO: Start transcription job
-    # TODO: Wait for completion
-    # TODO: Return transcribed text
-    raise HTTPException(status_code=501, detail="Not implemented")
+    job = await asyncio.to_thread(transcription_service.get, job_id)
+    if job is not None and wait and job["status"] in (QUEUED, RUNNING):
+        job = await transcription_service.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return TranscriptionJobResponse(**job)
 
 @router.post("/synthesize", response_model=SynthesizeResponse)
 async def synthesize_speech(request: SynthesizeRequest):
     """
     Convert text to speech using Amazon Polly
-    TODO: Integrate Amazon Polly
+    Audio is cached by content, so repeated text is served without synthesis.
+    """
+    if not request.text.strip():
+        raise HTTPException(status_code=422, detail="Text is empty")
+    try:
+        audio_url, cached = await tts_cache.get_url(request.text, request.language, request.voice)
+    except UnsupportedLanguageError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except Exception as exc:
+        logger.error(f"Speech synthesis failed: {exc}")
+        raise HTTPException(status_code=502, detail="Speech synthesis failed")
+    return SynthesizeResponse(audio_url=audio_url, cached=cached)
+
+@router.get("/audio/{key:path}")
+async def get_audio(key: str):
+    """
+    Serve cached audio from local storage (S3 storage hands out presigned URLs instead)
     """
-    # TODO: Call Amazon Polly
-    # TODO: Save audio to S3
-    # TODO: Return audio URL
-    raise HTTPException(status_code=501, detail="Not implemented")
+    storage = tts_cache.storage
+    if not isinstance(storage, LocalObjectStorage) or not key.startswith("tts/"):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    try:
+        path = storage.path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    if not storage.exists(key):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    # Keys are content hashes, so the bytes behind a URL never change
+    return FileResponse(
+        path,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
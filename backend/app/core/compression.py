@@ -0,0 +1,170 @@
+import gzip
+import time
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(
+        body, mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+if zstandard is not None:
+    _zstd = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL)
+    COMPRESSORS["zstd"] = _zstd.compress
+COMPRESSORS["gzip"] = _gzip
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred supported encoding the client accepts"""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    # Server preference: best ratio on repetitive multilingual text first
+    for encoding in COMPRESSORS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class CompressionStats:
+    """Per-route counters of bytes saved and CPU spent compressing"""
+
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, route: str, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        entry = self.routes.get(route)
+        if entry is None:
+            entry = self.routes[route] = {
+                "responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "encodings": {}
+            }
+        entry["responses"] += 1
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+        entry["cpu_seconds"] += cpu_seconds
+        entry["encodings"][encoding] = entry["encodings"].get(encoding, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            route: {
+                **entry,
+                "encodings": dict(entry["encodings"]),
+                "bytes_saved": entry["bytes_in"] - entry["bytes_out"],
+            }
+            for route, entry in self.routes.items()
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def compress(body: bytes, encoding: str, route: str) -> bytes:
+    """Compress body with encoding, recording size and CPU cost for route"""
+    start = time.thread_time()
+    compressed = COMPRESSORS[encoding](body)
+    compression_stats.record(route, encoding, len(body), len(compressed), time.thread_time() - start)
+    return compressed
+
+
+def route_label(scope) -> str:
+    """Label a request by method and route template rather than raw path"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in app.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                return f"{scope['method']} {route.path}"
+    return f"{scope['method']} {scope['path']}"
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating br/zstd/gzip compression of buffered responses
+
+    Streaming responses and responses that already carry a Content-Encoding
+    (such as pre-compressed cached bodies) are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            passthrough = True
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, route_label(scope))
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,162 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler:
+    """Samples thread stacks on a background thread and aggregates them
+
+    Output uses the collapsed-stack format ("a;b;c count") understood by
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = 0.01, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                stack = _collapse(frame)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+
+class ProfileStore:
+    """Bounded store of recent per-request profiles"""
+
+    def __init__(self, max_profiles: int = 100):
+        self._profiles: deque = deque(maxlen=max_profiles)
+
+    def add(self, profile: Dict[str, Any]) -> None:
+        self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {key: value for key, value in profile.items() if key != "stacks"}
+            for profile in reversed(self._profiles)
+        ]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for profile in self._profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+
+profile_store = ProfileStore(max_profiles=settings.PROFILING_MAX_STORED)
+
+# Only one process-wide profile may run at a time
+process_profile_lock = threading.Lock()
+
+
+def _token_matches(value: Optional[str]) -> bool:
+    token = settings.PROFILING_TOKEN
+    return bool(token) and value is not None and hmac.compare_digest(value, token)
+
+
+class ProfilingMiddleware:
+    """Profiles requests that opt in with X-Profile or are randomly sampled
+
+    The sampler watches the thread handling the request. Async endpoints share
+    the event loop thread, so samples can include concurrent requests; the
+    profile is still representative of where the loop spends its time.
+
+    Work handed to other threads (asyncio.to_thread, the resilience worker
+    pools running database calls, sync endpoints on the threadpool) is not
+    sampled; a request waiting on it shows up as time in the event loop's
+    selector. Use POST /admin/profiling/sample to see every thread.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = _token_matches(Headers(scope=scope).get("x-profile"))
+        if not requested and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        sampler = StackSampler(
+            interval=settings.PROFILING_INTERVAL_MS / 1000,
+            thread_ids=[threading.get_ident()],
+        )
+        status = {}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if requested:
+                    MutableHeaders(raw=message["headers"])["X-Profile-Id"] = profile_id
+            await send(message)
+
+        started_at = time.time()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            profile_store.add({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status.get("code"),
+                "requested": requested,
+                "started_at": started_at,
+                "duration": time.perf_counter() - start,
+                "samples": sampler.samples,
+                "stacks": sampler.collapsed(),
+            })
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import InvalidTokenError, token_verifier
+
+
+class RateLimitBackend:
+    """Interface for rate limit stores"""
+
+    # True when hit() does network I/O and must run off the event loop
+    blocking = False
+
+    def hit(self, key: str, limit_per_minute: int) -> Tuple[bool, float]:
+        """Consume one request for key; returns (allowed, retry_after_seconds)"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """In-process token buckets with bounded memory and idle-key eviction"""
+
+    def __init__(self, max_keys: int = 100000, sweep_interval: float = 60.0):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        # key -> [tokens, last_refill_time]; insertion order doubles as LRU order
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, key: str, limit_per_minute: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        rate = limit_per_minute / 60.0
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            self._buckets[key] = [limit_per_minute - 1.0, now]
+            return True, 0.0
+
+        self._buckets.move_to_end(key)
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > limit_per_minute:
+            tokens = limit_per_minute
+        bucket[1] = now
+
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return True, 0.0
+
+        bucket[0] = tokens
+        return False, (1.0 - tokens) / rate
+
+    def _evict(self, now: float) -> None:
+        # A bucket idle long enough to refill completely carries no state, so
+        # dropping it is lossless. Fall back to LRU eviction when nothing is idle.
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            idle = [k for k, (_, last) in self._buckets.items() if now - last >= 60.0]
+            for k in idle:
+                del self._buckets[k]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class LocalCounterClient:
+    """In-process stand-in for a shared counter store (DynamoDB, Redis)"""
+
+    blocking = False
+
+    def __init__(self):
+        self._counters: Dict[str, Tuple[int, float]] = {}
+
+    def incr(self, key: str, ttl: int) -> int:
+        now = time.time()
+        count, expires = self._counters.get(key, (0, 0.0))
+        if expires <= now:
+            count, expires = 0, now + ttl
+        count += 1
+        self._counters[key] = (count, expires)
+        return count
+
+    def get(self, key: str) -> int:
+        count, expires = self._counters.get(key, (0, 0.0))
+        return count if expires > time.time() else 0
+
+
+class DynamoDBCounterClient:
+    """Shared counters kept in DynamoDB using atomic ADD updates"""
+
+    blocking = True
+
+    def __init__(self, table_name: str, region: str):
+        import boto3
+
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+
+    def incr(self, key: str, ttl: int) -> int:
+        result = self.table.update_item(
+            Key={"cache_key": key},
+            UpdateExpression="ADD hits :one SET expires_at = if_not_exists(expires_at, :exp)",
+            ExpressionAttributeValues={":one": 1, ":exp": int(time.time()) + ttl},
+            ReturnValues="UPDATED_NEW",
+        )
+        return int(result["Attributes"]["hits"])
+
+    def get(self, key: str) -> int:
+        item = self.table.get_item(Key={"cache_key": key}).get("Item")
+        return int(item["hits"]) if item else 0
+
+
+class SharedRateLimitBackend(RateLimitBackend):
+    """Sliding-window counters stored in a shared counter client
+
+    Keeps one counter per key per minute and weights the previous minute by
+    how much of it still overlaps the sliding window, so every worker sees
+    the same limit with one atomic increment and one read per request. The
+    request is counted before the decision, using the incremented value, so
+    concurrent workers cannot all pass on the same stale count; rejected
+    requests count too, which keeps a client retrying in a tight loop limited.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.blocking = client.blocking
+
+    def hit(self, key: str, limit_per_minute: int) -> Tuple[bool, float]:
+        now = time.time()
+        window = int(now // 60)
+        elapsed = now - window * 60
+
+        current = self.client.incr(f"rl:{key}:{window}", ttl=120)
+        previous = self.client.get(f"rl:{key}:{window - 1}")
+        estimated = previous * (60 - elapsed) / 60 + current
+
+        if estimated > limit_per_minute:
+            # The retry is counted too, so leave room for one more request
+            headroom = limit_per_minute - current - 1
+            if previous == 0 or headroom < 0:
+                return False, 60 - elapsed
+            # Wait until the previous window's weight has decayed enough
+            return False, max(60 - headroom * 60 / previous - elapsed, 0.0)
+
+        return True, 0.0
+
+
+# Route classes: path prefix -> settings attribute holding the per-minute limit
+ROUTE_CLASSES: Tuple[Tuple[str, str, str], ...] = (
+    # Audio downloads and transcription polls are cheap reads, unlike synthesis and uploads
+    ("/api/v1/voice/audio", "default", "RATE_LIMIT_PER_MINUTE"),
+    ("/api/v1/voice/transcribe/", "default", "RATE_LIMIT_PER_MINUTE"),
+    ("/api/v1/voice", "voice", "RATE_LIMIT_VOICE_PER_MINUTE"),
+    ("/api/v1/recommendations", "recommendations", "RATE_LIMIT_RECOMMENDATIONS_PER_MINUTE"),
+)
+
+EXEMPT_PATHS = ("/health",)
+
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "dynamodb":
+        return SharedRateLimitBackend(
+            DynamoDBCounterClient(settings.DYNAMODB_CACHE_TABLE, settings.AWS_REGION)
+        )
+    if settings.RATE_LIMIT_BACKEND == "shared-local":
+        return SharedRateLimitBackend(LocalCounterClient())
+    return MemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-client, per-route-class request limits"""
+
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None):
+        self.app = app
+        self.backend = backend or create_backend()
+        self.route_classes = [
+            (prefix, name, getattr(settings, attr)) for prefix, name, attr in ROUTE_CLASSES
+        ]
+        self.default_limit = settings.RATE_LIMIT_PER_MINUTE
+        self.trusted_proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+
+    def resolve(self, path: str) -> Tuple[str, int]:
+        for prefix, name, limit in self.route_classes:
+            if path.startswith(prefix):
+                return name, limit
+        return "default", self.default_limit
+
+    def client_id(self, scope) -> str:
+        """The token subject for authenticated requests, else the client address
+
+        Tokens are verified, not just decoded, so a client cannot spread its
+        requests over made-up subjects; repeat tokens hit the verifier's memo.
+        """
+        authorization = None
+        forwarded = []
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == b"x-forwarded-for":
+                forwarded.append(value)
+        if authorization is not None and authorization[:7].lower() == b"bearer ":
+            try:
+                return "user:" + token_verifier.verify(authorization[7:].decode("latin-1"))["sub"]
+            except InvalidTokenError:
+                pass
+        if self.trusted_proxies and forwarded:
+            # Each trusted proxy appends the address it received the request
+            # from; entries further left come from the client and can be forged
+            hops = b",".join(forwarded).split(b",")
+            if len(hops) >= self.trusted_proxies:
+                return "ip:" + hops[-self.trusted_proxies].strip().decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route_class, limit = self.resolve(scope["path"])
+        key = f"{route_class}:{self.client_id(scope)}"
+        if self.backend.blocking:
+            allowed, retry_after = await asyncio.to_thread(self.backend.hit, key, limit)
+        else:
+            allowed, retry_after = self.backend.hit(key, limit)
+
+        if not allowed:
+            wait = math.ceil(retry_after)
+            body = json.dumps({"detail": f"Rate limit exceeded. Try again in {wait} seconds"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(wait).encode()),
+                    (b"x-ratelimit-limit", str(limit).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await self.app(scope, receive, send)
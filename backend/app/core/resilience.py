@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Monotonic time by which the current request or dependency call must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work starts after its deadline has already passed"""
+
+
+class Unavailable(Exception):
+    """A dependency could not produce a fresh result in time"""
+
+
+def set_deadline(seconds: float) -> None:
+    """Bound the rest of the current context to seconds from now"""
+    _deadline.set(time.monotonic() + seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when unbounded"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    # Postgres cancels statements that would outlive the caller's deadline,
+    # so a slow query cannot hold the connection after the caller gave up
+    budget = remaining()
+    if budget is None:
+        return
+    if budget <= 0:
+        raise DeadlineExceeded()
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(budget * 1000), 1)}")
+
+
+class CircuitBreaker:
+    """Stops calling a dependency after consecutive failures
+
+    Open for reset_timeout seconds, then half-open: one probe call is let
+    through and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """End a call whose outcome says nothing about the dependency's health"""
+        with self._lock:
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LastGood:
+    """LRU of the last successful result per key, served while a dependency is down"""
+
+    def __init__(self, max_entries: int = 10000, max_age: float = 86400.0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.served = 0
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) if a result no older than max_age is held"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[1]
+            if age > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.served += 1
+            return entry[0], age
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Dependency:
+    """A backing service called through a circuit breaker within the request deadline
+
+    Calls run on a bounded worker pool under their own budget, so a call the
+    request stopped waiting for still finishes in the background and refreshes
+    the last good result for the next request. Concurrent calls for the same
+    key share one attempt instead of piling onto a struggling dependency.
+    Calls slower than slow_call count as failures.
+
+    At most max_pending attempts may be running or queued; beyond that calls
+    fail fast. The budget runs from submission, so an attempt that waited in
+    the queue past it is dropped instead of reaching a recovering dependency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cache: LastGood,
+        workers: int = 8,
+        max_pending: int = 32,
+        budget: float = 10.0,
+        slow_call: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        failures: Tuple[type, ...] = (OperationalError, PoolTimeoutError, DeadlineExceeded),
+        cache_if: Callable[[Any], bool] = lambda result: True,
+    ):
+        self.name = name
+        self.cache = cache
+        self.max_pending = max_pending
+        self.budget = budget
+        self.slow_call = slow_call
+        self.failures = failures
+        self.cache_if = cache_if
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.shed = 0
+        self.dropped = 0
+        dependencies[name] = self
+
+    async def call(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args) if it succeeds before the deadline; raises Unavailable otherwise"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if len(self._inflight) >= self.max_pending:
+                    self.shed += 1
+                    raise Unavailable(f"{self.name} has too many calls pending")
+                if not self.breaker.allow():
+                    raise Unavailable(f"{self.name} circuit is open")
+                future = self._executor.submit(self._run, key, fn, args, time.monotonic())
+                self._inflight[key] = future
+        waiter = asyncio.wrap_future(future)
+        # Every waiter may have given up by the time the attempt fails
+        waiter.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            # shield: a waiter timing out must not cancel the shared attempt
+            return await asyncio.wait_for(asyncio.shield(waiter), remaining())
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise Unavailable(f"{self.name} did not answer in time")
+        except self.failures as exc:
+            raise Unavailable(f"{self.name} failed: {exc}")
+
+    def _run(self, key: Hashable, fn: Callable[..., Any], args: Tuple[Any, ...], submitted: float) -> Any:
+        deadline = submitted + self.budget
+        token = _deadline.set(deadline)
+        started = time.monotonic()
+        try:
+            if started >= deadline:
+                self.dropped += 1
+                # Queueing says the pool is saturated, not that the dependency failed
+                self.breaker.release()
+                raise DeadlineExceeded(f"{self.name} call waited {started - submitted:.1f}s in the queue")
+            return self._attempt(key, fn, args, started)
+        finally:
+            _deadline.reset(token)
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _attempt(self, key: Hashable, fn: Callable[..., Any], args: Tuple[Any, ...], started: float) -> Any:
+        try:
+            result = fn(*args)
+        except self.failures:
+            self.breaker.failure()
+            raise
+        except BaseException:
+            # Bugs and bad input are not the dependency's fault
+            self.breaker.release()
+            raise
+        if time.monotonic() - started > self.slow_call:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        if self.cache_if(result):
+            self.cache.put(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "cached_results": len(self.cache),
+            "stale_served": self.cache.served,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "rejected": self.breaker.rejected,
+            "timeouts": self.timeouts,
+            "shed": self.shed,
+            "dropped": self.dropped,
+            "in_flight": len(self._inflight),
+        }
+
+
+dependencies: Dict[str, Dependency] = {}
+
+
+def create_dependency(name: str, cache: LastGood, **options: Any) -> Dependency:
+    return Dependency(
+        name,
+        cache,
+        workers=settings.RESILIENCE_WORKERS,
+        max_pending=settings.RESILIENCE_MAX_PENDING,
+        budget=settings.RESILIENCE_CALL_BUDGET_SECONDS,
+        slow_call=settings.REQUEST_TIMEOUT_SECONDS,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+        **options,
+    )
+
+
+def create_cache() -> LastGood:
+    return LastGood(max_entries=settings.STALE_CACHE_MAX_ENTRIES, max_age=settings.STALE_MAX_AGE_SECONDS)
+
+
+def stale_headers(age: float) -> Dict[str, str]:
+    return {"Warning": '110 - "Response is Stale"', "X-Stale-Age": str(int(age))}
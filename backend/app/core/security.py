@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidTokenError(Exception):
+    """Raised when a bearer token cannot be accepted"""
+
+
+# (kid, algorithm, JWK or secret) triples as published by a key source
+RawKeys = List[Tuple[Optional[str], str, Any]]
+
+
+def secret_keys() -> RawKeys:
+    """The shared JWT_SECRET_KEY, for local development"""
+    return [(None, settings.JWT_ALGORITHM, settings.JWT_SECRET_KEY)]
+
+
+def file_keys() -> RawKeys:
+    """Public keys from a JWKS file, a stand-in for Cognito in tests"""
+    with open(settings.AUTH_JWKS_FILE) as f:
+        document = json.load(f)
+    return [(key.get("kid"), key.get("alg", "RS256"), key) for key in document["keys"]]
+
+
+def cognito_issuer() -> str:
+    return f"https://cognito-idp.{settings.COGNITO_REGION}.amazonaws.com/{settings.COGNITO_USER_POOL_ID}"
+
+
+def cognito_keys() -> RawKeys:
+    """The user pool's published JWKS"""
+    import httpx
+
+    document = httpx.get(f"{cognito_issuer()}/.well-known/jwks.json", timeout=10).json()
+    return [(key["kid"], key.get("alg", "RS256"), key) for key in document["keys"]]
+
+
+KEY_SOURCES: Dict[str, Callable[[], RawKeys]] = {
+    "secret": secret_keys,
+    "file": file_keys,
+    "cognito": cognito_keys,
+}
+
+
+class KeySet:
+    """Token signing keys, loaded once and refreshed on a background thread
+
+    Verification never fetches keys itself. A token signed with an unknown key
+    is rejected and schedules an early refresh, which picks up rotated keys.
+    Until the first load succeeds every token is rejected and the thread
+    retries with backoff.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], RawKeys],
+        refresh_interval: float = 3600.0,
+        min_refresh_gap: float = 30.0,
+        initial_retry: float = 1.0,
+    ):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refresh_gap = min_refresh_gap
+        self.initial_retry = initial_retry
+        self.keys: Dict[Optional[str], Tuple[Key, str]] = {}
+        self._raw: RawKeys = []
+        self.version = 0
+        self.loaded_at = 0.0
+        self._refresh_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        raw = self.source()
+        keys = {kid: (jwk.construct(material, algorithm), algorithm) for kid, algorithm, material in raw}
+        with self._lock:
+            if raw != self._raw:
+                self.version += 1
+                self._raw = raw
+            self.keys = keys
+            self.loaded_at = time.time()
+
+    def get(self, kid: Optional[str]) -> Optional[Tuple[Key, str]]:
+        found = self.keys.get(kid)
+        if found is None:
+            self._refresh_now.set()
+        return found
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.load()
+        except Exception as exc:
+            logger.error(f"Could not load token signing keys: {exc}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="key-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._refresh_now.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        retry = self.initial_retry
+        while not self._stop.is_set():
+            if self.loaded_at:
+                self._refresh_now.wait(self.refresh_interval)
+                if self._stop.is_set():
+                    return
+                wait = self.loaded_at + self.min_refresh_gap - time.time()
+                if wait > 0 and self._stop.wait(wait):
+                    return
+            else:
+                # Nothing to verify with yet: retry soon, backing off to the refresh gap
+                if self._stop.wait(retry):
+                    return
+                retry = min(retry * 2, self.min_refresh_gap)
+            self._refresh_now.clear()
+            try:
+                self.load()
+            except Exception as exc:
+                logger.warning(f"Signing key refresh failed, keeping previous keys: {exc}")
+
+
+class TokenVerifier:
+    """Verifies JWTs locally and remembers tokens that already passed
+
+    A repeat token is a dictionary lookup plus an expiry check. The memo is
+    dropped whenever the key set changes so revoked keys stop working.
+    """
+
+    def __init__(self, key_set: KeySet, issuer: Optional[str] = None, client_id: Optional[str] = None, max_entries: int = 10000):
+        self.key_set = key_set
+        self.issuer = issuer
+        self.client_id = client_id
+        self.max_entries = max_entries
+        self._verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._version = key_set.version
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        if self._version != self.key_set.version:
+            self._verified.clear()
+            self._version = self.key_set.version
+
+        claims = self._verified.get(token)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                return claims
+            self._verified.pop(token, None)
+            raise InvalidTokenError("Token has expired")
+
+        claims = self._decode(token)
+        self._verified[token] = claims
+        if len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise InvalidTokenError("Malformed token")
+        found = self.key_set.get(header.get("kid"))
+        if found is None:
+            raise InvalidTokenError("Unknown signing key")
+        key, algorithm = found
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                # Pin the algorithm to the key's own, never the one the token asks for
+                algorithms=[algorithm],
+                issuer=self.issuer or None,
+                options={"verify_aud": False, "require_exp": True, "require_sub": True},
+            )
+        except JWTError as exc:
+            raise InvalidTokenError(str(exc))
+        # Cognito ID tokens carry the app client in aud, access tokens in client_id
+        if self.client_id and self.client_id not in (claims.get("aud"), claims.get("client_id")):
+            raise InvalidTokenError("Token was issued for another client")
+        return claims
+
+
+def create_key_set() -> KeySet:
+    return KeySet(
+        KEY_SOURCES[settings.AUTH_KEY_SOURCE],
+        refresh_interval=settings.AUTH_KEYS_REFRESH_SECONDS,
+    )
+
+
+key_set = create_key_set()
+
+token_verifier = TokenVerifier(
+    key_set,
+    issuer=cognito_issuer() if settings.AUTH_KEY_SOURCE == "cognito" else settings.AUTH_ISSUER,
+    client_id=settings.COGNITO_CLIENT_ID if settings.AUTH_KEY_SOURCE == "cognito" else None,
+    max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+)
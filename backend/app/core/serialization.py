@@ -0,0 +1,29 @@
+from decimal import Decimal
+from typing import Any, Iterable, List
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    # Match Pydantic's JSON output so both paths produce identical payloads
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize trusted content to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default)
+
+
+def rows_to_dicts(rows: Iterable[Any]) -> List[dict]:
+    """Convert SQLAlchemy column-query rows to dicts without model validation"""
+    return [row._asdict() for row in rows]
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class backed by orjson, with Decimal support"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
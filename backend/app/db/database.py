@@ -1,7 +1,11 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.profiling import install_query_profiling
+from app.db.replicas import RecentWrites, ReplicaRouter
 
 engine = create_engine(
     settings.DATABASE_URL,
@@ -9,6 +13,22 @@ engine = create_engine(
     pool_size=10,
     max_overflow=20
 )
+install_query_profiling(engine)
+
+replica_engines = [
+    create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
+    for url in settings.READ_REPLICA_URLS
+]
+for replica_engine in replica_engines:
+    install_query_profiling(replica_engine)
+
+replica_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+)
+recent_writes = RecentWrites(window=max(settings.READ_YOUR_WRITES_SECONDS, settings.REPLICA_MAX_LAG_SECONDS))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -20,3 +40,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def read_session(bind):
+    """Yield a session for read-only work on bind, a replica or the primary"""
+    db = SessionLocal(bind=bind)
+    try:
+        yield db
+    except OperationalError:
+        replica_router.report_failure(bind)
+        raise
+    finally:
+        db.close()
+
+@contextmanager
+def read_scope(bind):
+    """read_session as a with-block, for reads outside request dependencies"""
+    yield from read_session(bind)
+
+def get_read_db():
+    """Session for read-only endpoints; never write through it"""
+    yield from read_session(replica_router.engine_for_read())
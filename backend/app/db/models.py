@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DECIMAL, TIMESTAMP, Text, ForeignKey, ARRAY, Date
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DECIMAL, TIMESTAMP, Text, ForeignKey, ARRAY, Date, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -96,6 +96,9 @@ class EligibilityRule(Base):
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
+    __table_args__ = (
+        UniqueConstraint("user_id", "scheme_id", name="uq_recommendations_user_scheme"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
@@ -113,6 +116,14 @@ class Recommendation(Base):
     user = relationship("User", back_populates="recommendations")
     scheme = relationship("Scheme", back_populates="recommendations")
 
+class RecommendationRun(Base):
+    __tablename__ = "recommendation_runs"
+    
+    # When recommendations were last generated for a user, so a profile that
+    # matches no scheme is not regenerated on every visit
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    generated_at = Column(TIMESTAMP, nullable=False)
+
 class UserInteraction(Base):
     __tablename__ = "user_interactions"
     
@@ -120,7 +131,8 @@ class UserInteraction(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     scheme_id = Column(UUID(as_uuid=True), ForeignKey("schemes.id", ondelete="CASCADE"))
     interaction_type = Column(String(50))
-    metadata = Column(JSONB)
+    # "metadata" is reserved by the declarative API, so map the column explicitly
+    event_metadata = Column("metadata", JSONB)
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     user = relationship("User", back_populates="interactions")
@@ -150,3 +162,46 @@ class SchemeDocument(Base):
     processed_at = Column(TIMESTAMP)
     
     scheme = relationship("Scheme", back_populates="documents")
+
+class DocumentClaim(Base):
+    __tablename__ = "document_claims"
+    
+    # The API process extracting a document holds its claim; others resume it
+    # only once the claim is older than DOCUMENT_CLAIM_TIMEOUT_SECONDS
+    document_id = Column(UUID(as_uuid=True), ForeignKey("scheme_documents.id", ondelete="CASCADE"), primary_key=True)
+    claimed_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+class CatalogueChange(Base):
+    __tablename__ = "catalogue_changes"
+    
+    # Sync cursor handed to clients; writers serialize on an advisory lock so
+    # versions become visible in order
+    version = Column(BigInteger, primary_key=True, autoincrement=True)
+    # No foreign key: tombstones outlive the schemes they describe
+    scheme_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    operation = Column(String(10), nullable=False)
+    changed_at = Column(TIMESTAMP, server_default=func.now())
+
+class ScheduledActivation(Base):
+    __tablename__ = "scheduled_activations"
+    
+    # Schemes the lifecycle manager deactivated because their start_date is
+    # still ahead; only these are switched on when it arrives, so a scheme an
+    # admin deactivated stays off
+    scheme_id = Column(UUID(as_uuid=True), ForeignKey("schemes.id", ondelete="CASCADE"), primary_key=True)
+    held_at = Column(TIMESTAMP, server_default=func.now())
+
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+    
+    # Shared by every API process, so a job can be polled on any of them
+    id = Column(String(32), primary_key=True)
+    object_key = Column(String(500), nullable=False)
+    language = Column(String(10), nullable=False)
+    size = Column(BigInteger)
+    status = Column(String(20), nullable=False, default='queued')
+    text = Column(Text)
+    confidence = Column(DECIMAL(5, 4))
+    error = Column(String(255))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    finished_at = Column(TIMESTAMP, index=True)
@@ -0,0 +1,88 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape by replacing literals and parameters"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _BIND_PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class NPlusOneQueryError(Exception):
+    """Raised in strict mode when a request repeats one statement shape too often"""
+
+
+class QueryStats:
+    """Queries issued while handling a single request"""
+
+    __slots__ = ("count", "total_time", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Dict[str, int] = {}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_request() -> QueryStats:
+    """Begin collecting query statistics for the current request context"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    shape = None
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        shape = normalize_sql(statement)
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {shape}")
+
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_time += elapsed
+
+    if settings.QUERY_NPLUS1_MODE == "off":
+        return
+    shape = shape or normalize_sql(statement)
+    seen = stats.shapes.get(shape, 0) + 1
+    stats.shapes[shape] = seen
+    if seen == settings.QUERY_NPLUS1_THRESHOLD + 1:
+        message = f"Possible N+1: statement issued more than {settings.QUERY_NPLUS1_THRESHOLD} times in one request: {shape}"
+        if settings.QUERY_NPLUS1_MODE == "raise":
+            raise NPlusOneQueryError(message)
+        logger.warning(message)
+
+
+def install_query_profiling(engine: Engine) -> None:
+    """Attach query timing and N+1 detection hooks to an engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
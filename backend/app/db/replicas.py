@@ -0,0 +1,142 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary. Zero when it has replayed all the
+# WAL it received (an idle primary would otherwise look ever more lagged) and
+# when the database is not a standby at all, so plain databases work in tests.
+# NULL, which takes the replica out of rotation, when its WAL receiver is not
+# streaming: a disconnected standby has replayed everything it received too.
+# status is only visible to roles with pg_read_all_stats; without it a running
+# receiver process is trusted.
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE coalesce(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+def _label(engine: Engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions
+
+    Replica lag is measured on a background thread. Reads go round-robin to
+    replicas within REPLICA_MAX_LAG_SECONDS and fall back to the primary when
+    none qualify. Until the first check completes every read uses the primary.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], max_lag: float = 5.0, check_interval: float = 2.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Dict[str, Optional[float]] = {_label(replica): None for replica in replicas}
+        self._healthy: List[Engine] = []
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def engine_for_read(self) -> Engine:
+        healthy = self._healthy
+        if not healthy:
+            self.primary_reads += 1
+            return self.primary
+        self.replica_reads += 1
+        return healthy[next(self._turn) % len(healthy)]
+
+    def report_failure(self, engine: Engine) -> None:
+        """Take a replica out of rotation until its next successful check"""
+        if engine is self.primary:
+            return
+        self._healthy = [replica for replica in self._healthy if replica is not engine]
+        self.lag[_label(engine)] = None
+
+    def check(self) -> None:
+        healthy = []
+        for replica in self.replicas:
+            try:
+                with replica.connect() as connection:
+                    lag = connection.execute(LAG_QUERY).scalar()
+                if lag is None:
+                    logger.warning(f"Replica {_label(replica)} is not streaming from the primary")
+                lag = float(lag) if lag is not None else None
+            except Exception as exc:
+                logger.warning(f"Replica {_label(replica)} is unreachable: {exc}")
+                lag = None
+            self.lag[_label(replica)] = lag
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(replica)
+        self._healthy = healthy
+
+    def start(self) -> None:
+        if not self.replicas or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._healthy = []
+
+    def _run(self) -> None:
+        while True:
+            self.check()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": self.lag,
+            "healthy": len(self._healthy),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+
+class RecentWrites:
+    """Remembers who wrote recently so their next reads see their own writes
+
+    Keys are user ids, or a shared key for data written on behalf of everyone.
+    Entries live in this process only; other processes fall back on the lag
+    bound, which is why the window should exceed REPLICA_MAX_LAG_SECONDS.
+    """
+
+    def __init__(self, window: float = 10.0, max_entries: int = 100000):
+        self.window = window
+        self.max_entries = max_entries
+        self._until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: Hashable) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._until[key] = now + self.window
+            if len(self._until) > self.max_entries:
+                self._until = {k: until for k, until in self._until.items() if until > now}
+
+    def recent(self, key: Hashable) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > time.monotonic()
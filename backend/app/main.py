@@ -6,8 +6,21 @@ import logging
 
 from app.api.v1 import auth, profile, schemes, recommendations, admin, voice
 from app.core.config import settings
-from app.db.database import engine
+from app.core.compression import CompressionMiddleware
+from app.core.profiler import ProfilingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.security import key_set
+from app.core.serialization import ORJSONResponse
+from app.db.database import engine, replica_router
+from app.db.profiling import start_request
 from app.db import models
+from app.services.catalogue_sync import enqueue_catalogue_snapshot
+from app.services.document_pipeline import document_pipeline
+from app.services.interaction_ingest import interaction_ingestor
+from app.services.jobs import job_queue
+from app.services.reach_estimator import reach_estimator
+from app.services.scheme_lifecycle import scheme_lifecycle
+from app.services.transcription import transcription_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,9 +34,19 @@ app = FastAPI(
     description="AI-powered platform for personalized government scheme recommendations",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Request profiling middleware (opt-in or sampled)
+app.add_middleware(ProfilingMiddleware)
+
+# Response compression middleware
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Rate limiting middleware (added before CORS so 429 responses carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -37,12 +60,42 @@ app.add_middleware(
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
+    query_stats = start_request()
     response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
-    logger.info(f"{request.method} {request.url.path} - {process_time:.3f}s")
+    response.headers["X-DB-Time"] = str(query_stats.total_time)
+    response.headers["X-DB-Queries"] = str(query_stats.count)
+    logger.info(
+        f"{request.method} {request.url.path} - {process_time:.3f}s "
+        f"({query_stats.count} queries, {query_stats.total_time:.3f}s db)"
+    )
     return response
 
+# Background services
+@app.on_event("startup")
+async def start_background_services():
+    key_set.start()
+    replica_router.start()
+    interaction_ingestor.start()
+    job_queue.start()
+    scheme_lifecycle.start()
+    # Bring the catalogue snapshot up to date with changes made while stopped
+    enqueue_catalogue_snapshot()
+    document_pipeline.start()
+    reach_estimator.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await interaction_ingestor.stop()
+    scheme_lifecycle.stop()
+    job_queue.stop()
+    transcription_service.shutdown()
+    document_pipeline.stop()
+    reach_estimator.stop()
+    key_set.stop()
+    replica_router.stop()
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date
 from decimal import Decimal
+from uuid import UUID
 
 class SchemeBase(BaseModel):
     scheme_code: str
@@ -16,7 +17,7 @@ class SchemeBase(BaseModel):
     application_url: Optional[str] = None
 
 class SchemeResponse(SchemeBase):
-    id: str
+    id: UUID
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     is_active: bool
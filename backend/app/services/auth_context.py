@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.db import models
+
+PROFILE_FIELDS = [
+    column.key for column in models.UserProfile.__table__.columns
+    if column.key not in ("created_at", "updated_at")
+]
+
+
+class AuthContext:
+    """The authenticated user and their profile, detached from any session"""
+
+    __slots__ = ("user_id", "cognito_id", "phone_number", "profile")
+
+    def __init__(self, user_id: UUID, cognito_id: str, phone_number: str, profile: Optional[Dict[str, Any]]):
+        self.user_id = user_id
+        self.cognito_id = cognito_id
+        self.phone_number = phone_number
+        self.profile = profile
+
+
+def build_context(user: models.User) -> AuthContext:
+    profile = None
+    if user.profile is not None:
+        profile = {field: getattr(user.profile, field) for field in PROFILE_FIELDS}
+    return AuthContext(user.id, user.cognito_id, user.phone_number, profile)
+
+
+class AuthContextCache:
+    """Short-lived per-process cache of AuthContext by token subject
+
+    Profile writes in this process invalidate their entry immediately; other
+    processes see the change once the TTL lapses.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[AuthContext, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cognito_id: str) -> Optional[AuthContext]:
+        entry = self._entries.get(cognito_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, context: AuthContext) -> None:
+        with self._lock:
+            self._entries[context.cognito_id] = (context, time.monotonic() + self.ttl)
+            self._entries.move_to_end(context.cognito_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, cognito_id: str) -> None:
+        with self._lock:
+            self._entries.pop(cognito_id, None)
+
+
+auth_context_cache = AuthContextCache(
+    ttl=settings.AUTH_CONTEXT_TTL_SECONDS,
+    max_entries=settings.AUTH_CONTEXT_CACHE_SIZE,
+)
+
+
+class UserNotAllowed(Exception):
+    """Raised when a valid token belongs to an unknown or deactivated user"""
+
+
+def _find_user(db: Session, cognito_id: str) -> Optional[models.User]:
+    return (
+        db.query(models.User)
+        .options(joinedload(models.User.profile))
+        .filter(models.User.cognito_id == cognito_id)
+        .first()
+    )
+
+
+def load_context(db: Session, claims: Dict[str, Any]) -> AuthContext:
+    """Resolve token claims to a user, creating the user on first sign-in"""
+    cognito_id = claims["sub"]
+    user = _find_user(db, cognito_id)
+    if user is None:
+        # ID tokens carry the phone number the user signed up with
+        phone_number = claims.get("phone_number")
+        if not phone_number:
+            raise UserNotAllowed(cognito_id)
+        # Concurrent first requests race to create the user; losers keep the winner's row
+        db.execute(insert(models.User).values(cognito_id=cognito_id, phone_number=phone_number).on_conflict_do_nothing())
+        db.commit()
+        user = _find_user(db, cognito_id)
+        if user is None:
+            # The phone number already belongs to another account
+            raise UserNotAllowed(cognito_id)
+    if not user.is_active:
+        raise UserNotAllowed(cognito_id)
+    return build_context(user)
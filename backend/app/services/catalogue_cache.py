@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.compression import compress, compression_stats, negotiate, route_label
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal, recent_writes
+from app.services.catalogue_sync import current_version
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_MODELS = (models.Scheme, models.EligibilityRule)
+
+# recent_writes key for catalogue edits, which every reader must see
+CATALOGUE_WRITES = "catalogue"
+
+
+class CatalogueVersion:
+    """The catalogue change-log head, shared by every process
+
+    Every catalogue commit appends to catalogue_changes, so its highest
+    version names the catalogue state in any worker or task. The head is read
+    at most once per ttl seconds; commits in this process expire it at once,
+    and other processes see them within ttl.
+    """
+
+    def __init__(self, ttl: float = 1.0, session_factory=SessionLocal):
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self._value = 0
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        if time.monotonic() >= self._expires:
+            self.refresh()
+        return self._value
+
+    def refresh(self) -> None:
+        db = self.session_factory()
+        try:
+            value = current_version(db)
+        except SQLAlchemyError as exc:
+            # Keep serving cached responses while the database is unreachable
+            logger.warning(f"Could not read the catalogue version, keeping {self._value}: {exc}")
+            value = self._value
+        finally:
+            db.close()
+        with self._lock:
+            self._value = value
+            self._expires = time.monotonic() + self.ttl
+
+    def expire(self) -> None:
+        self._expires = 0.0
+
+
+catalogue_version = CatalogueVersion(ttl=settings.CATALOGUE_VERSION_TTL_SECONDS)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_catalogue_changes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CATALOGUE_MODELS):
+            session.info["catalogue_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _expire_on_commit(session):
+    # Re-read the head only once the data is visible to other sessions, so a
+    # concurrent reader can never cache pre-commit rows under the new version.
+    if session.info.pop("catalogue_changed", False):
+        # Render from the primary until replicas have replayed the change,
+        # or a lagging replica would be cached under the new version
+        recent_writes.mark(CATALOGUE_WRITES)
+        catalogue_version.expire()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("catalogue_changed", None)
+
+
+class CachedResponse:
+    """Pre-serialized response body with its strong ETag and compressed variants"""
+
+    __slots__ = ("version", "body", "etag", "media_type", "variants")
+
+    def __init__(self, version: int, body: bytes, media_type: str = "application/json"):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str, route: str) -> bytes:
+        """Return the body compressed with encoding, compressing it only once"""
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.body, encoding, route)
+        else:
+            compression_stats.record(route, encoding, len(self.body), len(body), 0.0)
+        return body
+
+
+class ResponseCache:
+    """LRU cache of serialized catalogue responses tied to the catalogue version"""
+
+    def __init__(self, max_entries: int = 1024, max_age: int = 60):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(route: str, **params: Any) -> Tuple:
+        """Build a cache key from a route name and its resolved parameters"""
+        return (route, tuple(sorted(params.items())))
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version < catalogue_version.value:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Tuple, body: bytes, version: int) -> CachedResponse:
+        entry = CachedResponse(version, body)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        """Build a 200 or 304 response for a cached entry"""
+        encoding = None
+        if len(entry.body) >= settings.COMPRESSION_MINIMUM_SIZE:
+            encoding = negotiate(request.headers.get("accept-encoding"))
+
+        # Strong ETags must differ between content codings of the same resource
+        etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+        headers["Content-Encoding"] = encoding
+        body = entry.encoded(encoding, route_label(request.scope))
+        return Response(content=body, media_type=entry.media_type, headers=headers)
+
+    def serve(self, request: Request, key: Tuple, render: Callable[[], bytes], db: Session) -> Response:
+        """Serve key from cache, rendering through db and storing it on a miss
+
+        The entry is stored under the change-log head as db sees it, read
+        before rendering so a concurrent commit invalidates it. A page rendered
+        from a lagging replica is therefore never cached under a newer version
+        than the data it shows.
+        """
+        entry = self.get(key)
+        if entry is None:
+            version = current_version(db)
+            entry = self.put(key, render(), version)
+        return self.respond(request, entry)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+catalogue_cache = ResponseCache(
+    max_entries=settings.CATALOGUE_CACHE_MAX_ENTRIES,
+    max_age=settings.CATALOGUE_CACHE_MAX_AGE,
+)
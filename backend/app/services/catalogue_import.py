@@ -0,0 +1,323 @@
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.catalogue_sync import UPSERT, current_version, record_changes
+from app.services.catalogue_validation import validate_records
+from app.services.scheme_lifecycle import scheme_lifecycle
+from app.services.tts_cache import enqueue_scheme_presynthesis
+
+logger = logging.getLogger(__name__)
+
+# Every scheme column the import can set, in COPY order after id
+SCHEME_COLUMNS = (
+    "scheme_code", "name", "name_hi", "name_mr", "name_ta",
+    "description", "description_hi", "description_mr", "description_ta",
+    "department", "category", "benefit_type", "benefit_amount", "state", "is_central",
+    "application_url", "document_url", "start_date", "end_date", "is_active",
+)
+SCHEME_DEFAULTS = {"is_central": False, "is_active": True}
+RULE_COLUMNS = (
+    "id", "scheme_id", "rule_type", "operator", "value_min", "value_max", "value_list", "is_mandatory", "priority",
+)
+
+# Errors listed in a report; the count covers all of them
+MAX_REPORTED_ERRORS = 1000
+
+CHUNK_RECORDS = 1000
+
+Record = Tuple[int, Dict[str, Any]]
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be parsed at all"""
+
+
+def detect_format(file_name: str) -> str:
+    extension = os.path.splitext(file_name.lower())[1]
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".json":
+        return "json"
+    raise ImportFormatError(f"Unsupported file type {extension or file_name}; use .csv, .json or .jsonl")
+
+
+def parse_records(data: bytes, file_format: str) -> Tuple[List[Record], List[Dict[str, Any]]]:
+    """Split an import file into numbered records; unparseable rows become errors
+
+    Rows are numbered from 1 as a spreadsheet user would count data rows
+    (CSV, JSON arrays) or lines (JSONL).
+    """
+    try:
+        content = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("File is not UTF-8 encoded")
+
+    records: List[Record] = []
+    errors: List[Dict[str, Any]] = []
+    if file_format == "csv":
+        reader = csv.DictReader(io.StringIO(content, newline=""))
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV file has no header row")
+        for row, record in enumerate(reader, start=1):
+            if None in record:
+                errors.append({"row": row, "field": None, "error": "has more cells than the header"})
+                continue
+            records.append((row, {key.strip(): value for key, value in record.items() if key}))
+    elif file_format == "jsonl":
+        for row, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                errors.append({"row": row, "field": None, "error": f"is not valid JSON: {exc.msg}"})
+                continue
+            if not isinstance(record, dict):
+                errors.append({"row": row, "field": None, "error": "must be a JSON object"})
+                continue
+            records.append((row, record))
+    else:
+        try:
+            document = json.loads(content)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f"File is not valid JSON: {exc.msg} at line {exc.lineno}")
+        if isinstance(document, dict):
+            document = document.get("schemes", document.get("rules"))
+        if not isinstance(document, list):
+            raise ImportFormatError("JSON file must be an array of objects or have a schemes array")
+        for row, record in enumerate(document, start=1):
+            if not isinstance(record, dict):
+                errors.append({"row": row, "field": None, "error": "must be a JSON object"})
+                continue
+            records.append((row, record))
+    return records, errors
+
+
+def validate_parallel(kind: str, records: List[Record], workers: int = 0, min_parallel: int = 5000):
+    """Validate records, fanning chunks out to worker processes for large files"""
+    if len(records) < min_parallel:
+        return validate_records(kind, records)
+    chunks = [records[i:i + CHUNK_RECORDS] for i in range(0, len(records), CHUNK_RECORDS)]
+    # spawn: the API process runs threads and holds DB connections
+    with ProcessPoolExecutor(max_workers=workers or None, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = []
+        for chunk in pool.map(validate_records, [kind] * len(chunks), chunks):
+            results.extend(chunk)
+    return results
+
+
+def _copy_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, list):
+        # PostgreSQL array literal with every element quoted
+        quoted = ('"' + item.replace("\\", "\\\\").replace('"', '\\"') + '"' for item in value)
+        return "{" + ",".join(quoted) + "}"
+    return value
+
+
+def _copy(cursor, table: str, columns: Tuple[str, ...], rows: List[Tuple]) -> None:
+    """Load rows with COPY; empty cells are NULL, which is why blanks were normalized to None"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else _copy_value(value) for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class CatalogueImport:
+    """One import: parsed and validated rows, then a single load transaction"""
+
+    def __init__(self, workers: int = 0, min_parallel: int = 5000):
+        self.workers = workers
+        self.min_parallel = min_parallel
+        self.started = time.perf_counter()
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.schemes: List[Tuple[int, Dict[str, Any]]] = []
+        self.rules: List[Tuple[int, Dict[str, Any]]] = []
+        self.scheme_columns: set = set()
+        self.rejected: set = set()
+        self.received = 0
+
+    def error(self, file: str, row: int, field: Optional[str], message: str, scheme_code: Optional[str] = None) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"file": file, "row": row, "scheme_code": scheme_code, "field": field, "error": message})
+
+    def add(self, kind: str, data: bytes, file_name: str) -> None:
+        records, parse_errors = parse_records(data, detect_format(file_name))
+        self.received += len(records) + len(parse_errors)
+        for problem in parse_errors:
+            self.error(kind, problem["row"], problem["field"], problem["error"])
+        if kind == "schemes":
+            for _, record in records:
+                self.scheme_columns.update(key for key in record if key in SCHEME_COLUMNS)
+
+        seen = set()
+        for row, clean, errors in validate_parallel(kind, records, self.workers, self.min_parallel):
+            code = clean.get("scheme_code")
+            for field, message in errors:
+                self.error(kind, row, field, message, code)
+            if errors:
+                self.rejected.add(code)
+                continue
+            if kind == "rules":
+                self.rules.append((row, clean))
+            elif code in seen:
+                self.error(kind, row, "scheme_code", "appears more than once in the file", code)
+            else:
+                seen.add(code)
+                self.schemes.append((row, clean))
+
+    def run(self, db: Session, dry_run: bool = False, atomic: bool = False) -> Dict[str, Any]:
+        codes = {clean["scheme_code"] for _, clean in self.schemes}
+        existing = self._existing_ids(db, codes | {clean["scheme_code"] for _, clean in self.rules})
+
+        # Rules replace a scheme's whole rule set, so loading only the valid
+        # ones would widen eligibility; hold back every scheme with a bad row
+        for row, clean in self.schemes:
+            if clean["scheme_code"] in self.rejected:
+                self.error("schemes", row, "scheme_code", "has invalid rules in this import", clean["scheme_code"])
+        self.schemes = [(row, clean) for row, clean in self.schemes if clean["scheme_code"] not in self.rejected]
+        codes -= self.rejected
+
+        # Rules may target schemes in this file or already in the catalogue
+        rules_by_code: Dict[str, List[Dict[str, Any]]] = {}
+        for row, clean in self.rules:
+            code = clean.pop("scheme_code")
+            if code in self.rejected:
+                self.error("rules", row, "scheme_code", "belongs to a scheme rejected in this import", code)
+                continue
+            if code not in codes and code not in existing:
+                self.error("rules", row, "scheme_code", "matches no scheme in this import or the catalogue", code)
+                continue
+            rules_by_code.setdefault(code, []).append(clean)
+        for _, clean in self.schemes:
+            nested = clean.pop("eligibility_rules", None)
+            if nested is not None:
+                rules_by_code.setdefault(clean["scheme_code"], []).extend(nested)
+
+        loaded = not dry_run and not (atomic and self.error_count)
+        counts = {"inserted": 0, "updated": 0, "rules": 0}
+        if loaded and (self.schemes or rules_by_code):
+            counts = self._load(db, existing, rules_by_code)
+
+        return {
+            "dry_run": dry_run,
+            "loaded": loaded,
+            "rows": self.received,
+            "schemes": {
+                "valid": len(self.schemes),
+                "inserted": counts["inserted"],
+                "updated": counts["updated"],
+            },
+            "rules": {
+                "valid": sum(len(rules) for rules in rules_by_code.values()),
+                "loaded": counts["rules"],
+            },
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "catalogue_version": current_version(db),
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+    @staticmethod
+    def _existing_ids(db: Session, codes) -> Dict[str, Any]:
+        if not codes:
+            return {}
+        rows = db.execute(
+            text("SELECT scheme_code, id FROM schemes WHERE scheme_code = ANY(:codes)"),
+            {"codes": list(codes)},
+        )
+        return dict(rows.all())
+
+    def _load(self, db: Session, existing: Dict[str, Any], rules_by_code: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Upsert schemes and replace their rules in one transaction, then log one change per scheme"""
+        cursor = db.connection().connection.dbapi_connection.cursor()
+        ids = dict(existing)
+        inserted = updated = 0
+        try:
+            if self.schemes:
+                # COPY cannot upsert, so stage the rows and merge them in one statement
+                cursor.execute("CREATE TEMP TABLE import_schemes (LIKE schemes INCLUDING DEFAULTS) ON COMMIT DROP")
+                staged = []
+                for _, clean in self.schemes:
+                    values = {**SCHEME_DEFAULTS, **clean}
+                    scheme_id = ids.get(clean["scheme_code"]) or uuid.uuid4()
+                    staged.append((str(scheme_id), *(values.get(column) for column in SCHEME_COLUMNS)))
+                _copy(cursor, "import_schemes", ("id",) + SCHEME_COLUMNS, staged)
+
+                # Columns missing from the file keep their current values on existing schemes
+                updates = [column for column in SCHEME_COLUMNS if column in self.scheme_columns and column != "scheme_code"]
+                assignments = ", ".join([f"{column} = EXCLUDED.{column}" for column in updates] + ["updated_at = now()"])
+                columns = ", ".join(("id",) + SCHEME_COLUMNS)
+                cursor.execute(
+                    f"INSERT INTO schemes ({columns}) SELECT {columns} FROM import_schemes "
+                    f"ON CONFLICT (scheme_code) DO UPDATE SET {assignments} "
+                    "RETURNING scheme_code, id, (xmax = 0)"
+                )
+                for code, scheme_id, is_new in cursor.fetchall():
+                    ids[code] = scheme_id
+                    inserted += is_new
+                    updated += not is_new
+
+            rules = []
+            if rules_by_code:
+                cursor.execute(
+                    "DELETE FROM eligibility_rules WHERE scheme_id = ANY(%s::uuid[])",
+                    ([str(ids[code]) for code in rules_by_code],),
+                )
+                for code, scheme_rules in rules_by_code.items():
+                    for rule in scheme_rules:
+                        rules.append((str(uuid.uuid4()), str(ids[code]), *(rule[column] for column in RULE_COLUMNS[2:])))
+                _copy(cursor, "eligibility_rules", RULE_COLUMNS, rules)
+        finally:
+            cursor.close()
+
+        changed = {ids[code] for code in [clean["scheme_code"] for _, clean in self.schemes] + list(rules_by_code)}
+        # One change-log row per scheme and a single catalogue version bump at commit
+        record_changes(db, {scheme_id: UPSERT for scheme_id in changed})
+        db.commit()
+        # Bulk statements bypass the ORM hook that reschedules dated schemes
+        scheme_lifecycle.reload()
+
+        for scheme_id in changed:
+            enqueue_scheme_presynthesis(scheme_id)
+        logger.info(f"Imported {inserted} new and {updated} updated schemes with {len(rules)} rules")
+        return {"inserted": inserted, "updated": updated, "rules": len(rules)}
+
+
+def import_catalogue(
+    db: Session,
+    schemes: Optional[Tuple[bytes, str]] = None,
+    rules: Optional[Tuple[bytes, str]] = None,
+    dry_run: bool = False,
+    atomic: bool = False,
+) -> Dict[str, Any]:
+    """Validate and load (data, file_name) scheme and rule files; returns the import report
+
+    Valid rows are loaded in one transaction and invalid rows are reported,
+    unless atomic is set, in which case any error loads nothing.
+    """
+    job = CatalogueImport(workers=settings.IMPORT_WORKERS, min_parallel=settings.IMPORT_PARALLEL_MIN_ROWS)
+    if schemes is not None:
+        job.add("schemes", *schemes)
+    if rules is not None:
+        job.add("rules", *rules)
+    return job.run(db, dry_run=dry_run, atomic=atomic)
@@ -0,0 +1,275 @@
+import gzip
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import event, func, insert, inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.jobs import PRIORITY_BULK, job_queue
+from app.services.storage import ObjectStorage, create_storage
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# pg_advisory_xact_lock key held by every transaction that logs catalogue changes
+CHANGE_LOG_LOCK = 0x5C4E3E
+
+SYNC_SCHEME_COLUMNS = [
+    column for column in models.Scheme.__table__.columns if column.key != "created_at"
+]
+SYNC_RULE_COLUMNS = [
+    column for column in models.EligibilityRule.__table__.columns if column.key != "created_at"
+]
+
+
+def record_changes(session: Session, changes: Dict[Any, str]) -> None:
+    """Append change-log rows for scheme ids in the session's transaction
+
+    Called from the flush hook for ORM changes; bulk statements that bypass
+    the ORM must call it themselves.
+    """
+    if not changes:
+        return
+    connection = session.connection()
+    if not session.info.get("catalogue_log_locked"):
+        # Held until commit: a version allocated later can never become
+        # visible before an earlier one, so a client's cursor never skips a change
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK})
+        session.info["catalogue_log_locked"] = True
+    connection.execute(
+        insert(models.CatalogueChange),
+        [{"scheme_id": scheme_id, "operation": operation} for scheme_id, operation in changes.items()],
+    )
+    session.info["catalogue_changed"] = True
+    session.info["catalogue_logged"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _log_catalogue_changes(session, flush_context):
+    changes: Dict[Any, str] = {}
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, models.Scheme):
+            if obj in session.new or session.is_modified(obj, include_collections=False):
+                changes.setdefault(obj.id, UPSERT)
+        elif isinstance(obj, models.EligibilityRule):
+            if obj in session.new or session.is_modified(obj, include_collections=False):
+                # A rule moved between schemes changes both of them
+                for scheme_id in inspect(obj).attrs.scheme_id.history.sum():
+                    if scheme_id is not None:
+                        changes.setdefault(scheme_id, UPSERT)
+    for obj in session.deleted:
+        if isinstance(obj, models.Scheme):
+            changes[obj.id] = DELETE
+        elif isinstance(obj, models.EligibilityRule) and obj.scheme_id is not None:
+            changes.setdefault(obj.scheme_id, UPSERT)
+    record_changes(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _snapshot_on_commit(session):
+    session.info.pop("catalogue_log_locked", None)
+    if session.info.pop("catalogue_logged", False):
+        enqueue_catalogue_snapshot(delay=settings.CATALOGUE_SNAPSHOT_INTERVAL_SECONDS)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("catalogue_log_locked", None)
+    session.info.pop("catalogue_logged", None)
+
+
+def _serialize(db: Session, scheme_ids: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+    """Active schemes with their eligibility rules embedded, as plain dicts"""
+    query = db.query(*SYNC_SCHEME_COLUMNS).filter(models.Scheme.is_active == True)
+    rules_query = db.query(*SYNC_RULE_COLUMNS).join(models.Scheme).filter(models.Scheme.is_active == True)
+    if scheme_ids is not None:
+        scheme_ids = list(scheme_ids)
+        query = query.filter(models.Scheme.id.in_(scheme_ids))
+        rules_query = rules_query.filter(models.EligibilityRule.scheme_id.in_(scheme_ids))
+
+    rules = defaultdict(list)
+    for rule in rules_query.order_by(models.EligibilityRule.priority):
+        rule = rule._asdict()
+        rules[rule.pop("scheme_id")].append(rule)
+    schemes = []
+    for scheme in query.order_by(models.Scheme.id):
+        scheme = scheme._asdict()
+        scheme["eligibility_rules"] = rules.get(scheme["id"], [])
+        schemes.append(scheme)
+    return schemes
+
+
+def current_version(db: Session) -> int:
+    return db.query(func.coalesce(func.max(models.CatalogueChange.version), 0)).scalar()
+
+
+def changes_since(db: Session, since: int, limit: int) -> Dict[str, Any]:
+    """Schemes changed after version since, oldest change first
+
+    Each scheme appears once, in its latest state, so the cost follows the
+    number of changed schemes rather than the size of the catalogue. Removed
+    or deactivated schemes come back as bare ids in deleted.
+    """
+    latest = db.execute(
+        text(
+            """
+            SELECT scheme_id, version, operation FROM (
+                SELECT DISTINCT ON (scheme_id) scheme_id, version, operation
+                FROM catalogue_changes
+                WHERE version > :since
+                ORDER BY scheme_id, version DESC
+            ) latest
+            ORDER BY version
+            LIMIT :limit
+            """
+        ),
+        {"since": since, "limit": limit + 1},
+    ).all()
+    has_more = len(latest) > limit
+    latest = latest[:limit]
+
+    # Rows are read after the log, so a scheme may already be newer than its
+    # version here; the next sync sends it again, and applying it is idempotent
+    upserted = [row.scheme_id for row in latest if row.operation == UPSERT]
+    schemes = _serialize(db, upserted) if upserted else []
+    present = {scheme["id"] for scheme in schemes}
+    return {
+        "version": latest[-1].version if latest else since,
+        "has_more": has_more,
+        "schemes": schemes,
+        "deleted": [row.scheme_id for row in latest if row.scheme_id not in present],
+    }
+
+
+class CatalogueSnapshots:
+    """Gzipped full catalogue files that new clients download before syncing
+
+    The manifest names the latest file. Files are keyed by version and never
+    change, so they can be served from storage or a CDN with long caching.
+    Every process re-reads the manifest at most manifest_ttl seconds apart,
+    and a replaced file is deleted only once no process can still hold a
+    manifest naming it.
+    """
+
+    MANIFEST_KEY = "catalogue/latest.json"
+
+    def __init__(self, storage: ObjectStorage, session_factory=SessionLocal, manifest_ttl: float = 60.0):
+        self.storage = storage
+        self.session_factory = session_factory
+        self.manifest_ttl = manifest_ttl
+        self._latest: Optional[Dict[str, Any]] = None
+        self._expires = 0.0
+        self._loaded: Optional[Tuple[str, List[Dict[str, Any]]]] = None
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not self.storage.exists(self.MANIFEST_KEY):
+            return None
+        return orjson.loads(self.storage.get(self.MANIFEST_KEY))
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        if time.monotonic() >= self._expires:
+            try:
+                self._latest = self._read_manifest()
+            except Exception as exc:
+                logger.warning(f"Could not read the catalogue snapshot manifest, keeping the last one: {exc}")
+            self._expires = time.monotonic() + self.manifest_ttl
+        return self._latest
+
+    def url(self, manifest: Dict[str, Any]) -> str:
+        return self.storage.url(manifest["key"])
+
+    def schemes(self) -> Optional[List[Dict[str, Any]]]:
+        """Active schemes in the latest snapshot, held in memory until the next one"""
+        manifest = self.latest()
+        if manifest is None:
+            return None
+        loaded = self._loaded
+        if loaded is None or loaded[0] != manifest["key"]:
+            document = orjson.loads(gzip.decompress(self.storage.get(manifest["key"])))
+            loaded = self._loaded = (manifest["key"], document["schemes"])
+        return loaded[1]
+
+    def build(self) -> Dict[str, Any]:
+        """Write a snapshot of the catalogue unless the latest one is current"""
+        db = self.session_factory()
+        try:
+            # One snapshot for the version and the rows, so they agree
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            version = current_version(db)
+            # The manifest in storage, not this process's cached view: another
+            # process may have replaced it since
+            previous = self._read_manifest()
+            if previous is not None and previous["version"] >= version:
+                self._latest, self._expires = previous, time.monotonic() + self.manifest_ttl
+                return previous
+            schemes = _serialize(db)
+        finally:
+            db.close()
+
+        now = datetime.utcnow()
+        # previous["key"] stays for clients still downloading it. The file
+        # before it stopped being current when previous was written; processes
+        # may name it until their cached manifest expires, so it waits until then.
+        retired = list(previous.get("retired", [])) if previous else []
+        if previous and previous.get("previous_key"):
+            retired.append({"key": previous["previous_key"], "retired_at": previous["created_at"]})
+        expired = [
+            entry for entry in retired
+            if (now - datetime.fromisoformat(entry["retired_at"])).total_seconds() >= self.manifest_ttl
+        ]
+
+        body = gzip.compress(dumps({"version": version, "schemes": schemes}))
+        manifest = {
+            "version": version,
+            "key": f"catalogue/snapshot-{version}.json.gz",
+            "size": len(body),
+            "schemes": len(schemes),
+            "created_at": now.isoformat(),
+            "previous_key": previous["key"] if previous else None,
+            "retired": [entry for entry in retired if entry not in expired],
+        }
+        self.storage.put(manifest["key"], body, "application/gzip")
+        self.storage.put(self.MANIFEST_KEY, dumps(manifest), "application/json")
+        self._latest, self._expires = manifest, time.monotonic() + self.manifest_ttl
+        for entry in expired:
+            if entry["key"] not in (manifest["key"], manifest["previous_key"]):
+                self.storage.delete(entry["key"])
+        logger.info(f"Wrote catalogue snapshot at version {version}: {len(schemes)} schemes, {len(body)} bytes")
+        return manifest
+
+
+catalogue_snapshots = CatalogueSnapshots(
+    create_storage(settings.S3_BUCKET_ASSETS, base_url=f"{settings.API_V1_PREFIX}/schemes/sync/files/"),
+    manifest_ttl=settings.CATALOGUE_SNAPSHOT_MANIFEST_TTL_SECONDS,
+)
+
+
+SNAPSHOT_CATALOGUE = "snapshot_catalogue"
+
+
+def _snapshot_catalogue(payload: Dict[str, Any]) -> None:
+    catalogue_snapshots.build()
+
+
+job_queue.register(SNAPSHOT_CATALOGUE, _snapshot_catalogue)
+
+
+def enqueue_catalogue_snapshot(delay: float = 0.0) -> bool:
+    """Rebuild the snapshot after delay, coalescing the changes made meanwhile"""
+    return job_queue.enqueue(
+        SNAPSHOT_CATALOGUE,
+        key=SNAPSHOT_CATALOGUE,
+        payload={},
+        priority=PRIORITY_BULK,
+        delay=delay,
+    )
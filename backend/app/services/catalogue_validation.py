@@ -0,0 +1,326 @@
+import unicodedata
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+# Runs inside catalogue import worker processes; keep database and web
+# imports out of this module so workers start quickly.
+
+# Rule type -> the UserProfile attribute it is evaluated against
+RULE_PROFILE_FIELDS = {
+    "age": "age",
+    "income": "annual_income",
+    "gender": "gender",
+    "state": "state",
+    "district": "district",
+    "caste": "caste_category",
+    "occupation": "occupation",
+    "family_size": "family_size",
+    "is_bpl": "is_bpl",
+    "has_disability": "has_disability",
+    "education": "education_level",
+    "land_ownership": "land_ownership",
+}
+
+# Profile fields by kind. Numbers map to their decimal places in the database,
+# which decide the str() that IN rules are compared against.
+NUMERIC_SCALES = {"age": 0, "annual_income": 2, "family_size": 0, "land_ownership": 2}
+FLAG_FIELDS = ("is_bpl", "has_disability")
+CATEGORICAL_FIELDS = ("gender", "state", "district", "caste_category", "occupation", "education_level")
+
+OPERATORS = (">", "<", ">=", "<=", "=", "BETWEEN", "IN")
+
+# Plausible bounds for rule values, per profile field
+VALUE_RANGES = {
+    "age": (0, 120),
+    "annual_income": (0, None),
+    "family_size": (1, 50),
+    "land_ownership": (0, None),
+    "is_bpl": (0, 1),
+    "has_disability": (0, 1),
+}
+
+# DECIMAL(12, 2) columns hold values below this
+MAX_AMOUNT = Decimal(10) ** 10
+
+SCHEME_TEXT_LIMITS = {
+    "scheme_code": 100,
+    "name": 500,
+    "department": 255,
+    "category": 100,
+    "benefit_type": 100,
+    "state": 100,
+}
+SCHEME_TEXT_FIELDS = (
+    "name_hi", "name_mr", "name_ta",
+    "description", "description_hi", "description_mr", "description_ta",
+    "application_url", "document_url",
+)
+REQUIRED_SCHEME_FIELDS = ("scheme_code", "name", "description", "department", "category", "benefit_type")
+
+# Unicode block each translation must be written in
+LANGUAGE_SCRIPTS = {
+    "hi": (0x0900, 0x097F),
+    "mr": (0x0900, 0x097F),
+    "ta": (0x0B80, 0x0BFF),
+}
+
+TRUE_VALUES = ("true", "t", "yes", "y", "1")
+FALSE_VALUES = ("false", "f", "no", "n", "0")
+
+
+class InvalidRuleError(ValueError):
+    """Raised for a rule the matcher could never evaluate"""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(message)
+        self.field = field
+
+
+def canonical_number(item: str, scale: int) -> Optional[Decimal]:
+    """item as a number if it is exactly how the matcher would str() a profile value"""
+    try:
+        value = Decimal(item)
+    except InvalidOperation:
+        return None
+    if value.is_finite() and str(value.quantize(Decimal(1).scaleb(-scale))) == item:
+        return value
+    return None
+
+
+def validate_rule(rule: Any) -> None:
+    """Reject rules that would never match or would fail in the matcher"""
+    field = RULE_PROFILE_FIELDS.get(rule.rule_type)
+    if field is None:
+        raise InvalidRuleError("rule_type", f"Unknown rule type: {rule.rule_type}")
+    if rule.operator not in OPERATORS:
+        raise InvalidRuleError("operator", f"Unknown operator: {rule.operator}")
+    if rule.operator == "IN":
+        if not rule.value_list:
+            raise InvalidRuleError("value_list", "IN rules need value_list")
+        return
+    if field in CATEGORICAL_FIELDS:
+        raise InvalidRuleError("operator", f"{rule.rule_type} rules support only the IN operator")
+    if rule.operator in (">", ">=", "=", "BETWEEN") and rule.value_min is None:
+        raise InvalidRuleError("value_min", f"{rule.operator} rules need value_min")
+    if rule.operator in ("<", "<=", "BETWEEN") and rule.value_max is None:
+        raise InvalidRuleError("value_max", f"{rule.operator} rules need value_max")
+
+
+class _Rule:
+    """Attribute view of a rule record for validate_rule"""
+
+    def __init__(self, record: Dict[str, Any]):
+        self.rule_type = record.get("rule_type")
+        self.operator = record.get("operator")
+        self.value_min = record.get("value_min")
+        self.value_max = record.get("value_max")
+        self.value_list = record.get("value_list")
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError("must be text")
+    return value.strip()
+
+
+def _bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("must be true or false")
+
+
+def _amount(value: Any) -> Decimal:
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError("must be a number")
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        raise ValueError("is out of range")
+    if amount.as_tuple().exponent < -2:
+        raise ValueError("has more than 2 decimal places")
+    return amount
+
+
+def _date(value: Any) -> date:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError("must be a date (YYYY-MM-DD)")
+
+
+def _check_script(text: str, language: str) -> None:
+    low, high = LANGUAGE_SCRIPTS[language]
+    letters = [c for c in text if unicodedata.category(c)[0] in ("L", "M")]
+    native = sum(1 for c in letters if low <= ord(c) <= high)
+    # Translations often keep acronyms and scheme codes in Latin script
+    if letters and native * 2 < len(letters):
+        raise ValueError(f"is not written in the {language} script")
+
+
+def validate_scheme(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+    """Normalize a scheme record; returns (clean, [(field, error)])"""
+    clean: Dict[str, Any] = {}
+    errors: List[Tuple[str, str]] = []
+
+    def check(field: str, convert) -> None:
+        value = record.get(field)
+        if _blank(value):
+            if field in REQUIRED_SCHEME_FIELDS:
+                errors.append((field, "is required"))
+            elif field in record:
+                clean[field] = None
+            return
+        try:
+            clean[field] = convert(value)
+        except ValueError as exc:
+            errors.append((field, str(exc)))
+
+    for field, limit in SCHEME_TEXT_LIMITS.items():
+        check(field, _text)
+        if clean.get(field) and len(clean[field]) > limit:
+            errors.append((field, f"is longer than {limit} characters"))
+    for field in SCHEME_TEXT_FIELDS:
+        check(field, _text)
+    check("benefit_amount", _amount)
+    check("is_central", _bool)
+    check("is_active", _bool)
+    check("start_date", _date)
+    check("end_date", _date)
+
+    if clean.get("benefit_amount") is not None and clean["benefit_amount"] < 0:
+        errors.append(("benefit_amount", "must not be negative"))
+    if clean.get("start_date") and clean.get("end_date") and clean["start_date"] > clean["end_date"]:
+        errors.append(("end_date", "is before start_date"))
+    for field in ("application_url", "document_url"):
+        if clean.get(field) and not clean[field].startswith(("https://", "http://")):
+            errors.append((field, "must be an http(s) URL"))
+    for language in LANGUAGE_SCRIPTS:
+        for field in (f"name_{language}", f"description_{language}"):
+            if clean.get(field):
+                try:
+                    _check_script(clean[field], language)
+                except ValueError as exc:
+                    errors.append((field, str(exc)))
+    return clean, errors
+
+
+def validate_rule_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+    """Normalize an eligibility rule record; returns (clean, [(field, error)])"""
+    clean: Dict[str, Any] = {
+        "rule_type": None if _blank(record.get("rule_type")) else str(record["rule_type"]).strip(),
+        "operator": None if _blank(record.get("operator")) else str(record["operator"]).strip().upper(),
+        "value_min": None,
+        "value_max": None,
+        "value_list": None,
+        "is_mandatory": True,
+        "priority": 0,
+    }
+    errors: List[Tuple[str, str]] = []
+    for field in ("value_min", "value_max"):
+        if not _blank(record.get(field)):
+            try:
+                clean[field] = _amount(record[field])
+            except ValueError as exc:
+                errors.append((field, str(exc)))
+    if not _blank(record.get("is_mandatory")):
+        try:
+            clean["is_mandatory"] = _bool(record["is_mandatory"])
+        except ValueError as exc:
+            errors.append(("is_mandatory", str(exc)))
+    if not _blank(record.get("priority")):
+        try:
+            clean["priority"] = int(str(record["priority"]).strip())
+        except ValueError:
+            errors.append(("priority", "must be a whole number"))
+
+    items = record.get("value_list")
+    if isinstance(items, str):
+        # Spreadsheet cells list values separated by |
+        items = items.split("|") if items.strip() else None
+    if items is not None:
+        if not isinstance(items, list):
+            errors.append(("value_list", "must be a list"))
+        else:
+            items = [str(item).strip() for item in items]
+            if any(not item for item in items):
+                errors.append(("value_list", "contains an empty value"))
+            elif len(set(items)) != len(items):
+                errors.append(("value_list", "contains duplicates"))
+            clean["value_list"] = items or None
+    if errors:
+        return clean, errors
+
+    try:
+        validate_rule(_Rule(clean))
+    except InvalidRuleError as exc:
+        return clean, [(exc.field, str(exc))]
+
+    field = RULE_PROFILE_FIELDS[clean["rule_type"]]
+    low, high = VALUE_RANGES.get(field, (None, None))
+    for name in ("value_min", "value_max"):
+        value = clean[name]
+        if value is not None and ((low is not None and value < low) or (high is not None and value > high)):
+            errors.append((name, f"is outside the plausible range for {clean['rule_type']}"))
+    if clean["operator"] == "BETWEEN" and not errors and clean["value_min"] > clean["value_max"]:
+        errors.append(("value_max", "is below value_min"))
+    if clean["operator"] == "IN":
+        # The matcher compares str(profile value), so other spellings never match
+        if field in FLAG_FIELDS:
+            bad = [item for item in clean["value_list"] if item not in ("True", "False")]
+        elif field in NUMERIC_SCALES:
+            bad = [item for item in clean["value_list"] if canonical_number(item, NUMERIC_SCALES[field]) is None]
+        else:
+            bad = []
+        if bad:
+            errors.append(("value_list", f"values would never match a {clean['rule_type']}: {', '.join(bad[:5])}"))
+    return clean, errors
+
+
+def validate_records(kind: str, records: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any], List[Tuple[str, str]]]]:
+    """Validate a chunk of (row, record) pairs; the unit of work for import workers
+
+    Scheme records may nest their rules under eligibility_rules; rule errors
+    are reported against the scheme's row with an indexed field name.
+    """
+    results = []
+    for row, record in records:
+        if kind == "rules":
+            clean, errors = validate_rule_record(record)
+            code = record.get("scheme_code")
+            if _blank(code):
+                errors.append(("scheme_code", "is required"))
+            else:
+                clean["scheme_code"] = str(code).strip()
+            results.append((row, clean, errors))
+            continue
+
+        clean, errors = validate_scheme(record)
+        rules = record.get("eligibility_rules")
+        if rules is not None:
+            if not isinstance(rules, list):
+                errors.append(("eligibility_rules", "must be a list"))
+            else:
+                clean["eligibility_rules"] = []
+                for index, rule in enumerate(rules):
+                    if not isinstance(rule, dict):
+                        errors.append((f"eligibility_rules[{index}]", "must be an object"))
+                        continue
+                    rule_clean, rule_errors = validate_rule_record(rule)
+                    clean["eligibility_rules"].append(rule_clean)
+                    errors.extend((f"eligibility_rules[{index}].{field}", error) for field, error in rule_errors)
+        results.append((row, clean, errors))
+    return results
@@ -0,0 +1,57 @@
+import io
+import signal
+from typing import List
+
+from app.core.config import settings
+from app.services.storage import create_storage
+
+# Runs inside document pipeline worker processes; keep database and web
+# imports out of this module so workers start quickly.
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+TEXT_TYPES = ("text/plain", "text/markdown", "text/csv")
+
+
+class ExtractionTimeout(Exception):
+    """Raised in the worker when a document exceeds its time budget"""
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("Document extraction timed out")
+
+
+def _pdf_pages(data: bytes) -> List[str]:
+    if PdfReader is None:
+        raise RuntimeError("PDF extraction needs pypdf installed")
+    reader = PdfReader(io.BytesIO(data))
+    pages = []
+    for page in reader.pages:
+        # One page at a time, so a huge PDF never holds more than one page of layout
+        pages.append((page.extract_text() or "").strip())
+    return pages
+
+
+def extract_pages(key: str, file_type: str, timeout: float) -> List[str]:
+    """Read a stored document and return the text of each page
+
+    Runs in a pool worker, where tasks execute on the main thread, so the
+    timeout is enforced with an interval timer that interrupts the parser.
+    """
+    use_alarm = timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        data = create_storage(settings.S3_BUCKET_DOCUMENTS).get(key)
+        if file_type == "application/pdf":
+            return _pdf_pages(data)
+        if file_type in TEXT_TYPES:
+            return [data.decode("utf-8", errors="replace")]
+        raise ValueError(f"Unsupported document type {file_type}")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
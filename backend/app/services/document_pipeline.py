@@ -0,0 +1,321 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import delete, text, update
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.document_extraction import extract_pages
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Called with (document_id, scheme_id, text) once a document's text is committed
+DocumentIndexer = Callable[[Any, Any, str], None]
+
+# Claims unfinished documents nobody holds, or whose holder has gone quiet.
+# SKIP LOCKED keeps concurrent claimers off each other's rows, and the guarded
+# upsert means a claim taken meanwhile is never taken over.
+CLAIM_UNFINISHED = text("""
+    WITH candidates AS (
+        SELECT d.id FROM scheme_documents d
+        LEFT JOIN document_claims c ON c.document_id = d.id
+        WHERE d.processing_status IN ('pending', 'processing')
+          AND (c.document_id IS NULL OR c.claimed_at < now() - make_interval(secs => :timeout))
+        ORDER BY d.created_at
+        LIMIT :limit
+        FOR UPDATE OF d SKIP LOCKED
+    ), claimed AS (
+        INSERT INTO document_claims (document_id, claimed_at)
+        SELECT id, now() FROM candidates
+        ON CONFLICT (document_id) DO UPDATE SET claimed_at = excluded.claimed_at
+        WHERE document_claims.claimed_at < now() - make_interval(secs => :timeout)
+        RETURNING document_id
+    )
+    SELECT d.id, d.scheme_id, d.s3_key, d.file_type
+    FROM scheme_documents d JOIN claimed ON claimed.document_id = d.id
+""")
+
+
+class DocumentTask:
+    """A stored document waiting for text extraction"""
+
+    __slots__ = ("document_id", "scheme_id", "key", "file_type", "attempts")
+
+    def __init__(self, document_id, scheme_id, key: str, file_type: str, attempts: int = 0):
+        self.document_id = document_id
+        self.scheme_id = scheme_id
+        self.key = key
+        self.file_type = file_type
+        self.attempts = attempts
+
+
+class DocumentPipeline:
+    """Extracts text from uploaded scheme documents on a pool of worker processes
+
+    Extraction is CPU-bound, so it runs in separate processes and scales with
+    cores without touching the API event loop. Each document gets a time budget
+    and a bounded number of attempts. Status changes are buffered per document
+    and written in batches; a document that finishes before the next flush is
+    written once, straight to its final state.
+
+    Every API process runs a pipeline. A document is extracted only by the
+    process holding its claim; unfinished documents whose claim has lapsed,
+    e.g. because their process died, are picked up by whichever process
+    claims them first.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        max_attempts: int = 3,
+        timeout: float = 120.0,
+        flush_interval: float = 1.0,
+        batch_size: int = 100,
+        claim_timeout: float = 900.0,
+        session_factory=SessionLocal,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self.session_factory = session_factory
+        self.indexers: List[DocumentIndexer] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._updates: Dict[Any, Dict[str, Any]] = {}
+        self._updates_lock = threading.Lock()
+        self._flush_now = threading.Event()
+        self._stopping = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # Documents this process has claimed and not yet finished
+        self._claimed: Set[Any] = set()
+        self._claimed_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register_indexer(self, indexer: DocumentIndexer) -> None:
+        self.indexers.append(indexer)
+
+    def start(self) -> None:
+        if self._flusher is not None:
+            return
+        self._stopping.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="document-status", daemon=True)
+        self._flusher.start()
+        self._resume()
+
+    def stop(self) -> None:
+        """Write buffered status changes and stop, giving up claims on unfinished documents"""
+        if self._flusher is None:
+            return
+        self._stopping.set()
+        self._flush_now.set()
+        self._flusher.join()
+        self._flusher = None
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+        self._release_claims()
+
+    def claim(self, db, document_id) -> None:
+        """Claim a new document in the caller's transaction, before submit"""
+        db.add(models.DocumentClaim(document_id=document_id))
+
+    def submit(self, document_id, scheme_id, key: str, file_type: str) -> None:
+        with self._claimed_lock:
+            self._claimed.add(document_id)
+        self._set_status(document_id, {"processing_status": PROCESSING})
+        self._dispatch(DocumentTask(document_id, scheme_id, key, file_type))
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads and DB connections is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers or None, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _dispatch(self, task: DocumentTask) -> None:
+        if self._stopping.is_set():
+            return
+        try:
+            future = self._pool().submit(extract_pages, task.key, task.file_type, self.timeout)
+        except BrokenProcessPool:
+            self._replace_pool()
+            future = self._pool().submit(extract_pages, task.key, task.file_type, self.timeout)
+        future.add_done_callback(lambda done: self._finished(task, done))
+
+    def _replace_pool(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _finished(self, task: DocumentTask, future: Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.completed += 1
+            self._unclaim(task.document_id)
+            self._set_status(task.document_id, {
+                "processing_status": COMPLETED,
+                "extracted_text": "\n\n".join(page for page in future.result() if page),
+                "processed_at": datetime.utcnow(),
+            }, task)
+            return
+
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. a parser crash); every in-flight document lands here
+            self._replace_pool()
+        task.attempts += 1
+        logger.warning(f"Extraction of document {task.document_id} failed (attempt {task.attempts}): {error}")
+        if task.attempts < self.max_attempts:
+            self.retried += 1
+            timer = threading.Timer(2 ** task.attempts, self._dispatch, args=(task,))
+            timer.daemon = True
+            timer.start()
+            return
+        self.failed += 1
+        self._unclaim(task.document_id)
+        self._set_status(task.document_id, {
+            "processing_status": FAILED,
+            "processed_at": datetime.utcnow(),
+        })
+
+    def _set_status(self, document_id, values: Dict[str, Any], task: Optional[DocumentTask] = None) -> None:
+        with self._updates_lock:
+            self._updates[document_id] = {"id": document_id, **values, "task": task}
+            full = len(self._updates) >= self.batch_size
+        if full:
+            self._flush_now.set()
+
+    def _unclaim(self, document_id) -> None:
+        with self._claimed_lock:
+            self._claimed.discard(document_id)
+
+    def _flush_loop(self) -> None:
+        last_resume = time.monotonic()
+        while not self._stopping.is_set():
+            self._flush_now.wait(self.flush_interval)
+            self._flush_now.clear()
+            self._flush()
+            if time.monotonic() - last_resume >= self.claim_timeout:
+                # Pick up documents whose process died since the last look
+                last_resume = time.monotonic()
+                self._resume()
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._updates_lock:
+            updates, self._updates = list(self._updates.values()), {}
+        if not updates:
+            return
+
+        indexed = [row.pop("task") for row in updates]
+        # Bulk UPDATE by primary key needs the same columns in every row of a batch
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in updates:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        finished = [row["id"] for row in updates if row.get("processing_status") in (COMPLETED, FAILED)]
+        db = self.session_factory()
+        try:
+            for rows in groups.values():
+                db.execute(update(models.SchemeDocument), rows)
+            if finished:
+                db.execute(delete(models.DocumentClaim).where(models.DocumentClaim.document_id.in_(finished)))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Failed to write {len(updates)} document status updates: {exc}")
+            with self._updates_lock:
+                # Retry on the next flush unless a newer status has arrived meanwhile
+                for row, task in zip(updates, indexed):
+                    self._updates.setdefault(row["id"], {**row, "task": task})
+            return
+        finally:
+            db.close()
+
+        for row, task in zip(updates, indexed):
+            if task is None:
+                continue
+            for indexer in self.indexers:
+                try:
+                    indexer(task.document_id, task.scheme_id, row["extracted_text"])
+                except Exception as exc:
+                    logger.error(f"Indexer failed for document {task.document_id}: {exc}")
+
+    def _resume(self) -> None:
+        """Claim and requeue unfinished documents no live process is working on"""
+        db = self.session_factory()
+        try:
+            while not self._stopping.is_set():
+                documents = db.execute(
+                    CLAIM_UNFINISHED, {"timeout": self.claim_timeout, "limit": self.batch_size}
+                ).all()
+                db.commit()
+                for document in documents:
+                    if document.id in self._claimed:
+                        # Still ours, just slow; the claim is renewed, not doubled
+                        continue
+                    self.submit(document.id, document.scheme_id, document.s3_key, document.file_type)
+                if len(documents) < self.batch_size:
+                    break
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Could not resume document processing: {exc}")
+        finally:
+            db.close()
+
+    def _release_claims(self) -> None:
+        """Let the next process resume our unfinished documents without waiting out the timeout"""
+        with self._claimed_lock:
+            claimed, self._claimed = list(self._claimed), set()
+        if not claimed:
+            return
+        db = self.session_factory()
+        try:
+            db.execute(delete(models.DocumentClaim).where(models.DocumentClaim.document_id.in_(claimed)))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.warning(f"Could not release {len(claimed)} document claims: {exc}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "unflushed": len(self._updates),
+            "claimed": len(self._claimed),
+        }
+
+
+document_pipeline = DocumentPipeline(
+    workers=settings.DOCUMENT_WORKERS,
+    max_attempts=settings.DOCUMENT_MAX_ATTEMPTS,
+    timeout=settings.DOCUMENT_TIMEOUT_SECONDS,
+    flush_interval=settings.DOCUMENT_STATUS_FLUSH_INTERVAL_SECONDS,
+    batch_size=settings.DOCUMENT_STATUS_BATCH_SIZE,
+    claim_timeout=settings.DOCUMENT_CLAIM_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionIngestor:
+    """Buffers UserInteraction events and writes them in batched multi-row inserts"""
+
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        session_factory=SessionLocal,
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """Start the background flush loop on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Drain buffered events to the database and stop the flush loop"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    def record_nowait(
+        self,
+        interaction_type: str,
+        user_id: Optional[UUID] = None,
+        scheme_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Buffer an event without waiting; returns False if it had to be dropped"""
+        if not self.running:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(self._row(interaction_type, user_id, scheme_id, metadata))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def record(
+        self,
+        interaction_type: str,
+        user_id: Optional[UUID] = None,
+        scheme_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Buffer an event, waiting for queue space when the buffer is full"""
+        if not self.running:
+            self.dropped += 1
+            return
+        await self._queue.put(self._row(interaction_type, user_id, scheme_id, metadata))
+
+    def _row(self, interaction_type, user_id, scheme_id, metadata) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "scheme_id": scheme_id,
+            "interaction_type": interaction_type,
+            "metadata": metadata,
+        }
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Collect until the batch is full, the interval elapses or stop is requested
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not None:
+                        batch.append(item)
+
+            for start in range(0, len(batch), self.batch_size):
+                await self._flush(batch[start:start + self.batch_size])
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.written += len(batch)
+        except Exception as exc:
+            self.dropped += len(batch)
+            logger.error(f"Failed to write {len(batch)} interaction events: {exc}")
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # executemany on a single INSERT lets SQLAlchemy emit multi-row VALUES batches
+        db = self.session_factory()
+        try:
+            db.execute(insert(models.UserInteraction.__table__), batch)
+            db.commit()
+        finally:
+            db.close()
+
+
+interaction_ingestor = InteractionIngestor(
+    max_queue_size=settings.INTERACTION_QUEUE_MAX_SIZE,
+    batch_size=settings.INTERACTION_FLUSH_BATCH_SIZE,
+    flush_interval=settings.INTERACTION_FLUSH_INTERVAL_SECONDS,
+)
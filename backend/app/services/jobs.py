@@ -0,0 +1,326 @@
+import heapq
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: user-initiated refreshes jump ahead of bulk re-scoring
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+
+class Job:
+    """A unit of background work, coalesced on its key while pending"""
+
+    __slots__ = ("id", "job_type", "key", "payload", "priority", "run_at", "attempts")
+
+    def __init__(
+        self,
+        job_type: str,
+        key: str,
+        payload: Dict[str, Any],
+        priority: int,
+        run_at: float,
+        attempts: int = 0,
+        id: Optional[int] = None,
+    ):
+        self.id = id
+        self.job_type = job_type
+        self.key = key
+        self.payload = payload
+        self.priority = priority
+        self.run_at = run_at
+        self.attempts = attempts
+
+
+class JobBackend:
+    """Interface for job stores"""
+
+    def push(self, job: Job) -> bool:
+        """Store a job; returns False if it was merged into a pending job with the same key"""
+        raise NotImplementedError
+
+    def pop(self, now: float) -> Optional[Job]:
+        """Claim the highest-priority job that is due, if any"""
+        raise NotImplementedError
+
+    def next_run_at(self) -> Optional[float]:
+        raise NotImplementedError
+
+    def complete(self, job: Job) -> None:
+        raise NotImplementedError
+
+    def pending_count(self) -> int:
+        raise NotImplementedError
+
+
+def _merge(pending: Job, job: Job) -> None:
+    # Keep the earliest deadline and most urgent priority so an interactive
+    # refresh is never held back by the debounce window of a bulk job
+    pending.priority = min(pending.priority, job.priority)
+    pending.run_at = min(pending.run_at, job.run_at)
+    pending.payload = job.payload
+
+
+class MemoryJobBackend(JobBackend):
+    """In-process job store with delayed and ready heaps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Job] = {}
+        self._delayed: List = []
+        self._ready: List = []
+        self._seq = itertools.count()
+
+    def push(self, job: Job) -> bool:
+        with self._lock:
+            pending = self._pending.get(job.key)
+            if pending is not None:
+                _merge(pending, job)
+                # Stale heap entries are skipped on pop by comparing the job fields
+                heapq.heappush(self._delayed, (pending.run_at, next(self._seq), pending))
+                return False
+            self._pending[job.key] = job
+            heapq.heappush(self._delayed, (job.run_at, next(self._seq), job))
+            return True
+
+    def pop(self, now: float) -> Optional[Job]:
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                run_at, _, job = heapq.heappop(self._delayed)
+                if self._pending.get(job.key) is job and job.run_at == run_at:
+                    heapq.heappush(self._ready, (job.priority, run_at, next(self._seq), job))
+            while self._ready:
+                priority, _, _, job = heapq.heappop(self._ready)
+                if self._pending.get(job.key) is job and job.priority == priority:
+                    del self._pending[job.key]
+                    return job
+            return None
+
+    def next_run_at(self) -> Optional[float]:
+        with self._lock:
+            if self._ready:
+                return 0.0
+            return self._delayed[0][0] if self._delayed else None
+
+    def complete(self, job: Job) -> None:
+        pass
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+class SQLiteJobBackend(JobBackend):
+    """Durable local job store backed by a SQLite file"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending'
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_key ON jobs (job_key) WHERE status = 'pending'"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at, priority)"
+        )
+        # Jobs claimed by a previous process that never completed are retried
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status = 'running' AND job_key IN "
+            "(SELECT job_key FROM jobs WHERE status = 'pending')"
+        )
+        self._conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+
+    def push(self, job: Job) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id FROM jobs WHERE job_key = ? AND status = 'pending'", (job.key,)
+            )
+            existed = cursor.fetchone() is not None
+            self._conn.execute(
+                """
+                INSERT INTO jobs (job_type, job_key, payload, priority, run_at, attempts)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_key) WHERE status = 'pending' DO UPDATE SET
+                    priority = MIN(priority, excluded.priority),
+                    run_at = MIN(run_at, excluded.run_at),
+                    payload = excluded.payload
+                """,
+                (job.job_type, job.key, json.dumps(job.payload), job.priority, job.run_at, job.attempts),
+            )
+            return not existed
+
+    def pop(self, now: float) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT id, job_type, job_key, payload, priority, run_at, attempts FROM jobs
+                WHERE status = 'pending' AND run_at <= ?
+                ORDER BY priority, run_at LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (row[0],))
+            return Job(
+                id=row[0], job_type=row[1], key=row[2], payload=json.loads(row[3]),
+                priority=row[4], run_at=row[5], attempts=row[6],
+            )
+
+    def next_run_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(run_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+            return row[0]
+
+    def complete(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+
+
+class JobQueue:
+    """Prioritized, coalescing job queue drained by a pool of worker threads"""
+
+    def __init__(self, backend: JobBackend, workers: int = 2, max_attempts: int = 3):
+        self.backend = backend
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def register(self, job_type: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        self.handlers[job_type] = handler
+
+    def enqueue(
+        self,
+        job_type: str,
+        key: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_BULK,
+        delay: float = 0.0,
+    ) -> bool:
+        """Queue a job; returns False if it coalesced into an already pending one"""
+        created = self.backend.push(Job(job_type, key, payload, priority, time.time() + delay))
+        with self._wakeup:
+            self._wakeup.notify()
+        return created
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop workers after their current job; pending jobs stay in the backend"""
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stopping:
+            job = self.backend.pop(time.time())
+            if job is None:
+                next_run_at = self.backend.next_run_at()
+                wait = 1.0 if next_run_at is None else min(max(next_run_at - time.time(), 0.01), 1.0)
+                with self._wakeup:
+                    self._wakeup.wait(wait)
+                continue
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        handler = self.handlers.get(job.job_type)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type {job.job_type}")
+            handler(job.payload)
+        except Exception as exc:
+            job.attempts += 1
+            logger.error(f"Job {job.job_type}:{job.key} failed (attempt {job.attempts}): {exc}")
+            self.backend.complete(job)
+            if job.attempts < self.max_attempts:
+                job.id = None
+                job.run_at = time.time() + 2 ** job.attempts
+                self.backend.push(job)
+            return
+        self.backend.complete(job)
+
+
+def create_backend() -> JobBackend:
+    if settings.JOB_QUEUE_BACKEND == "sqlite":
+        return SQLiteJobBackend(settings.JOB_QUEUE_SQLITE_PATH)
+    return MemoryJobBackend()
+
+
+job_queue = JobQueue(
+    create_backend(),
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+)
+
+
+REGENERATE_RECOMMENDATIONS = "regenerate_recommendations"
+
+
+def _regenerate_recommendations(payload: Dict[str, Any]) -> None:
+    from app.db.database import SessionLocal
+    from app.services.matching_engine import RecommendationEngine
+
+    db = SessionLocal()
+    try:
+        RecommendationEngine(db).refresh_recommendations(payload["user_id"])
+    finally:
+        db.close()
+
+
+job_queue.register(REGENERATE_RECOMMENDATIONS, _regenerate_recommendations)
+
+
+def enqueue_recommendation_refresh(user_id, priority: int = PRIORITY_BULK) -> bool:
+    """Schedule recommendation regeneration for a user, coalescing repeated requests"""
+    # Profile edits wait out the coalescing window; explicit refreshes run immediately
+    delay = 0.0 if priority == PRIORITY_INTERACTIVE else settings.RECOMMENDATION_REFRESH_COALESCE_SECONDS
+    return job_queue.enqueue(
+        REGENERATE_RECOMMENDATIONS,
+        key=f"{REGENERATE_RECOMMENDATIONS}:{user_id}",
+        payload={"user_id": str(user_id)},
+        priority=priority,
+        delay=delay,
+    )
@@ -1,8 +1,102 @@
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
 from decimal import Decimal
+import random
+import time
 
+from app.core.config import settings
 from app.db import models
+from app.services.catalogue_validation import RULE_PROFILE_FIELDS
+from app.services.recommendation_store import RecommendationStore
+from app.services.scheme_lifecycle import scheme_lifecycle
+
+# Relative evaluation cost per operator; IN scans value_list
+OPERATOR_COSTS = {">": 1.0, "<": 1.0, ">=": 1.0, "<=": 1.0, "=": 1.0, "BETWEEN": 1.5, "IN": 2.0}
+
+
+class RuleStatistics:
+    """Per-rule rejection statistics used to order mandatory rules
+    
+    Counters are only updated on a sampled fraction of evaluations, and those
+    evaluations run every mandatory rule without short-circuiting. That keeps
+    the hot path cheap and keeps rejection rates unbiased: a rule ordered late
+    still gets measured even when earlier rules usually reject first.
+    """
+    
+    def __init__(self, sample_rate: float = 0.05, refresh_interval: float = 60.0, min_samples: int = 100):
+        self.sample_rate = sample_rate
+        self.refresh_interval = refresh_interval
+        self.min_samples = min_samples
+        # rule_id -> [evaluated, rejected]
+        self._counts: Dict[Any, List[int]] = {}
+        self._rules: Dict[Any, Dict[str, Any]] = {}
+        # rule_id -> ordering score, frozen between refreshes so orderings are stable
+        self._scores: Dict[Any, float] = {}
+        self._next_refresh = time.monotonic() + refresh_interval
+    
+    def should_sample(self) -> bool:
+        return random.random() < self.sample_rate
+    
+    def record(self, results: List[Tuple[models.EligibilityRule, bool]]) -> None:
+        for rule, passed in results:
+            counts = self._counts.get(rule.id)
+            if counts is None:
+                counts = self._counts[rule.id] = [0, 0]
+                self._rules[rule.id] = {
+                    "scheme_id": str(rule.scheme_id),
+                    "rule_type": rule.rule_type,
+                    "operator": rule.operator,
+                }
+            counts[0] += 1
+            if not passed:
+                counts[1] += 1
+    
+    def order(self, rules: List[models.EligibilityRule]) -> List[models.EligibilityRule]:
+        """Sort rules so the likeliest, cheapest rejections are evaluated first"""
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        return sorted(rules, key=self._sort_key)
+    
+    def _sort_key(self, rule: models.EligibilityRule) -> Tuple[float, int]:
+        # Unmeasured rules assume a 50% rejection rate; priority breaks ties
+        score = self._scores.get(rule.id)
+        if score is None:
+            score = 0.5 / OPERATOR_COSTS.get(rule.operator, 1.0)
+        return (-score, -(rule.priority or 0))
+    
+    def refresh(self) -> None:
+        """Recompute ordering scores from the counters collected so far"""
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        scores = {}
+        for rule_id, (evaluated, rejected) in list(self._counts.items()):
+            if evaluated >= self.min_samples:
+                cost = OPERATOR_COSTS.get(self._rules[rule_id]["operator"], 1.0)
+                scores[rule_id] = (rejected / evaluated) / cost
+        self._scores = scores
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        stats = []
+        for rule_id, (evaluated, rejected) in list(self._counts.items()):
+            stats.append({
+                "rule_id": str(rule_id),
+                **self._rules[rule_id],
+                "evaluated": evaluated,
+                "rejected": rejected,
+                "rejection_rate": rejected / evaluated,
+                "never_rejects": evaluated >= self.min_samples and rejected == 0,
+            })
+        stats.sort(key=lambda s: s["rejection_rate"])
+        return stats
+
+
+rule_statistics = RuleStatistics(
+    sample_rate=settings.RULE_STATS_SAMPLE_RATE,
+    refresh_interval=settings.RULE_STATS_REFRESH_SECONDS,
+    min_samples=settings.RULE_STATS_MIN_SAMPLES,
+)
+
 
 class EligibilityMatcher:
     """Rule-based eligibility matching engine"""
@@ -39,43 +133,38 @@ class EligibilityMatcher:
     
     def _get_profile_value(self, profile: models.UserProfile, rule_type: str) -> Any:
         """Extract value from user profile based on rule type"""
-        mapping = {
-            "age": profile.age,
-            "income": profile.annual_income,
-            "gender": profile.gender,
-            "state": profile.state,
-            "district": profile.district,
-            "caste": profile.caste_category,
-            "occupation": profile.occupation,
-            "family_size": profile.family_size,
-            "is_bpl": profile.is_bpl,
-            "has_disability": profile.has_disability,
-            "education": profile.education_level,
-            "land_ownership": profile.land_ownership
-        }
-        return mapping.get(rule_type)
+        field = RULE_PROFILE_FIELDS.get(rule_type)
+        return getattr(profile, field) if field else None
     
     def filter_eligible_schemes(self, user_profile: models.UserProfile) -> List[models.Scheme]:
         """Filter schemes based on eligibility rules"""
-        all_schemes = self.db.query(models.Scheme).filter(
+        # Load rules for all schemes in one extra query instead of one per scheme
+        all_schemes = self.db.query(models.Scheme).options(
+            selectinload(models.Scheme.eligibility_rules)
+        ).filter(
             models.Scheme.is_active == True
         ).all()
         
         eligible_schemes = []
         
         for scheme in all_schemes:
-            rules = self.db.query(models.EligibilityRule).filter(
-                models.EligibilityRule.scheme_id == scheme.id
-            ).all()
+            rules = scheme.eligibility_rules
             
             if not rules:
                 # No rules means everyone is eligible
                 eligible_schemes.append(scheme)
                 continue
             
-            # Check all mandatory rules
-            mandatory_rules = [r for r in rules if r.is_mandatory]
-            if all(self.evaluate_rule(user_profile, rule) for rule in mandatory_rules):
+            # Check all mandatory rules, most selective first so all() stops early
+            mandatory_rules = rule_statistics.order([r for r in rules if r.is_mandatory])
+            if rule_statistics.should_sample():
+                results = [(rule, self.evaluate_rule(user_profile, rule)) for rule in mandatory_rules]
+                rule_statistics.record(results)
+                eligible = all(passed for _, passed in results)
+            else:
+                eligible = all(self.evaluate_rule(user_profile, rule) for rule in mandatory_rules)
+            
+            if eligible:
                 eligible_schemes.append(scheme)
         
         return eligible_schemes
@@ -130,8 +219,8 @@ class SchemeRanker:
             score += min(income_ratio * 10, 15)
         
         # Recency (10%)
-        # Newer schemes get higher scores
-        score += 10
+        # Newly opened and closing-soon schemes, precomputed daily
+        score += scheme_lifecycle.recency(scheme.id) * 10
         
         return min(score, 100.0)
 
@@ -159,3 +248,16 @@ class RecommendationEngine:
         ranked_schemes = self.ranker.rank_schemes(user.profile, eligible_schemes)
         
         return ranked_schemes
+    
+    def refresh_recommendations(self, user_id: str) -> int:
+        """Regenerate and persist recommendations for a user; returns the count"""
+        ranked_schemes = self.generate_recommendations(user_id)
+        
+        # Committed with the rows below; readers skip regenerating an empty list
+        run = insert(models.RecommendationRun).values(user_id=user_id, generated_at=func.now())
+        self.db.execute(run.on_conflict_do_update(index_elements=["user_id"], set_={"generated_at": func.now()}))
+        
+        # Write only what changed, keeping viewed/applied history on kept rows
+        RecommendationStore(self.db).sync(user_id, ranked_schemes)
+        
+        return len(ranked_schemes)
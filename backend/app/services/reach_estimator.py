@@ -0,0 +1,408 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.catalogue_validation import (
+    CATEGORICAL_FIELDS,
+    FLAG_FIELDS,
+    NUMERIC_SCALES,
+    RULE_PROFILE_FIELDS,
+    canonical_number,
+)
+
+logger = logging.getLogger(__name__)
+
+# Eligibility fields and their on-disk encoding. Numbers are floats with NaN
+# for null, flags are int8 with -1 for null, and text is dictionary-encoded
+# as int32 codes with -1 for null.
+NUMERIC_FIELDS = {
+    "age": np.float32,
+    "annual_income": np.float64,
+    "family_size": np.float32,
+    "land_ownership": np.float64,
+}
+GROUPINGS = ("state", "district")
+
+# z for 95% confidence bounds on sampled estimates
+CONFIDENCE_Z = 1.96
+
+CHUNK_ROWS = 50000
+
+
+class SnapshotNotReady(Exception):
+    """Raised when no profile snapshot has been built yet"""
+
+
+def _as_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _numeric_targets(items: Iterable[str], scale: int) -> List[float]:
+    """Values whose str() in the matcher equals one of items"""
+    targets = []
+    for item in items:
+        value = canonical_number(item, scale)
+        if value is not None:
+            targets.append(float(value))
+    return targets
+
+
+class ProfileSnapshot:
+    """Memory-mapped columns of one snapshot build, plus an in-memory sample"""
+
+    def __init__(self, path: str, sample_size: int):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.count: int = meta["count"]
+        self.built_at: str = meta["built_at"]
+        self.dictionaries: Dict[str, List[str]] = meta["dictionaries"]
+        self.codes = {
+            field: {value: code for code, value in enumerate(values)}
+            for field, values in self.dictionaries.items()
+        }
+        self.columns = {
+            field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r")
+            for field in (*NUMERIC_FIELDS, *FLAG_FIELDS, *CATEGORICAL_FIELDS)
+        }
+
+        size = min(sample_size, self.count)
+        if size == self.count:
+            self.sample = self.columns
+        else:
+            # Sorted so the gather walks each file forward once
+            rows = np.sort(np.random.default_rng().choice(self.count, size=size, replace=False))
+            self.sample = {field: np.asarray(column[rows]) for field, column in self.columns.items()}
+        self.sample_size = size
+
+    def rule_mask(self, columns: Dict[str, np.ndarray], rule: Any, rows: int) -> np.ndarray:
+        """Rows that pass rule, following EligibilityMatcher.evaluate_rule"""
+        field = RULE_PROFILE_FIELDS.get(rule.rule_type)
+        if field is None:
+            return np.zeros(rows, dtype=bool)
+        values = columns[field]
+        operator = rule.operator
+
+        if field in CATEGORICAL_FIELDS:
+            # Text never compares equal to a number, and ordering it raises
+            if operator != "IN" or not rule.value_list:
+                return np.zeros(rows, dtype=bool)
+            # Code -> selected, with a trailing False slot that null (-1) indexes
+            selected = np.zeros(len(self.dictionaries[field]) + 1, dtype=bool)
+            lookup = self.codes[field]
+            selected[[lookup[item] for item in rule.value_list if item in lookup]] = True
+            return selected[values]
+
+        if field in FLAG_FIELDS:
+            present = values >= 0
+            if operator == "IN":
+                targets = [int(item == "True") for item in (rule.value_list or ()) if item in ("True", "False")]
+                return present & np.isin(values, targets)
+        else:
+            present = ~np.isnan(values)
+            if operator == "IN":
+                return np.isin(values, _numeric_targets(rule.value_list or (), NUMERIC_SCALES[field]))
+
+        low, high = _as_float(rule.value_min), _as_float(rule.value_max)
+        # Comparisons against a missing bound raise in the matcher, so nothing passes
+        if operator == ">" and low is not None:
+            return present & (values > low)
+        if operator == "<" and high is not None:
+            return present & (values < high)
+        if operator == ">=" and low is not None:
+            return present & (values >= low)
+        if operator == "<=" and high is not None:
+            return present & (values <= high)
+        if operator == "=" and low is not None:
+            return present & (values == low)
+        if operator == "BETWEEN" and low is not None and high is not None:
+            return present & (values >= low) & (values <= high)
+        return np.zeros(rows, dtype=bool)
+
+    def eligible(self, columns: Dict[str, np.ndarray], rules: List[Any], rows: int) -> Optional[np.ndarray]:
+        """Indices of rows eligible under a scheme's rules, or None when every row is
+
+        Only mandatory rules count, as in the matcher. Rules run most selective
+        first, judged on the sample; once few rows survive, later rules read
+        only those rows instead of scanning whole columns.
+        """
+        rules = [rule for rule in rules if rule.is_mandatory]
+        if not rules:
+            return None
+        if len(rules) > 1:
+            rate = {id(rule): np.count_nonzero(self.rule_mask(self.sample, rule, self.sample_size)) for rule in rules}
+            rules.sort(key=lambda rule: rate[id(rule)])
+
+        mask = self.rule_mask(columns, rules[0], rows)
+        selected = None
+        for rule in rules[1:]:
+            if selected is None and np.count_nonzero(mask) > rows // 8:
+                mask &= self.rule_mask(columns, rule, rows)
+                continue
+            if selected is None:
+                selected = np.flatnonzero(mask)
+            field = RULE_PROFILE_FIELDS.get(rule.rule_type)
+            subset = {field: columns[field][selected]} if field else {}
+            selected = selected[self.rule_mask(subset, rule, len(selected))]
+        return np.flatnonzero(mask) if selected is None else selected
+
+    def group_keys(self, columns: Dict[str, np.ndarray], group_by: str, selected: Optional[np.ndarray]) -> np.ndarray:
+        state, district = columns["state"], columns["district"]
+        if selected is not None:
+            state = state[selected]
+            district = district[selected] if group_by == "district" else None
+        # Shift codes by one so null gets its own group at 0
+        state = state.astype(np.int64) + 1
+        if group_by == "state":
+            return state
+        return state * (len(self.dictionaries["district"]) + 1) + district + 1
+
+    def group_label(self, key: int, group_by: str) -> Dict[str, Optional[str]]:
+        states, districts = self.dictionaries["state"], self.dictionaries["district"]
+        if group_by == "state":
+            return {"state": states[key - 1] if key else None}
+        state, district = divmod(key, len(districts) + 1)
+        return {
+            "state": states[state - 1] if state else None,
+            "district": districts[district - 1] if district else None,
+        }
+
+
+def wilson_bounds(hits: np.ndarray, trials: int, z: float = CONFIDENCE_Z):
+    """Wilson score interval for a binomial proportion, vectorized over hits"""
+    p = hits / trials
+    z2 = z * z
+    denominator = 1 + z2 / trials
+    centre = (p + z2 / (2 * trials)) / denominator
+    half = z * np.sqrt(p * (1 - p) / trials + z2 / (4 * trials * trials)) / denominator
+    return np.clip(centre - half, 0, 1), np.clip(centre + half, 0, 1)
+
+
+class ReachEstimator:
+    """Counts the profiles a draft set of eligibility rules would reach
+
+    Answers come from a columnar snapshot of the eligibility fields of
+    user_profiles, rebuilt on a background thread. Exact counts scan every
+    row with vectorized comparisons; sampled estimates scan a fixed uniform
+    sample and report 95% Wilson bounds scaled to the full population. Every
+    API process maps the same files; a file lock lets only one of them build.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        refresh_interval: float = 3600.0,
+        sample_size: int = 1000000,
+        session_factory=SessionLocal,
+    ):
+        self.root = os.path.abspath(root)
+        self.refresh_interval = refresh_interval
+        self.sample_size = sample_size
+        self.session_factory = session_factory
+        self._snapshot: Optional[ProfileSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.builds = 0
+        self.queries = 0
+
+    def _current_path(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return os.path.join(self.root, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self) -> ProfileSnapshot:
+        """The newest snapshot, noticing builds by other processes within a few seconds"""
+        if self._snapshot is None or time.monotonic() - self._checked_at > 5:
+            with self._snapshot_lock:
+                self._checked_at = time.monotonic()
+                path = self._current_path()
+                if path is not None and (self._snapshot is None or self._snapshot.path != path):
+                    self._snapshot = ProfileSnapshot(path, self.sample_size)
+        if self._snapshot is None:
+            raise SnapshotNotReady()
+        return self._snapshot
+
+    def build(self) -> bool:
+        """Write a new snapshot; returns False if another process is already building"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "build.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            started = time.time()
+            name = f"snapshot-{int(started * 1000)}"
+            path = os.path.join(self.root, name)
+            try:
+                count = self._write(path)
+            except BaseException:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+            pointer = os.path.join(self.root, "CURRENT.tmp")
+            with open(pointer, "w") as f:
+                f.write(name)
+            os.replace(pointer, os.path.join(self.root, "CURRENT"))
+            # Processes still mapping an old build keep reading it after the unlink
+            for entry in os.listdir(self.root):
+                if entry.startswith("snapshot-") and entry != name:
+                    shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+        self.builds += 1
+        logger.info(f"Built profile snapshot of {count} rows in {time.time() - started:.1f}s")
+        return True
+
+    def _write(self, path: str) -> int:
+        os.makedirs(path)
+        db = self.session_factory()
+        try:
+            # Count and rows from one database snapshot, so the files are sized exactly
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            count = db.query(func.count(models.UserProfile.id)).scalar()
+            fields = (*NUMERIC_FIELDS, *FLAG_FIELDS, *CATEGORICAL_FIELDS)
+            dtypes = {**NUMERIC_FIELDS, **{f: np.int8 for f in FLAG_FIELDS}, **{f: np.int32 for f in CATEGORICAL_FIELDS}}
+            arrays = {
+                field: np.lib.format.open_memmap(
+                    os.path.join(path, f"{field}.npy"), mode="w+", dtype=dtypes[field], shape=(count,)
+                )
+                for field in fields
+            }
+            lookups: Dict[str, Dict[str, int]] = {field: {} for field in CATEGORICAL_FIELDS}
+
+            statement = select(*(getattr(models.UserProfile, field) for field in fields))
+            result = db.execute(statement.execution_options(yield_per=CHUNK_ROWS))
+            offset = 0
+            for rows in result.partitions():
+                if self._stop.is_set():
+                    raise InterruptedError("Profile snapshot build cancelled by shutdown")
+                size = len(rows)
+                for field, values in zip(fields, zip(*rows)):
+                    target = arrays[field][offset:offset + size]
+                    if field in NUMERIC_FIELDS:
+                        target[:] = np.fromiter(
+                            (math.nan if v is None else float(v) for v in values), np.float64, size
+                        )
+                    elif field in FLAG_FIELDS:
+                        target[:] = np.fromiter((-1 if v is None else int(v) for v in values), np.int8, size)
+                    else:
+                        lookup = lookups[field]
+                        target[:] = np.fromiter(
+                            (-1 if v is None else lookup.setdefault(v, len(lookup)) for v in values), np.int32, size
+                        )
+                offset += size
+        finally:
+            db.close()
+
+        for array in arrays.values():
+            array.flush()
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "count": count,
+                "built_at": datetime.utcnow().isoformat(),
+                "dictionaries": {field: list(lookup) for field, lookup in lookups.items()},
+            }, f)
+        return count
+
+    def estimate(self, rules: List[Any], exact: bool = False, group_by: Optional[str] = None, top: int = 50) -> Dict[str, Any]:
+        """Profiles eligible under rules, optionally broken down by state or district"""
+        started = time.perf_counter()
+        snapshot = self.snapshot()
+        self.queries += 1
+        # Small populations fit in the sample, which is then the whole table
+        exact = exact or snapshot.sample_size == snapshot.count
+        columns = snapshot.columns if exact else snapshot.sample
+        rows = snapshot.count if exact else snapshot.sample_size
+        selected = snapshot.eligible(columns, rules, rows)
+        hits = rows if selected is None else len(selected)
+        scale = snapshot.count / rows if rows else 0.0
+
+        result: Dict[str, Any] = {
+            "mode": "exact" if exact else "sample",
+            "population": snapshot.count,
+            "scanned": rows,
+            **self._bounds(np.array([hits]), rows, scale, exact)[0],
+            "snapshot_built_at": snapshot.built_at,
+        }
+        if group_by is not None and rows:
+            keys = snapshot.group_keys(columns, group_by, selected)
+            counts = np.bincount(keys)
+            groups = np.flatnonzero(counts)
+            groups = groups[np.argsort(-counts[groups], kind="stable")]
+            result["group_count"] = len(groups)
+            groups = groups[:top]
+            bounds = self._bounds(counts[groups], rows, scale, exact)
+            result["groups"] = [
+                {**snapshot.group_label(int(key), group_by), **bound} for key, bound in zip(groups, bounds)
+            ]
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    @staticmethod
+    def _bounds(hits: np.ndarray, rows: int, scale: float, exact: bool) -> List[Dict[str, int]]:
+        if exact or not rows:
+            return [{"eligible": int(h), "low": int(h), "high": int(h)} for h in hits]
+        low, high = wilson_bounds(hits, rows)
+        population = rows * scale
+        return [
+            {"eligible": round(h * scale), "low": math.floor(l * population), "high": math.ceil(u * population)}
+            for h, l, u in zip(hits.tolist(), low.tolist(), high.tolist())
+        ]
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profile-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            path = self._current_path()
+            age = time.time() - os.path.getmtime(path) if path and os.path.exists(path) else None
+            if age is None or age >= self.refresh_interval:
+                try:
+                    self.build()
+                except Exception as exc:
+                    if self._stop.is_set():
+                        return
+                    logger.error(f"Profile snapshot build failed: {exc}")
+                age = 0.0
+            self._stop.wait(max(self.refresh_interval - age, 60.0))
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "population": snapshot.count if snapshot else None,
+            "sample_size": snapshot.sample_size if snapshot else None,
+            "built_at": snapshot.built_at if snapshot else None,
+            "builds": self.builds,
+            "queries": self.queries,
+        }
+
+
+reach_estimator = ReachEstimator(
+    settings.REACH_SNAPSHOT_DIR,
+    refresh_interval=settings.REACH_SNAPSHOT_REFRESH_SECONDS,
+    sample_size=settings.REACH_SAMPLE_SIZE,
+)
@@ -0,0 +1,73 @@
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+SCORE_QUANTUM = Decimal("0.01")
+
+
+def _quantize(score: float) -> Decimal:
+    # match_score is DECIMAL(5, 2); compare at stored precision to avoid no-op updates
+    return Decimal(str(score)).quantize(SCORE_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+class RecommendationStore:
+    """Persists ranked recommendations by diffing against the stored rows"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def sync(self, user_id: Any, ranked: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Apply only the inserts, score changes and deletions needed for this ranking
+
+        Rows that survive keep their id, created_at, viewed_at and applied_at.
+        Changes are written in one INSERT ... ON CONFLICT statement with the
+        deletions folded in as a data-modifying CTE. The diff is computed here
+        rather than with ON CONFLICT ... WHERE, because that form still locks
+        (and WAL-logs) every conflicting row even when nothing changed.
+        """
+        table = models.Recommendation.__table__
+        stored = dict(self.db.execute(
+            select(table.c.scheme_id, table.c.match_score).where(table.c.user_id == user_id)
+        ).all())
+        wanted = {item["scheme"].id: _quantize(item["score"]) for item in ranked}
+
+        changed = [
+            # Multi-row VALUES skips Python-side defaults, so supply the id here
+            {"id": uuid.uuid4(), "user_id": user_id, "scheme_id": scheme_id, "match_score": score}
+            for scheme_id, score in wanted.items()
+            if stored.get(scheme_id) != score
+        ]
+        removed = [scheme_id for scheme_id in stored if scheme_id not in wanted]
+        counts = {
+            "inserted": sum(1 for row in changed if row["scheme_id"] not in stored),
+            "updated": sum(1 for row in changed if row["scheme_id"] in stored),
+            "deleted": len(removed),
+            "unchanged": len(wanted) - len(changed),
+        }
+
+        deletion = None
+        if removed:
+            deletion = delete(table).where(
+                table.c.user_id == user_id, table.c.scheme_id.in_(removed)
+            )
+
+        if changed:
+            statement = insert(table).values(changed)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.scheme_id],
+                set_={"match_score": statement.excluded.match_score},
+            )
+            if deletion is not None:
+                statement = statement.add_cte(deletion.returning(table.c.id).cte("removed"))
+            self.db.execute(statement)
+        elif deletion is not None:
+            self.db.execute(deletion)
+
+        self.db.commit()
+        return counts
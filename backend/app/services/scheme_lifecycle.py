@@ -0,0 +1,241 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.catalogue_sync import UPSERT, record_changes
+
+logger = logging.getLogger(__name__)
+
+ACTIVATE = "activate"
+EXPIRE = "expire"
+
+# Held schemes whose start_date has arrived go live unless they ended meanwhile
+RELEASE_HELD = text(
+    """
+    WITH released AS (
+        DELETE FROM scheduled_activations h USING schemes s
+        WHERE h.scheme_id = s.id AND (s.start_date IS NULL OR s.start_date <= :today)
+        RETURNING s.id, s.end_date, s.is_active
+    )
+    UPDATE schemes SET is_active = true, updated_at = now()
+    FROM released
+    WHERE schemes.id = released.id AND NOT released.is_active
+        AND (released.end_date IS NULL OR released.end_date >= :today)
+    RETURNING schemes.id
+    """
+)
+EXPIRE_ENDED = text(
+    "UPDATE schemes SET is_active = false, updated_at = now() "
+    "WHERE is_active AND end_date < :today RETURNING id"
+)
+HOLD_UPCOMING = text(
+    "UPDATE schemes SET is_active = false, updated_at = now() "
+    "WHERE is_active AND start_date > :today RETURNING id"
+)
+RECORD_HOLDS = text(
+    "INSERT INTO scheduled_activations (scheme_id) SELECT unnest(CAST(:ids AS uuid[])) ON CONFLICT DO NOTHING"
+)
+SCHEDULE_QUERY = text(
+    """
+    SELECT s.id, s.start_date, s.end_date, s.created_at, s.is_active, h.scheme_id IS NOT NULL AS held
+    FROM schemes s LEFT JOIN scheduled_activations h ON h.scheme_id = s.id
+    WHERE s.is_active OR h.scheme_id IS NOT NULL
+    """
+)
+
+
+def recency_feature(opened: Optional[date], end_date: Optional[date], today: date, new_days: int, closing_days: int) -> float:
+    """0-1: how recently a scheme opened or how soon it closes, whichever is stronger"""
+    newness = max(0.0, 1.0 - (today - opened).days / new_days) if opened and opened <= today else 0.0
+    closing = max(0.0, 1.0 - (end_date - today).days / closing_days) if end_date and end_date >= today else 0.0
+    return max(newness, closing)
+
+
+class SchemeLifecycle:
+    """Switches dated schemes on and off exactly when their dates pass
+
+    Scheme dates are calendar days in LIFECYCLE_TIMEZONE: a scheme goes live at
+    the start of its start_date and expires at the end of its end_date. A heap
+    of those moments drives a timer thread, which flips is_active in the
+    database and bumps the catalogue version, so the matcher keeps filtering on
+    is_active alone. Published schemes whose start_date is still ahead are
+    held inactive until it arrives.
+
+    The same pass precomputes the ranker's recency feature for every active
+    scheme, so ranking never looks at dates either.
+    """
+
+    def __init__(
+        self,
+        timezone: str = "Asia/Kolkata",
+        resync_interval: float = 300.0,
+        new_days: int = 90,
+        closing_days: int = 30,
+        session_factory=SessionLocal,
+    ):
+        self.tz = ZoneInfo(timezone)
+        self.resync_interval = resync_interval
+        self.new_days = new_days
+        self.closing_days = closing_days
+        self.session_factory = session_factory
+        self._events: List[Tuple[datetime, str, Any]] = []
+        self._recency: Dict[Any, float] = {}
+        self._bump_pending = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.syncs = 0
+        self.activated = 0
+        self.expired = 0
+        self.held = 0
+        self.last_sync: Optional[str] = None
+
+    def recency(self, scheme_id) -> float:
+        return self._recency.get(scheme_id, 0.0)
+
+    def reload(self) -> None:
+        """Re-read the schedule soon, e.g. after scheme dates were edited"""
+        self._wake.set()
+
+    def _now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def _midnight(self, day: date) -> datetime:
+        return datetime(day.year, day.month, day.day, tzinfo=self.tz)
+
+    def sync(self) -> None:
+        """Apply every transition due by today, then rebuild the heap and recency features"""
+        now = self._now()
+        today = now.date()
+        # Events popped by this process count even if another process flipped
+        # the rows first: its own catalogue version must still move
+        while self._events and self._events[0][0] <= now:
+            heapq.heappop(self._events)
+            self._bump_pending = True
+
+        db = self.session_factory()
+        try:
+            params = {"today": today}
+            activated = [row.id for row in db.execute(RELEASE_HELD, params)]
+            expired = [row.id for row in db.execute(EXPIRE_ENDED, params)]
+            held = [row.id for row in db.execute(HOLD_UPCOMING, params)]
+            if held:
+                db.execute(RECORD_HOLDS, {"ids": held})
+            record_changes(db, {scheme_id: UPSERT for scheme_id in activated + expired + held})
+            if self._bump_pending:
+                db.info["catalogue_changed"] = True
+            db.commit()
+            rows = db.execute(SCHEDULE_QUERY).all()
+        finally:
+            db.close()
+        self._bump_pending = False
+
+        events = []
+        recency = {}
+        for row in rows:
+            if row.held and row.start_date is not None:
+                events.append((self._midnight(row.start_date), ACTIVATE, row.id))
+            if row.is_active:
+                if row.end_date is not None:
+                    events.append((self._midnight(row.end_date + timedelta(days=1)), EXPIRE, row.id))
+                opened = row.start_date or (row.created_at.date() if row.created_at else None)
+                recency[row.id] = recency_feature(opened, row.end_date, today, self.new_days, self.closing_days)
+        heapq.heapify(events)
+        self._events = events
+        self._recency = recency
+
+        self.syncs += 1
+        self.activated += len(activated)
+        self.expired += len(expired)
+        self.held += len(held)
+        self.last_sync = now.isoformat()
+        if activated or expired or held:
+            logger.info(f"Scheme lifecycle: {len(activated)} activated, {len(expired)} expired, {len(held)} held until start")
+
+    def _seconds_until_next(self) -> float:
+        now = self._now()
+        # Recency features age by a day at every local midnight
+        deadline = self._midnight(now.date() + timedelta(days=1))
+        if self._events and self._events[0][0] < deadline:
+            deadline = self._events[0][0]
+        return min(max((deadline - now).total_seconds(), 0.0), self.resync_interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheme-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.sync()
+                timeout = self._seconds_until_next()
+            except Exception as exc:
+                logger.error(f"Scheme lifecycle sync failed: {exc}")
+                timeout = 60.0
+            # Waking a few ms early would fire nothing; land just past the boundary
+            self._wake.wait(timeout + 0.05)
+
+    def stats(self) -> Dict[str, Any]:
+        upcoming = heapq.nsmallest(5, self._events)
+        return {
+            "timezone": str(self.tz),
+            "scheduled_events": len(self._events),
+            "next_events": [
+                {"at": when.isoformat(), "action": action, "scheme_id": str(scheme_id)}
+                for when, action, scheme_id in upcoming
+            ],
+            "scored_schemes": len(self._recency),
+            "syncs": self.syncs,
+            "activated": self.activated,
+            "expired": self.expired,
+            "held": self.held,
+            "last_sync": self.last_sync,
+        }
+
+
+scheme_lifecycle = SchemeLifecycle(
+    settings.LIFECYCLE_TIMEZONE,
+    resync_interval=settings.LIFECYCLE_RESYNC_SECONDS,
+    new_days=settings.RECENCY_NEW_DAYS,
+    closing_days=settings.RECENCY_CLOSING_DAYS,
+)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_schedule_changes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, models.Scheme):
+            session.info["schedule_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _reschedule_on_commit(session):
+    if session.info.pop("schedule_changed", False):
+        scheme_lifecycle.reload()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("schedule_changed", None)
@@ -0,0 +1,208 @@
+import os
+import tempfile
+from typing import List, Optional
+
+from app.core.config import settings
+
+
+class ObjectStorage:
+    """Interface for blob stores addressed by slash-separated keys"""
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def writer(self, key: str, content_type: str) -> "ObjectWriter":
+        """Incremental writer for objects too large to hold in memory"""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        """URL a client can fetch the object from"""
+        raise NotImplementedError
+
+
+class ObjectWriter:
+    """Writes an object chunk by chunk; it becomes visible only on commit"""
+
+    size = 0
+
+    def write(self, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    def commit(self) -> None:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+
+class LocalObjectWriter(ObjectWriter):
+    """Streams into a temporary file that is renamed into place on commit"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        self.file = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> None:
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+
+class S3ObjectWriter(ObjectWriter):
+    """Streams into an S3 multipart upload, buffering at most one part"""
+
+    PART_SIZE = 8 * 1024 * 1024  # S3 requires at least 5 MiB for all but the last part
+
+    def __init__(self, client, bucket: str, key: str, content_type: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = client.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType=content_type
+        )["UploadId"]
+        self.parts: List[dict] = []
+        self.buffer = bytearray()
+        self.size = 0
+
+    def _flush(self) -> None:
+        number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=number, Body=bytes(self.buffer),
+        )
+        self.parts.append({"PartNumber": number, "ETag": response["ETag"]})
+        self.buffer.clear()
+
+    def write(self, chunk: bytes) -> None:
+        self.buffer += chunk
+        self.size += len(chunk)
+        if len(self.buffer) >= self.PART_SIZE:
+            self._flush()
+
+    def commit(self) -> None:
+        if self.buffer or not self.parts:
+            self._flush()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self) -> None:
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+class LocalObjectStorage(ObjectStorage):
+    """Objects stored as files under a root directory
+
+    Writes go to a temporary file that is renamed into place, so readers never
+    see a partial object and concurrent writers of the same key are harmless.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def writer(self, key: str, content_type: str) -> ObjectWriter:
+        return LocalObjectWriter(self.path(key))
+
+    def url(self, key: str) -> str:
+        return self.base_url + key
+
+
+class S3ObjectStorage(ObjectStorage):
+    """Objects stored in an S3 bucket, served through presigned URLs"""
+
+    def __init__(self, bucket: str, region: str, url_expiry: int = 86400):
+        import boto3
+
+        self.bucket = bucket
+        self.url_expiry = url_expiry
+        self.client = boto3.client("s3", region_name=region)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def writer(self, key: str, content_type: str) -> ObjectWriter:
+        return S3ObjectWriter(self.client, self.bucket, key, content_type)
+
+    def url(self, key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.url_expiry,
+        )
+
+
+def create_storage(bucket: str, base_url: Optional[str] = None) -> ObjectStorage:
+    """Storage for one bucket; locally each bucket is a directory under STORAGE_LOCAL_ROOT"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3ObjectStorage(bucket, settings.AWS_REGION, settings.STORAGE_URL_EXPIRY)
+    return LocalObjectStorage(os.path.join(settings.STORAGE_LOCAL_ROOT, bucket), base_url or "")
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, update
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.storage import ObjectStorage, S3ObjectStorage, create_storage
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class Transcriber:
+    """Interface for speech-to-text engines"""
+
+    def transcribe(self, storage: ObjectStorage, key: str, language: str) -> Tuple[str, float]:
+        """Return (text, confidence) for the audio stored under key"""
+        raise NotImplementedError
+
+
+class AmazonTranscriber(Transcriber):
+    """Amazon Transcribe batch jobs over audio already in S3"""
+
+    LANGUAGE_CODES = {"en": "en-IN", "hi": "hi-IN", "mr": "mr-IN", "ta": "ta-IN"}
+    POLL_INTERVAL = 2.0
+
+    def __init__(self, region: str):
+        import boto3
+
+        self.client = boto3.client("transcribe", region_name=region)
+
+    def transcribe(self, storage: ObjectStorage, key: str, language: str) -> Tuple[str, float]:
+        import httpx
+
+        if not isinstance(storage, S3ObjectStorage):
+            raise RuntimeError("Amazon Transcribe needs STORAGE_BACKEND=s3")
+        name = f"transcribe-{uuid.uuid4().hex}"
+        self.client.start_transcription_job(
+            TranscriptionJobName=name,
+            LanguageCode=self.LANGUAGE_CODES.get(language, "en-IN"),
+            Media={"MediaFileUri": f"s3://{storage.bucket}/{key}"},
+        )
+        while True:
+            job = self.client.get_transcription_job(TranscriptionJobName=name)["TranscriptionJob"]
+            if job["TranscriptionJobStatus"] == "COMPLETED":
+                break
+            if job["TranscriptionJobStatus"] == "FAILED":
+                raise RuntimeError(job.get("FailureReason", "Transcription failed"))
+            time.sleep(self.POLL_INTERVAL)
+
+        result = httpx.get(job["Transcript"]["TranscriptFileUri"], timeout=30).json()["results"]
+        confidences = [
+            float(item["alternatives"][0]["confidence"])
+            for item in result["items"]
+            if item["type"] == "pronunciation"
+        ]
+        text = result["transcripts"][0]["transcript"] if result["transcripts"] else ""
+        return text, sum(confidences) / len(confidences) if confidences else 0.0
+
+
+class StubTranscriber(Transcriber):
+    """Returns a placeholder transcript, for local development without AWS"""
+
+    def transcribe(self, storage: ObjectStorage, key: str, language: str) -> Tuple[str, float]:
+        return settings.TRANSCRIBE_STUB_TEXT, 1.0
+
+
+def create_transcriber() -> Transcriber:
+    if settings.TRANSCRIBE_ENGINE == "stub":
+        return StubTranscriber()
+    return AmazonTranscriber(settings.AWS_REGION)
+
+
+class TranscriptionService:
+    """Runs transcription jobs on a bounded thread pool
+
+    At most max_pending jobs may be queued or running in this process; beyond
+    that new uploads are refused instead of piling up. Job state is kept in
+    the database, so any API process can answer a poll, and finished jobs are
+    kept for result_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        storage: ObjectStorage,
+        workers: int = 4,
+        max_pending: int = 32,
+        result_ttl: float = 3600,
+        poll_interval: float = 1.0,
+        session_factory=SessionLocal,
+    ):
+        self.storage = storage
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self._transcriber: Optional[Transcriber] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Jobs running in this process, so waiters here need not poll
+        self._futures: Dict[str, Future] = {}
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    @property
+    def transcriber(self) -> Transcriber:
+        if self._transcriber is None:
+            self._transcriber = create_transcriber()
+        return self._transcriber
+
+    def reserve(self) -> bool:
+        """Claim a backlog slot before accepting an upload"""
+        return self._slots.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def submit(self, key: str, language: str, size: int) -> Dict[str, Any]:
+        """Record and queue transcription of stored audio; the caller must hold a reserved slot"""
+        job = models.TranscriptionJob(id=uuid.uuid4().hex, object_key=key, language=language, size=size, status=QUEUED)
+        db = self.session_factory()
+        try:
+            db.execute(delete(models.TranscriptionJob).where(
+                models.TranscriptionJob.finished_at < datetime.utcnow() - timedelta(seconds=self.result_ttl)
+            ))
+            db.add(job)
+            db.commit()
+            result = to_dict(job)
+        except Exception:
+            db.rollback()
+            self.release()
+            self._delete_audio(job.id, key)
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="transcribe")
+            future = self._executor.submit(self._run, job.id, key, language)
+            self._futures[job.id] = future
+        future.add_done_callback(lambda done: self._futures.pop(job.id, None))
+        return result
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            job = db.get(models.TranscriptionJob, job_id)
+            return None if job is None else to_dict(job)
+        finally:
+            db.close()
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once it finishes or timeout seconds pass, whichever is first"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await asyncio.to_thread(self.get, job_id)
+
+        # Running in another process: poll its row
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            left = deadline - time.monotonic()
+            if job is None or job["status"] in (COMPLETED, FAILED) or left <= 0:
+                return job
+            await asyncio.sleep(min(self.poll_interval, left))
+
+    def _run(self, job_id: str, key: str, language: str) -> None:
+        values: Dict[str, Any] = {}
+        try:
+            self._update(job_id, status=RUNNING)
+            text, confidence = self.transcriber.transcribe(self.storage, key, language)
+            values = {"status": COMPLETED, "text": text, "confidence": confidence}
+        except Exception as exc:
+            logger.error(f"Transcription {job_id} failed: {exc}")
+            values = {"status": FAILED, "error": "Transcription failed"}
+        finally:
+            self._update(job_id, finished_at=datetime.utcnow(), **values)
+            self.release()
+            if not settings.TRANSCRIBE_KEEP_AUDIO:
+                self._delete_audio(job_id, key)
+
+    def _update(self, job_id: str, **values: Any) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(update(models.TranscriptionJob).where(models.TranscriptionJob.id == job_id).values(**values))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Could not record state of transcription {job_id}: {exc}")
+        finally:
+            db.close()
+
+    def _delete_audio(self, job_id: str, key: str) -> None:
+        try:
+            self.storage.delete(key)
+        except Exception as exc:
+            logger.warning(f"Could not delete audio for transcription {job_id}: {exc}")
+
+    def stats(self) -> Dict[str, int]:
+        """Jobs by status across all processes"""
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        db = self.session_factory()
+        try:
+            rows = db.query(models.TranscriptionJob.status, func.count()).group_by(models.TranscriptionJob.status).all()
+        finally:
+            db.close()
+        counts.update(dict(rows))
+        return counts
+
+    def shutdown(self) -> None:
+        """Drop queued jobs and let running ones finish in the background"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # Cancelled futures leave _futures as they are cancelled
+        futures = list(self._futures.items())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for job_id, future in futures:
+            if future.cancelled():
+                # Nothing will pick the job up again, so pollers must not wait on it
+                self._update(job_id, status=FAILED, error="Transcription was interrupted", finished_at=datetime.utcnow())
+                self.release()
+
+
+def to_dict(job: models.TranscriptionJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "language": job.language,
+        "text": job.text,
+        "confidence": None if job.confidence is None else float(job.confidence),
+        "error": job.error,
+    }
+
+
+transcription_service = TranscriptionService(
+    create_storage(settings.S3_BUCKET_DOCUMENTS),
+    workers=settings.TRANSCRIBE_WORKERS,
+    max_pending=settings.TRANSCRIBE_MAX_PENDING,
+    result_ttl=settings.TRANSCRIBE_RESULT_TTL_SECONDS,
+    poll_interval=settings.TRANSCRIBE_POLL_INTERVAL_SECONDS,
+)
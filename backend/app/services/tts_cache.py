@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import io
+import logging
+import re
+import unicodedata
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.services.jobs import PRIORITY_BULK, job_queue
+from app.services.storage import ObjectStorage, create_storage
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys; differences here never change the audio"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class UnsupportedLanguageError(ValueError):
+    """Raised when the synthesizer has no voice for the requested language"""
+
+
+class Synthesizer:
+    """Interface for text-to-speech engines"""
+
+    extension = "mp3"
+    content_type = "audio/mpeg"
+
+    def synthesize(self, text: str, language: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+
+class PollySynthesizer(Synthesizer):
+    """Amazon Polly neural voices"""
+
+    LANGUAGE_CODES = {"en": "en-IN", "hi": "hi-IN"}
+
+    def __init__(self, region: str):
+        import boto3
+
+        self.client = boto3.client("polly", region_name=region)
+
+    def synthesize(self, text: str, language: str, voice: str) -> bytes:
+        language_code = self.LANGUAGE_CODES.get(language)
+        if language_code is None:
+            raise UnsupportedLanguageError(f"No Polly voice for language {language}")
+        response = self.client.synthesize_speech(
+            Text=text,
+            VoiceId=voice,
+            LanguageCode=language_code,
+            Engine="neural",
+            OutputFormat="mp3",
+        )
+        return response["AudioStream"].read()
+
+
+class SilentSynthesizer(Synthesizer):
+    """Produces silent WAV audio roughly as long as the text would take to read
+
+    For local development and load tests, where calling Polly is not wanted.
+    """
+
+    extension = "wav"
+    content_type = "audio/wav"
+    SAMPLE_RATE = 8000
+
+    def synthesize(self, text: str, language: str, voice: str) -> bytes:
+        seconds = max(len(text) / 15, 0.5)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as audio:
+            audio.setnchannels(1)
+            audio.setsampwidth(1)
+            audio.setframerate(self.SAMPLE_RATE)
+            audio.writeframes(b"\x80" * int(seconds * self.SAMPLE_RATE))
+        return buffer.getvalue()
+
+
+def create_synthesizer() -> Synthesizer:
+    if settings.TTS_ENGINE == "silent":
+        return SilentSynthesizer()
+    return PollySynthesizer(settings.AWS_REGION)
+
+
+class TTSCache:
+    """Content-addressed store of synthesized audio
+
+    Audio is keyed by a hash of (normalized text, language, voice), so the same
+    scheme description requested by any number of users is synthesized once.
+    Concurrent requests for an uncached key share a single synthesis.
+    """
+
+    def __init__(self, storage: ObjectStorage, synthesizer: Optional[Synthesizer] = None):
+        self.storage = storage
+        self._synthesizer = synthesizer
+        self._known: set = set()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def synthesizer(self) -> Synthesizer:
+        # Created on first use so importing the API does not need AWS credentials
+        if self._synthesizer is None:
+            self._synthesizer = create_synthesizer()
+        return self._synthesizer
+
+    def key(self, text: str, language: str, voice: str) -> str:
+        digest = hashlib.sha256(
+            "\x1f".join((normalize_text(text), language, voice)).encode("utf-8")
+        ).hexdigest()
+        return f"tts/{digest[:2]}/{digest}.{self.synthesizer.extension}"
+
+    def _remember(self, key: str) -> None:
+        # Only saves a storage lookup; forgetting everything at the cap is harmless
+        if len(self._known) >= settings.TTS_KNOWN_KEYS_MAX:
+            self._known.clear()
+        self._known.add(key)
+
+    def _cached(self, key: str) -> bool:
+        if key in self._known:
+            return True
+        if self.storage.exists(key):
+            self._remember(key)
+            return True
+        return False
+
+    def synthesize_and_store(self, text: str, language: str, voice: str) -> str:
+        """Blocking: ensure audio for text is stored and return its key"""
+        key = self.key(text, language, voice)
+        if not self._cached(key):
+            audio = self.synthesizer.synthesize(normalize_text(text), language, voice)
+            self.storage.put(key, audio, self.synthesizer.content_type)
+            self._remember(key)
+        return key
+
+    async def get_url(self, text: str, language: str, voice: Optional[str] = None) -> Tuple[str, bool]:
+        """Return (audio URL, whether it was already cached), synthesizing on a miss"""
+        voice = voice or settings.TTS_DEFAULT_VOICE
+        key = self.key(text, language, voice)
+        if key in self._known or await asyncio.to_thread(self._cached, key):
+            self.hits += 1
+            return self.storage.url(key), True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            await asyncio.shield(pending)
+            return self.storage.url(key), False
+
+        self.misses += 1
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.to_thread(self.synthesize_and_store, text, language, voice)
+            pending.set_result(key)
+        except Exception as exc:
+            pending.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved so an unwaited failure is not logged twice
+            pending.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        return self.storage.url(key), False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+tts_cache = TTSCache(
+    create_storage(settings.S3_BUCKET_ASSETS, base_url=f"{settings.API_V1_PREFIX}/voice/audio/")
+)
+
+
+def scheme_texts(scheme: models.Scheme, languages: List[str]) -> List[Tuple[str, str]]:
+    """(text, language) pairs of a scheme's catalogue text that users listen to"""
+    texts = []
+    for language in languages:
+        suffix = "" if language == "en" else f"_{language}"
+        for field in ("name", "description"):
+            text = getattr(scheme, f"{field}{suffix}", None)
+            if text:
+                texts.append((text, language))
+    return texts
+
+
+PRESYNTHESIZE_SCHEME = "presynthesize_scheme"
+
+
+def _presynthesize_scheme(payload: Dict[str, Any]) -> None:
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        scheme = db.query(models.Scheme).filter(models.Scheme.id == payload["scheme_id"]).first()
+        if scheme is None or not scheme.is_active:
+            return
+        texts = scheme_texts(scheme, settings.TTS_PRESYNTHESIZE_LANGUAGES)
+    finally:
+        db.close()
+
+    for text, language in texts:
+        try:
+            tts_cache.synthesize_and_store(text, language, settings.TTS_DEFAULT_VOICE)
+        except UnsupportedLanguageError as exc:
+            logger.warning(f"Skipping pre-synthesis for scheme {payload['scheme_id']}: {exc}")
+
+
+job_queue.register(PRESYNTHESIZE_SCHEME, _presynthesize_scheme)
+
+
+def enqueue_scheme_presynthesis(scheme_id) -> bool:
+    """Synthesize a scheme's catalogue text ahead of the first listener"""
+    return job_queue.enqueue(
+        PRESYNTHESIZE_SCHEME,
+        key=f"{PRESYNTHESIZE_SCHEME}:{scheme_id}",
+        payload={"scheme_id": str(scheme_id)},
+        priority=PRIORITY_BULK,
+    )
+
+
+SPOKEN_FIELDS = ("is_active",) + tuple(
+    f"{field}{suffix}" for field in ("name", "description") for suffix in ("", "_hi", "_mr", "_ta")
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_published_schemes(session, flush_context):
+    # Ids are assigned by now, and new/dirty still describe what was flushed
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, models.Scheme) or not obj.is_active:
+            continue
+        state = inspect(obj)
+        if obj in session.new or any(state.attrs[f].history.has_changes() for f in SPOKEN_FIELDS):
+            session.info.setdefault("published_schemes", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _presynthesize_on_commit(session):
+    for scheme_id in session.info.pop("published_schemes", ()):
+        enqueue_scheme_presynthesis(scheme_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("published_schemes", None)
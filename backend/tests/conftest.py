@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.db.database import engine
+
+
+@pytest.fixture
+def db():
+    """A session on DATABASE_URL whose changes are rolled back after the test"""
+    try:
+        connection = engine.connect()
+    except OperationalError as exc:
+        pytest.skip(f"Database not reachable: {exc.orig}")
+    models.Base.metadata.create_all(connection)
+    connection.commit()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
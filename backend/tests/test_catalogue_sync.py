@@ -0,0 +1,57 @@
+import uuid
+
+from sqlalchemy import insert
+
+from app.db import models
+from app.services.catalogue_sync import DELETE, changes_since, current_version
+
+
+def log(db, *scheme_ids):
+    db.execute(insert(models.CatalogueChange), [{"scheme_id": s, "operation": DELETE} for s in scheme_ids])
+
+
+def sync(db, since, limit):
+    """Every page from since, as the client would fetch them"""
+    pages = []
+    while True:
+        page = changes_since(db, since, limit)
+        pages.append(page)
+        since = page["version"]
+        if not page["has_more"]:
+            return pages
+
+
+def test_pages_cover_every_change_once(db):
+    since = current_version(db)
+    schemes = [uuid.uuid4() for _ in range(5)]
+    log(db, *schemes)
+
+    pages = sync(db, since, limit=2)
+    assert [len(page["deleted"]) for page in pages] == [2, 2, 1]
+    assert [scheme for page in pages for scheme in page["deleted"]] == schemes
+    assert pages[-1]["version"] == current_version(db)
+
+
+def test_a_scheme_changed_twice_is_sent_once_at_its_latest_change(db):
+    since = current_version(db)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    log(db, first, second, first)
+
+    pages = sync(db, since, limit=1)
+    assert [page["deleted"] for page in pages] == [[second], [first]]
+
+
+def test_resuming_from_a_cursor_skips_what_was_sent(db):
+    since = current_version(db)
+    sent = uuid.uuid4()
+    log(db, sent)
+    cursor = changes_since(db, since, 10)["version"]
+    later = uuid.uuid4()
+    log(db, later)
+
+    assert changes_since(db, cursor, 10)["deleted"] == [later]
+
+
+def test_no_changes_keeps_the_cursor(db):
+    since = current_version(db)
+    assert changes_since(db, since, 10) == {"version": since, "has_more": False, "schemes": [], "deleted": []}
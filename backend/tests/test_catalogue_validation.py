@@ -0,0 +1,100 @@
+from datetime import date
+from decimal import Decimal
+
+from app.services.catalogue_validation import validate_records
+
+SCHEME = {
+    "scheme_code": "PM-KISAN",
+    "name": "PM Kisan Samman Nidhi",
+    "name_hi": "प्रधानमंत्री किसान सम्मान निधि",
+    "description": "Income support for farmer families",
+    "department": "Ministry of Agriculture",
+    "category": "Agriculture",
+    "benefit_type": "Direct Cash Transfer",
+    "benefit_amount": "6000",
+    "is_central": "yes",
+    "start_date": "2019-02-01",
+    "application_url": "https://pmkisan.gov.in",
+}
+
+
+def errors_of(kind, record):
+    [(row, clean, errors)] = validate_records(kind, [(7, record)])
+    assert row == 7
+    return clean, dict(errors)
+
+
+def test_valid_scheme_is_normalized():
+    clean, errors = errors_of("schemes", {**SCHEME, "name": "  PM Kisan  "})
+    assert errors == {}
+    assert clean["name"] == "PM Kisan"
+    assert clean["benefit_amount"] == Decimal("6000")
+    assert clean["is_central"] is True
+    assert clean["start_date"] == date(2019, 2, 1)
+
+
+def test_scheme_errors_are_reported_per_field():
+    record = {
+        **SCHEME,
+        "department": " ",
+        "benefit_amount": "12.345",
+        "end_date": "2018-01-01",
+        "application_url": "pmkisan.gov.in",
+        "name_hi": "PM Kisan Samman Nidhi",
+    }
+    _, errors = errors_of("schemes", record)
+    assert errors == {
+        "department": "is required",
+        "benefit_amount": "has more than 2 decimal places",
+        "end_date": "is before start_date",
+        "application_url": "must be an http(s) URL",
+        "name_hi": "is not written in the hi script",
+    }
+
+
+def test_nested_rule_errors_are_indexed():
+    record = {
+        **SCHEME,
+        "eligibility_rules": [
+            {"rule_type": "age", "operator": "between", "value_min": 18, "value_max": 60},
+            {"rule_type": "age", "operator": "BETWEEN", "value_min": 60, "value_max": 18},
+            "not a rule",
+        ],
+    }
+    clean, errors = errors_of("schemes", record)
+    assert clean["eligibility_rules"][0]["operator"] == "BETWEEN"
+    assert errors == {
+        "eligibility_rules[1].value_max": "is below value_min",
+        "eligibility_rules[2]": "must be an object",
+    }
+
+
+def test_rule_records_need_a_scheme_code():
+    clean, errors = errors_of("rules", {"rule_type": "state", "operator": "IN", "value_list": "Bihar|Assam"})
+    assert clean["value_list"] == ["Bihar", "Assam"]
+    assert errors == {"scheme_code": "is required"}
+
+
+def test_rule_operator_must_suit_the_field():
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "state", "operator": "=", "value_min": 1})
+    assert errors == {"operator": "state rules support only the IN operator"}
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "age", "operator": ">="})
+    assert errors == {"value_min": ">= rules need value_min"}
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "height", "operator": ">", "value_min": 1})
+    assert errors == {"rule_type": "Unknown rule type: height"}
+
+
+def test_in_values_must_match_how_the_matcher_formats_profiles():
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "age", "operator": "IN", "value_list": ["18", "18.0"]})
+    assert errors == {"value_list": "values would never match a age: 18.0"}
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "income", "operator": "IN", "value_list": ["100000.00"]})
+    assert errors == {}
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "is_bpl", "operator": "IN", "value_list": ["true"]})
+    assert errors == {"value_list": "values would never match a is_bpl: true"}
+
+
+def test_rule_values_must_be_plausible():
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "age", "operator": "<", "value_max": 200})
+    assert errors == {"value_max": "is outside the plausible range for age"}
+    _, errors = errors_of("rules", {"scheme_code": "X", "rule_type": "state", "operator": "IN", "value_list": ["Bihar", "Bihar"]})
+    assert errors == {"value_list": "contains duplicates"}
@@ -0,0 +1,89 @@
+import asyncio
+
+from app.services.interaction_ingest import InteractionIngestor
+
+
+class FakeSession:
+    """Records each executemany batch instead of writing it"""
+
+    def __init__(self, batches, fail=False):
+        self.batches = batches
+        self.fail = fail
+
+    def execute(self, statement, rows):
+        if self.fail:
+            raise RuntimeError("database is down")
+        self.batches.append(list(rows))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def ingestor(batches, fail=False, **options):
+    return InteractionIngestor(session_factory=lambda: FakeSession(batches, fail), **options)
+
+
+def test_full_batches_are_written_and_stop_drains_the_rest():
+    async def run():
+        batches = []
+        events = ingestor(batches, batch_size=3, flush_interval=60)
+        events.start()
+        for i in range(7):
+            assert events.record_nowait("view", metadata={"i": i})
+        await events.stop()
+        return events, batches
+
+    events, batches = asyncio.run(run())
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row["metadata"]["i"] for batch in batches for row in batch] == list(range(7))
+    assert events.written == 7
+    assert events.dropped == 0
+
+
+def test_a_partial_batch_is_written_after_the_flush_interval():
+    async def run():
+        batches = []
+        events = ingestor(batches, batch_size=100, flush_interval=0.05)
+        events.start()
+        events.record_nowait("view")
+        events.record_nowait("feedback")
+        await asyncio.sleep(0.3)
+        written = [len(batch) for batch in batches]
+        await events.stop()
+        return written
+
+    assert asyncio.run(run()) == [2]
+
+
+def test_events_beyond_the_buffer_are_dropped():
+    async def run():
+        batches = []
+        events = ingestor(batches, max_queue_size=2, flush_interval=60)
+        events.start()
+        # The flush loop cannot run between these calls, so the queue fills
+        accepted = [events.record_nowait("view") for _ in range(5)]
+        await events.stop()
+        return events, accepted, batches
+
+    events, accepted, batches = asyncio.run(run())
+    assert accepted == [True, True, False, False, False]
+    assert events.dropped == 3
+    assert sum(len(batch) for batch in batches) == 2
+
+
+def test_events_are_dropped_when_not_running_or_the_write_fails():
+    async def run():
+        events = ingestor([], fail=True, flush_interval=60)
+        assert not events.record_nowait("view")
+        events.start()
+        events.record_nowait("view")
+        events.record_nowait("view")
+        await events.stop()
+        return events
+
+    events = asyncio.run(run())
+    assert events.dropped == 3
+    assert events.written == 0
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from jose import jwt
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import (
+    LocalCounterClient,
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    SharedRateLimitBackend,
+)
+from app.core.security import KeySet, TokenVerifier, secret_keys
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Both clocks the limiter reads, starting at the top of a minute"""
+    clock = SimpleNamespace(now=60.0 * 1000)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now))
+    return clock
+
+
+def test_token_bucket_allows_the_limit_then_refills(clock):
+    backend = MemoryRateLimitBackend()
+    assert all(backend.hit("a", 60)[0] for _ in range(60))
+    allowed, retry_after = backend.hit("a", 60)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    assert backend.hit("b", 60)[0]
+
+    clock.now += 1
+    assert backend.hit("a", 60)[0]
+    assert not backend.hit("a", 60)[0]
+
+
+def test_token_bucket_evicts_least_recently_used_keys(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+    backend.hit("a", 1)
+    backend.hit("b", 1)
+    backend.hit("a", 1)
+    backend.hit("c", 1)
+    assert len(backend) == 2
+    # b was evicted, so it starts with a full bucket again
+    assert backend.hit("b", 1)[0]
+
+
+def test_sliding_window_counts_rejected_requests(clock):
+    backend = SharedRateLimitBackend(LocalCounterClient())
+    assert all(backend.hit("a", 5)[0] for _ in range(5))
+    allowed, retry_after = backend.hit("a", 5)
+    assert not allowed
+    assert retry_after == pytest.approx(60)
+    assert not backend.hit("a", 5)[0]
+
+
+def test_sliding_window_weights_the_previous_minute(clock):
+    backend = SharedRateLimitBackend(LocalCounterClient())
+    for _ in range(10):
+        backend.hit("a", 10)
+
+    # Half way through the next minute, half of the previous 10 still count
+    clock.now += 90
+    assert all(backend.hit("a", 10)[0] for _ in range(5))
+    allowed, retry_after = backend.hit("a", 10)
+    assert not allowed
+    assert retry_after == pytest.approx(12)
+    # Rejections count, so after 12s 3 of the previous 10 plus 6 + 1 fit
+    clock.now += 12
+    assert backend.hit("a", 10)[0]
+    assert not backend.hit("a", 10)[0]
+
+
+def scope(path="/api/v1/schemes", headers=(), client=("10.0.0.9", 1234)):
+    return {"type": "http", "path": path, "headers": list(headers), "client": client}
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    key_set = KeySet(secret_keys)
+    key_set.load()
+    verifier = TokenVerifier(key_set)
+    monkeypatch.setattr(rate_limit, "token_verifier", verifier)
+    return verifier
+
+
+def token(sub):
+    claims = {"sub": sub, "exp": int(time.time()) + 600}
+    return jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def test_client_id_is_the_verified_subject(verifier):
+    middleware = RateLimitMiddleware(None, MemoryRateLimitBackend())
+    valid = scope(headers=[(b"authorization", f"Bearer {token('user-1')}".encode())])
+    assert middleware.client_id(valid) == "user:user-1"
+
+    forged = scope(headers=[(b"authorization", b"Bearer not-a-token")])
+    assert middleware.client_id(forged) == "ip:10.0.0.9"
+
+
+def test_client_id_trusts_only_the_configured_proxy_hops(verifier):
+    middleware = RateLimitMiddleware(None, MemoryRateLimitBackend())
+    request = scope(headers=[(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7, 10.0.0.2")])
+
+    middleware.trusted_proxies = 0
+    assert middleware.client_id(request) == "ip:10.0.0.9"
+    middleware.trusted_proxies = 2
+    assert middleware.client_id(request) == "ip:203.0.113.7"
+    middleware.trusted_proxies = 5
+    assert middleware.client_id(request) == "ip:10.0.0.9"
+
+
+def test_middleware_answers_429_with_retry_after(clock, verifier):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = RateLimitMiddleware(app, MemoryRateLimitBackend())
+    middleware.route_classes = [("/api/v1/voice", "voice", 1)]
+
+    async def call(path):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope(path), None, send)
+        return sent[0]
+
+    assert asyncio.run(call("/api/v1/voice/synthesize"))["status"] == 200
+    rejected = asyncio.run(call("/api/v1/voice/synthesize"))
+    assert rejected["status"] == 429
+    assert dict(rejected["headers"])[b"retry-after"] == b"60"
+    # Other route classes have their own budget
+    assert asyncio.run(call("/api/v1/schemes"))["status"] == 200
@@ -0,0 +1,127 @@
+import json
+import math
+import os
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.catalogue_validation import CATEGORICAL_FIELDS, FLAG_FIELDS, RULE_PROFILE_FIELDS
+from app.services.matching_engine import EligibilityMatcher
+from app.services.reach_estimator import NUMERIC_FIELDS, ProfileSnapshot
+
+STATES = ["Bihar", "Assam", "Kerala"]
+OCCUPATIONS = ["farmer", "student", "labourer"]
+
+
+def random_profile(rng):
+    def maybe(value):
+        return None if rng.random() < 0.1 else value
+
+    return SimpleNamespace(
+        age=maybe(rng.randint(0, 90)),
+        annual_income=maybe(Decimal(rng.choice([0, 50000, 100000, 250000, 99999])) + Decimal("0.00")),
+        gender=maybe(rng.choice(["male", "female"])),
+        state=maybe(rng.choice(STATES)),
+        district=maybe(rng.choice(["Patna", "Gaya"])),
+        caste_category=maybe(rng.choice(["SC", "ST", "OBC", "General"])),
+        occupation=maybe(rng.choice(OCCUPATIONS)),
+        family_size=maybe(rng.randint(1, 8)),
+        is_bpl=maybe(rng.random() < 0.5),
+        has_disability=maybe(rng.random() < 0.2),
+        education_level=maybe(rng.choice(["primary", "graduate"])),
+        land_ownership=maybe(Decimal(rng.choice(["0.00", "1.50", "2.00", "5.25"]))),
+    )
+
+
+def write_snapshot(path, profiles):
+    """The files ReachEstimator._write produces for these profiles"""
+    os.makedirs(path)
+    dictionaries = {field: [] for field in CATEGORICAL_FIELDS}
+    for field, dtype in NUMERIC_FIELDS.items():
+        values = [math.nan if getattr(p, field) is None else float(getattr(p, field)) for p in profiles]
+        np.save(os.path.join(path, f"{field}.npy"), np.array(values, dtype=dtype))
+    for field in FLAG_FIELDS:
+        values = [-1 if getattr(p, field) is None else int(getattr(p, field)) for p in profiles]
+        np.save(os.path.join(path, f"{field}.npy"), np.array(values, dtype=np.int8))
+    for field in CATEGORICAL_FIELDS:
+        lookup = {}
+        values = [-1 if getattr(p, field) is None else lookup.setdefault(getattr(p, field), len(lookup)) for p in profiles]
+        dictionaries[field] = list(lookup)
+        np.save(os.path.join(path, f"{field}.npy"), np.array(values, dtype=np.int32))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"count": len(profiles), "built_at": "2026-01-01T00:00:00", "dictionaries": dictionaries}, f)
+
+
+def rule(rule_type, operator, value_min=None, value_max=None, value_list=None):
+    return SimpleNamespace(
+        rule_type=rule_type,
+        operator=operator,
+        value_min=None if value_min is None else Decimal(str(value_min)),
+        value_max=None if value_max is None else Decimal(str(value_max)),
+        value_list=value_list,
+        is_mandatory=True,
+    )
+
+
+RULES = [
+    rule("age", ">", 17),
+    rule("age", "<", 60),
+    rule("age", ">=", 18),
+    rule("age", "<=", 18),
+    rule("age", "=", 18),
+    rule("age", "BETWEEN", 18, 40),
+    rule("age", "IN", value_list=["18", "19.0", "25"]),
+    rule("age", ">"),
+    rule("age", "BETWEEN", 18),
+    rule("income", "<=", "99999.00"),
+    rule("income", "IN", value_list=["250000.00", "50000"]),
+    rule("family_size", "BETWEEN", 2, 4),
+    rule("land_ownership", "<", "2.00"),
+    rule("land_ownership", "IN", value_list=["1.50", "5.25"]),
+    rule("is_bpl", "=", 1),
+    rule("is_bpl", "IN", value_list=["True"]),
+    rule("has_disability", "IN", value_list=["False", "no"]),
+    rule("state", "IN", value_list=["Bihar", "Goa"]),
+    rule("occupation", "IN", value_list=["farmer", "labourer"]),
+    rule("occupation", "=", 1),
+    rule("caste", "IN", value_list=[]),
+    rule("unknown", ">", 1),
+]
+
+
+def evaluate(profile, eligibility_rule):
+    try:
+        return EligibilityMatcher(None).evaluate_rule(profile, eligibility_rule)
+    except TypeError:
+        # Ordering text or a missing bound raises in the matcher; the profile is not matched
+        return False
+
+
+@pytest.fixture(scope="module")
+def population(tmp_path_factory):
+    rng = random.Random(42)
+    profiles = [random_profile(rng) for _ in range(2000)]
+    path = str(tmp_path_factory.mktemp("reach") / "snapshot-1")
+    write_snapshot(path, profiles)
+    return profiles, ProfileSnapshot(path, sample_size=len(profiles))
+
+
+@pytest.mark.parametrize("eligibility_rule", RULES, ids=lambda r: f"{r.rule_type} {r.operator}")
+def test_rule_mask_agrees_with_the_matcher(population, eligibility_rule):
+    profiles, snapshot = population
+    mask = snapshot.rule_mask(snapshot.columns, eligibility_rule, snapshot.count)
+    expected = [evaluate(profile, eligibility_rule) for profile in profiles]
+    assert mask.tolist() == expected
+
+
+def test_eligible_applies_every_mandatory_rule(population):
+    profiles, snapshot = population
+    rules = [rule("age", ">=", 18), rule("state", "IN", value_list=["Bihar"]), rule("income", "<=", 100000)]
+    optional = rule("occupation", "IN", value_list=["student"])
+    optional.is_mandatory = False
+    selected = snapshot.eligible(snapshot.columns, rules + [optional], snapshot.count)
+    expected = [i for i, p in enumerate(profiles) if all(evaluate(p, r) for r in rules)]
+    assert selected.tolist() == expected
@@ -0,0 +1,88 @@
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.db import models
+from app.services.recommendation_store import RecommendationStore
+
+
+def user(db):
+    user = models.User(cognito_id=f"test-{uuid.uuid4()}", phone_number=f"+91{uuid.uuid4().int % 10**10:010d}")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def schemes(db, count):
+    added = [models.Scheme(scheme_code=f"TEST-{uuid.uuid4()}", name="Test scheme") for _ in range(count)]
+    db.add_all(added)
+    db.flush()
+    return added
+
+
+def ranked(*pairs):
+    return [{"scheme": scheme, "score": score} for scheme, score in pairs]
+
+
+def stored(db, user_id):
+    table = models.Recommendation.__table__
+    rows = db.execute(select(table).where(table.c.user_id == user_id)).all()
+    return {row.scheme_id: row for row in rows}
+
+
+def test_first_sync_inserts_every_scheme(db):
+    owner = user(db)
+    a, b = schemes(db, 2)
+
+    counts = RecommendationStore(db).sync(owner.id, ranked((a, 81.234), (b, 40)))
+    assert counts == {"inserted": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+    rows = stored(db, owner.id)
+    assert {scheme_id: row.match_score for scheme_id, row in rows.items()} == {
+        a.id: Decimal("81.23"), b.id: Decimal("40.00"),
+    }
+
+
+def test_resync_writes_only_the_difference_and_keeps_surviving_rows(db):
+    owner = user(db)
+    kept, rescored, dropped, added = schemes(db, 4)
+    store = RecommendationStore(db)
+    store.sync(owner.id, ranked((kept, 70), (rescored, 60), (dropped, 50)))
+    before = stored(db, owner.id)
+    db.execute(update(models.Recommendation).where(
+        models.Recommendation.id == before[kept.id].id
+    ).values(viewed_at=before[kept.id].created_at))
+
+    # 70.004 rounds to the stored 70.00, so it is not a change
+    counts = store.sync(owner.id, ranked((kept, 70.004), (rescored, 65.5), (added, 30)))
+    assert counts == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+
+    after = stored(db, owner.id)
+    assert set(after) == {kept.id, rescored.id, added.id}
+    assert after[kept.id].id == before[kept.id].id
+    assert after[kept.id].viewed_at is not None
+    assert after[rescored.id].id == before[rescored.id].id
+    assert after[rescored.id].match_score == Decimal("65.50")
+
+
+def test_an_unchanged_ranking_writes_nothing(db):
+    owner = user(db)
+    a, b = schemes(db, 2)
+    store = RecommendationStore(db)
+    store.sync(owner.id, ranked((a, 10), (b, 20)))
+
+    assert store.sync(owner.id, ranked((b, 20), (a, 10))) == {
+        "inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2,
+    }
+
+
+def test_an_empty_ranking_removes_only_that_users_rows(db):
+    owner, other = user(db), user(db)
+    (scheme,) = schemes(db, 1)
+    store = RecommendationStore(db)
+    store.sync(owner.id, ranked((scheme, 10)))
+    store.sync(other.id, ranked((scheme, 10)))
+
+    assert store.sync(owner.id, []) == {"inserted": 0, "updated": 0, "deleted": 1, "unchanged": 0}
+    assert stored(db, owner.id) == {}
+    assert set(stored(db, other.id)) == {scheme.id}
@@ -0,0 +1,112 @@
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.db import models
+from app.services.scheme_lifecycle import ACTIVATE, EXPIRE, SchemeLifecycle, recency_feature
+
+TODAY = date(2026, 3, 10)
+
+
+class Shared:
+    """The test session, kept open when the lifecycle closes it"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def lifecycle(db):
+    lifecycle = SchemeLifecycle("Asia/Kolkata", session_factory=lambda: Shared(db))
+    lifecycle.now = lifecycle._midnight(TODAY) + timedelta(hours=9)
+    lifecycle._now = lambda: lifecycle.now
+    return lifecycle
+
+
+def scheme(db, start_date=None, end_date=None, is_active=True):
+    added = models.Scheme(
+        scheme_code=f"TEST-{uuid.uuid4()}", name="Test scheme",
+        start_date=start_date, end_date=end_date, is_active=is_active,
+    )
+    db.add(added)
+    db.commit()
+    return added.id
+
+
+def active(db, scheme_id):
+    return db.execute(select(models.Scheme.is_active).where(models.Scheme.id == scheme_id)).scalar_one()
+
+
+def held(db, scheme_id):
+    return db.get(models.ScheduledActivation, scheme_id) is not None
+
+
+def test_recency_feature_takes_the_stronger_of_newness_and_closing():
+    assert recency_feature(TODAY, None, TODAY, 90, 30) == 1.0
+    assert recency_feature(TODAY - timedelta(days=45), None, TODAY, 90, 30) == pytest.approx(0.5)
+    assert recency_feature(TODAY - timedelta(days=200), TODAY + timedelta(days=3), TODAY, 90, 30) == pytest.approx(0.9)
+    # Not yet open, already ended, or undated: no signal
+    assert recency_feature(TODAY + timedelta(days=1), None, TODAY, 90, 30) == 0.0
+    assert recency_feature(None, TODAY - timedelta(days=1), TODAY, 90, 30) == 0.0
+    assert recency_feature(None, None, TODAY, 90, 30) == 0.0
+
+
+def test_sync_expires_ended_and_holds_upcoming_schemes(db, lifecycle):
+    ended = scheme(db, end_date=TODAY - timedelta(days=1))
+    last_day = scheme(db, end_date=TODAY)
+    upcoming = scheme(db, start_date=TODAY + timedelta(days=2))
+    lifecycle.sync()
+
+    assert not active(db, ended)
+    assert active(db, last_day)
+    assert not active(db, upcoming) and held(db, upcoming)
+    events = {scheme_id: (when, action) for when, action, scheme_id in lifecycle._events}
+    # Dates are whole local days: the last day runs to the following midnight
+    assert events[last_day] == (lifecycle._midnight(TODAY + timedelta(days=1)), EXPIRE)
+    assert events[upcoming] == (lifecycle._midnight(TODAY + timedelta(days=2)), ACTIVATE)
+    assert lifecycle.recency(last_day) == pytest.approx(1.0)
+    assert lifecycle.recency(upcoming) == 0.0
+
+
+def test_held_schemes_go_live_when_their_start_date_arrives(db, lifecycle):
+    upcoming = scheme(db, start_date=TODAY + timedelta(days=1))
+    switched_off = scheme(db, start_date=TODAY - timedelta(days=1), is_active=False)
+    lifecycle.sync()
+    assert not active(db, upcoming)
+
+    lifecycle.now = lifecycle._midnight(TODAY + timedelta(days=1))
+    lifecycle.sync()
+    assert active(db, upcoming) and not held(db, upcoming)
+    # Only schemes the lifecycle held are released
+    assert not active(db, switched_off)
+    assert lifecycle.recency(upcoming) == pytest.approx(1.0)
+
+
+def test_a_held_scheme_that_ended_meanwhile_stays_off(db, lifecycle):
+    brief = scheme(db, start_date=TODAY + timedelta(days=1), end_date=TODAY + timedelta(days=1))
+    lifecycle.sync()
+
+    lifecycle.now = lifecycle._midnight(TODAY + timedelta(days=3))
+    lifecycle.sync()
+    assert not active(db, brief) and not held(db, brief)
+
+
+def test_the_timer_wakes_for_the_next_event_or_midnight(db, lifecycle):
+    lifecycle.resync_interval = 10 ** 6
+    lifecycle.sync()
+    lifecycle._events = []
+    # Nothing scheduled: wake at local midnight to age the recency features
+    assert lifecycle._seconds_until_next() == 15 * 3600
+
+    lifecycle._events = [(lifecycle.now + timedelta(minutes=5), EXPIRE, uuid.uuid4())]
+    assert lifecycle._seconds_until_next() == 300
+    lifecycle.resync_interval = 60
+    assert lifecycle._seconds_until_next() == 60
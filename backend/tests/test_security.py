@@ -0,0 +1,153 @@
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from jose.utils import base64url_encode
+
+from app.core.security import InvalidTokenError, KeySet, TokenVerifier
+
+SECRET = "test-secret"
+
+
+def rsa_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "alg": "RS256"}
+    return pem, public_pem, public
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return rsa_key("key-1")
+
+
+class Source:
+    """A key source whose published keys the test can rotate"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.loads = 0
+
+    def __call__(self):
+        self.loads += 1
+        return [(key["kid"], key["alg"], key) for key in self.keys]
+
+
+def claims(**overrides):
+    return {"sub": "user-1", "exp": int(time.time()) + 600, **overrides}
+
+
+def verifier_for(source, **options):
+    key_set = KeySet(source)
+    key_set.load()
+    return TokenVerifier(key_set, **options)
+
+
+def test_valid_token_is_verified_and_memoised(signing_key):
+    pem, _, public = signing_key
+    source = Source([public])
+    verifier = verifier_for(source)
+    token = jwt.encode(claims(), pem, algorithm="RS256", headers={"kid": "key-1"})
+
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert token in verifier._verified
+    assert verifier.verify(token)["sub"] == "user-1"
+
+
+def test_memoised_token_expires(signing_key, monkeypatch):
+    pem, _, public = signing_key
+    verifier = verifier_for(Source([public]))
+    token = jwt.encode(claims(exp=int(time.time()) + 60), pem, algorithm="RS256", headers={"kid": "key-1"})
+    verifier.verify(token)
+
+    later = time.time() + 120
+    monkeypatch.setattr("app.core.security.time.time", lambda: later)
+    with pytest.raises(InvalidTokenError, match="expired"):
+        verifier.verify(token)
+
+
+def test_algorithm_is_pinned_to_the_key(signing_key):
+    _, public_pem, public = signing_key
+    verifier = verifier_for(Source([public]))
+    # The classic confusion attack: HMAC keyed with the public key, built by
+    # hand because jose refuses to sign that way
+    signing_input = b".".join(
+        base64url_encode(json.dumps(part).encode()) for part in ({"alg": "HS256", "kid": "key-1"}, claims())
+    )
+    signature = hmac.new(public_pem.encode(), signing_input, hashlib.sha256).digest()
+    forged = (signing_input + b"." + base64url_encode(signature)).decode()
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(forged)
+
+
+def test_tampered_and_malformed_tokens_are_rejected(signing_key):
+    pem, _, public = signing_key
+    verifier = verifier_for(Source([public]))
+    token = jwt.encode(claims(), pem, algorithm="RS256", headers={"kid": "key-1"})
+    header, payload, signature = token.split(".")
+    other = jwt.encode(claims(sub="admin"), pem, algorithm="RS256", headers={"kid": "key-1"}).split(".")[1]
+
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(".".join([header, other, signature]))
+    with pytest.raises(InvalidTokenError, match="Malformed"):
+        verifier.verify("not-a-token")
+
+
+def test_required_claims_issuer_and_client(signing_key):
+    pem, _, public = signing_key
+    verifier = verifier_for(Source([public]), issuer="https://issuer.example", client_id="app")
+
+    def sign(**values):
+        return jwt.encode({**claims(), **values}, pem, algorithm="RS256", headers={"kid": "key-1"})
+
+    assert verifier.verify(sign(iss="https://issuer.example", client_id="app"))["sub"] == "user-1"
+    assert verifier.verify(sign(iss="https://issuer.example", aud="app"))["sub"] == "user-1"
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(sign(iss="https://other.example", client_id="app"))
+    with pytest.raises(InvalidTokenError, match="another client"):
+        verifier.verify(sign(iss="https://issuer.example", client_id="other"))
+    no_subject = jwt.encode({"exp": int(time.time()) + 600, "iss": "https://issuer.example"}, pem,
+                            algorithm="RS256", headers={"kid": "key-1"})
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(no_subject)
+
+
+def test_unknown_kid_is_rejected_and_schedules_a_refresh(signing_key):
+    pem, _, public = signing_key
+    verifier = verifier_for(Source([public]))
+    token = jwt.encode(claims(), pem, algorithm="RS256", headers={"kid": "key-2"})
+
+    with pytest.raises(InvalidTokenError, match="Unknown signing key"):
+        verifier.verify(token)
+    assert verifier.key_set._refresh_now.is_set()
+
+
+def test_rotating_keys_drops_memoised_tokens(signing_key):
+    pem, _, public = signing_key
+    source = Source([public])
+    verifier = verifier_for(source)
+    token = jwt.encode(claims(), pem, algorithm="RS256", headers={"kid": "key-1"})
+    verifier.verify(token)
+
+    source.keys = [rsa_key("key-2")[2]]
+    verifier.key_set.load()
+    with pytest.raises(InvalidTokenError, match="Unknown signing key"):
+        verifier.verify(token)
+
+
+def test_nothing_verifies_before_the_first_load():
+    verifier = TokenVerifier(KeySet(Source([])))
+    token = jwt.encode(claims(), SECRET, algorithm="HS256")
+    with pytest.raises(InvalidTokenError, match="Unknown signing key"):
+        verifier.verify(token)
+    assert verifier.key_set.loaded_at == 0.0
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request cost of the rate limiter hot path
+"""
+
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.rate_limit import (
+    MemoryRateLimitBackend,
+    SharedRateLimitBackend,
+    LocalCounterClient,
+)
+
+def bench(name, backend, keys, iterations=1_000_000):
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        backend.hit(keys[i % len(keys)], 1_000_000)
+    elapsed = time.perf_counter_ns() - start
+    print(f"{name:<32} {elapsed / iterations:8.0f} ns/request")
+
+def main():
+    keys = [f"default:10.0.{i // 256}.{i % 256}" for i in range(10000)]
+    bench("memory, 1 key", MemoryRateLimitBackend(), keys[:1])
+    bench("memory, 10k keys", MemoryRateLimitBackend(), keys)
+    bench("memory, 10k keys, 1k max", MemoryRateLimitBackend(max_keys=1000), keys)
+    bench("shared (local client), 10k keys", SharedRateLimitBackend(LocalCounterClient()), keys, 200_000)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Compare write amplification of delete-and-reinsert against diff-based upsert
+when re-scoring recommendations for many users.
+
+Runs against DATABASE_URL (PostgreSQL) and removes its BENCH- data afterwards.
+"""
+
+import sys
+import os
+import random
+import time
+import uuid
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import delete, insert, text
+
+from app.db.database import SessionLocal, engine
+from app.db import models
+from app.services.recommendation_store import RecommendationStore
+
+USERS = 500
+SCHEMES = 200
+PER_USER = 10
+
+class Ranked:
+    """Minimal stand-in for a ranked scheme entry"""
+    def __init__(self, scheme_id):
+        self.id = scheme_id
+
+def seed(db):
+    schemes = [
+        {"id": uuid.uuid4(), "scheme_code": f"BENCH-{i}", "name": f"Bench scheme {i}", "is_active": True}
+        for i in range(SCHEMES)
+    ]
+    users = [
+        {"id": uuid.uuid4(), "cognito_id": f"bench-{uuid.uuid4()}", "phone_number": f"B{i:011d}"}
+        for i in range(USERS)
+    ]
+    db.execute(insert(models.Scheme.__table__), schemes)
+    db.execute(insert(models.User.__table__), users)
+    db.commit()
+    return [s["id"] for s in schemes], [u["id"] for u in users]
+
+def initial_rankings(scheme_ids, user_ids):
+    return {
+        user_id: {scheme_id: round(random.uniform(20, 100), 2) for scheme_id in random.sample(scheme_ids, PER_USER)}
+        for user_id in user_ids
+    }
+
+def rescore(rankings, scheme_ids):
+    """Typical bulk re-score: most scores stay, some move, a few schemes swap"""
+    result = {}
+    for user_id, scores in rankings.items():
+        new = {}
+        for scheme_id, score in scores.items():
+            roll = random.random()
+            if roll < 0.05:
+                candidates = [s for s in scheme_ids if s not in scores and s not in new]
+                new[random.choice(candidates)] = round(random.uniform(20, 100), 2)
+            elif roll < 0.20:
+                new[scheme_id] = round(min(score + random.uniform(-5, 5), 100), 2)
+            else:
+                new[scheme_id] = score
+        result[user_id] = new
+    return result
+
+def as_ranked(scores):
+    return [{"scheme": Ranked(scheme_id), "score": score} for scheme_id, score in scores.items()]
+
+def delete_and_reinsert(db, user_id, scores):
+    table = models.Recommendation.__table__
+    db.execute(delete(table).where(table.c.user_id == user_id))
+    db.execute(insert(table), [
+        {"user_id": user_id, "scheme_id": scheme_id, "match_score": score}
+        for scheme_id, score in scores.items()
+    ])
+    db.commit()
+
+def measure(name, fn, rankings):
+    with engine.connect() as conn:
+        wal_start = conn.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+    db = SessionLocal()
+    started = time.perf_counter()
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    for user_id, scores in rankings.items():
+        result = fn(db, user_id, scores)
+        if result:
+            for key, value in result.items():
+                counts[key] += value
+    elapsed = time.perf_counter() - started
+    db.close()
+    with engine.connect() as conn:
+        wal_bytes = conn.execute(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :start)"), {"start": wal_start}
+        ).scalar()
+    print(f"{name:<22} {elapsed:6.2f}s  {int(wal_bytes) / 1024:9.0f} KiB WAL  rows {counts}")
+
+def main():
+    random.seed(42)
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    scheme_ids, user_ids = seed(db)
+    try:
+        base = initial_rankings(scheme_ids, user_ids)
+        updated = rescore(base, scheme_ids)
+        changed = sum(1 for u in user_ids for s, v in updated[u].items() if base[u].get(s) != v)
+        print(f"{USERS} users x {PER_USER} recommendations, {changed} changed rows after re-score\n")
+
+        for user_id, scores in base.items():
+            delete_and_reinsert(db, user_id, scores)
+
+        def reinsert(db, user_id, scores):
+            delete_and_reinsert(db, user_id, scores)
+            return {"inserted": len(scores), "deleted": len(base[user_id])}
+
+        measure("delete + reinsert", reinsert, updated)
+
+        for user_id, scores in base.items():
+            delete_and_reinsert(db, user_id, scores)
+
+        measure(
+            "diff upsert",
+            lambda db, user_id, scores: RecommendationStore(db).sync(user_id, as_ranked(scores)),
+            updated,
+        )
+    finally:
+        db.rollback()
+        db.execute(delete(models.User.__table__).where(models.User.id.in_(user_ids)))
+        db.execute(delete(models.Scheme.__table__).where(models.Scheme.id.in_(scheme_ids)))
+        db.commit()
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Compare the default Pydantic/JSON response path with the orjson row path
+for /schemes and /recommendations payloads
+"""
+
+import sys
+import os
+import json
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.engine.result import result_tuple
+
+from app.core.serialization import dumps, rows_to_dicts
+from app.db import models
+from app.schemas.scheme import SchemeListResponse, SchemeResponse
+from app.api.v1.recommendations import RecommendationResponse
+
+PAGE_SIZE = 100
+
+def make_scheme(i):
+    return models.Scheme(
+        id=uuid.uuid4(),
+        scheme_code=f"SCHEME-{i}",
+        name=f"प्रधानमंत्री योजना {i} - Pradhan Mantri Yojana {i}",
+        description="छोटे और सीमांत किसानों को प्रति वर्ष वित्तीय सहायता. " * 4,
+        department="Ministry of Agriculture",
+        category="Agriculture",
+        benefit_type="Direct Cash Transfer",
+        benefit_amount=Decimal("6000.00") + i,
+        state="Maharashtra",
+        is_central=i % 2 == 0,
+        application_url="https://pmkisan.gov.in",
+        start_date=date(2019, 2, 1),
+        end_date=None,
+        is_active=True,
+    )
+
+def make_rows(schemes):
+    # Row objects shaped like the result of a column query
+    fields = list(SchemeResponse.model_fields)
+    make_row = result_tuple(fields)
+    return [make_row([getattr(s, f) for f in fields]) for s in schemes]
+
+def make_recommendations(schemes):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "scheme": {
+                "id": s.id,
+                "name": s.name,
+                "description": s.description,
+                "benefit_amount": s.benefit_amount,
+                "category": s.category,
+            },
+            "match_score": 87.5,
+            "explanation": "आप इस योजना के लिए पात्र हैं क्योंकि आप किसान हैं. " * 2,
+            "document_checklist": {"required": ["Aadhaar", "Land records", "Bank passbook"]},
+            "viewed_at": None,
+        }
+        for s in schemes
+    ]
+
+def bench(name, fn, iterations=500):
+    fn()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(iterations):
+        body = fn()
+    wall = (time.perf_counter() - wall) / iterations * 1000
+    cpu = (time.process_time() - cpu) / iterations * 1000
+    print(f"{name:<44} {wall:7.3f} ms wall {cpu:7.3f} ms cpu {len(body):8d} bytes")
+    return wall
+
+def main():
+    schemes = [make_scheme(i) for i in range(PAGE_SIZE)]
+    rows = make_rows(schemes)
+    page = {"total": 5000, "skip": 0, "limit": PAGE_SIZE}
+
+    print(f"/schemes ({PAGE_SIZE} items)")
+    baseline = bench(
+        "pydantic validate + jsonable_encoder + json",
+        lambda: json.dumps(jsonable_encoder(
+            SchemeListResponse.model_validate({**page, "schemes": schemes})
+        )).encode(),
+    )
+    bench(
+        "pydantic validate + model_dump_json",
+        lambda: SchemeListResponse.model_validate({**page, "schemes": schemes}).model_dump_json().encode(),
+    )
+    fast = bench("column rows + orjson", lambda: dumps({**page, "schemes": rows_to_dicts(rows)}))
+    print(f"speedup vs default: {baseline / fast:.1f}x\n")
+
+    recommendations = make_recommendations(schemes)
+    print(f"/recommendations ({PAGE_SIZE} items)")
+    baseline = bench(
+        "pydantic validate + jsonable_encoder + json",
+        lambda: json.dumps(jsonable_encoder(
+            [RecommendationResponse.model_validate(r) for r in recommendations]
+        )).encode(),
+    )
+    fast = bench("orjson", lambda: dumps(recommendations))
+    print(f"speedup vs default: {baseline / fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
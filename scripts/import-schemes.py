@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Bulk import schemes and eligibility rules from CSV, JSON or JSONL files
+
+Usage: import-schemes.py [--schemes FILE] [--rules FILE] [--dry-run] [--atomic]
+"""
+
+import argparse
+import json
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.db.database import SessionLocal
+from app.services.catalogue_import import ImportFormatError, import_catalogue
+
+def read(path):
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        return f.read(), os.path.basename(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schemes", help="scheme records, upserted by scheme_code")
+    parser.add_argument("--rules", help="rule records with a scheme_code column; replace those schemes' rules")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--atomic", action="store_true", help="load nothing if any row is invalid")
+    args = parser.parse_args()
+    if not args.schemes and not args.rules:
+        parser.error("pass --schemes, --rules or both")
+
+    db = SessionLocal()
+    try:
+        report = import_catalogue(db, read(args.schemes), read(args.rules), dry_run=args.dry_run, atomic=args.atomic)
+    except ImportFormatError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"{error['file']} row {error['row']} {error['field'] or ''}: {error['error']}")
+    print(json.dumps({key: value for key, value in report.items() if key != "errors"}, indent=2))
+    if report["error_count"]:
+        print(f"\n⚠️  {report['error_count']} rows rejected")
+    if report["loaded"]:
+        print(f"✅ Imported at catalogue version {report['catalogue_version']}")
+    sys.exit(1 if report["error_count"] else 0)
+
+if __name__ == "__main__":
+    main()
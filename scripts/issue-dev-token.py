@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Issue an access token signed with JWT_SECRET_KEY for local development.
+
+Only accepted when the API runs with AUTH_KEY_SOURCE=secret (the default).
+The user is created on first use from the phone number claim. With
+--admin-email the subject is also registered in admin_users, which the
+/admin routes require.
+
+Example:
+    TOKEN=$(python scripts/issue-dev-token.py --phone +919800000001)
+    curl -H "Authorization: Bearer $TOKEN" localhost:8000/api/v1/profile/
+
+    ADMIN_TOKEN=$(python scripts/issue-dev-token.py --phone +919800000002 --admin-email ops@example.com)
+"""
+
+import sys
+import os
+import argparse
+import time
+import uuid
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from jose import jwt
+
+from app.core.config import settings
+
+def register_admin(sub, email, role):
+    from sqlalchemy.dialects.postgresql import insert
+
+    from app.db.database import SessionLocal
+    from app.db import models
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            insert(models.AdminUser)
+            .values(id=uuid.uuid4(), cognito_id=sub, email=email, role=role, is_active=True)
+            .on_conflict_do_update(index_elements=["cognito_id"], set_={"email": email, "role": role, "is_active": True})
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sub", help="subject (Cognito user id); random if omitted")
+    parser.add_argument("--phone", required=True, help="phone number claim")
+    parser.add_argument("--minutes", type=int, default=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    parser.add_argument("--admin-email", help="register the subject as an admin with this email")
+    parser.add_argument("--role", default=settings.ADMIN_ROLES[0], help="admin role to grant")
+    args = parser.parse_args()
+
+    sub = args.sub or str(uuid.uuid4())
+    if args.admin_email:
+        register_admin(sub, args.admin_email, args.role)
+
+    now = int(time.time())
+    claims = {
+        "sub": sub,
+        "phone_number": args.phone,
+        "iat": now,
+        "exp": now + args.minutes * 60,
+    }
+    if settings.AUTH_ISSUER:
+        claims["iss"] = settings.AUTH_ISSUER
+    print(jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM))
+
+if __name__ == "__main__":
+    main()
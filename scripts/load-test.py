@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Open-loop load test for the API with per-route SLO reporting.
+
+Boots the app against DATABASE_URL (optionally seeding it first), or targets
+an already running server with --base-url, then fires requests at a fixed
+Poisson arrival rate regardless of how fast responses come back. Latency is
+measured from each request's scheduled start, so a slow server cannot hide
+queueing delay (no coordinated omission). Results are written as JSON.
+
+Any 4xx or 5xx response counts against the error-rate SLO, and latency
+percentiles cover successful responses only, so a throttled or rejected
+run cannot pass on fast error responses. Authenticated routes
+(recommendations, profile_write) need --token.
+
+Examples:
+    python scripts/load-test.py --boot --seed --rate 200 --duration 60 \\
+        --token $(python scripts/issue-dev-token.py --phone +919800000001)
+    python scripts/load-test.py --base-url http://localhost:8000 \\
+        --mix schemes=50,search=50 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+SEED_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed-data.py')
+
+# Design doc alarm: API latency above 1s
+DEFAULT_SLO_P95_MS = 1000.0
+DEFAULT_SLO_ERROR_RATE = 0.01
+
+DEFAULT_MIX = "schemes=35,scheme_detail=15,search=20,recommendations=20,profile_write=10"
+
+SEARCH_TERMS = ["kisan", "awas", "yojana", "pension", "rural", "farmer", "housing", "employment"]
+STATES = ["Maharashtra", "Tamil Nadu", "Uttar Pradesh", "Bihar", "Karnataka"]
+
+class Route:
+    """One request type in the traffic mix"""
+    def __init__(self, name, build, authenticated=False):
+        self.name = name
+        self.build = build
+        self.authenticated = authenticated
+
+def random_profile() -> dict:
+    return {
+        "full_name": "Load Test",
+        "age": random.randint(18, 80),
+        "gender": random.choice(["male", "female"]),
+        "annual_income": random.randint(20000, 500000),
+        "state": random.choice(STATES),
+        "district": "Pune",
+        "occupation": "farmer",
+        "family_size": random.randint(1, 8),
+        "is_bpl": random.random() < 0.4,
+    }
+
+def build_routes(scheme_ids: List[str]) -> Dict[str, Route]:
+    def schemes():
+        params = {"skip": random.randint(0, 3) * 10, "limit": random.choice([10, 20, 50])}
+        if random.random() < 0.3:
+            params["state"] = random.choice(STATES)
+        return "GET", "/api/v1/schemes/", {"params": params}
+
+    def scheme_detail():
+        return "GET", f"/api/v1/schemes/{random.choice(scheme_ids)}", {}
+
+    def search():
+        return "GET", "/api/v1/schemes/search/", {"params": {"q": random.choice(SEARCH_TERMS)}}
+
+    def recommendations():
+        return "GET", "/api/v1/recommendations/", {}
+
+    def profile_write():
+        # POST creates or updates, so a fresh token's first write succeeds
+        return "POST", "/api/v1/profile/", {"json": random_profile()}
+
+    routes = {
+        "schemes": Route("schemes", schemes),
+        "search": Route("search", search),
+        "recommendations": Route("recommendations", recommendations, authenticated=True),
+        "profile_write": Route("profile_write", profile_write, authenticated=True),
+    }
+    if scheme_ids:
+        routes["scheme_detail"] = Route("scheme_detail", scheme_detail)
+    return routes
+
+def parse_mix(spec: str, routes: Dict[str, Route]) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in routes:
+            print(f"Skipping unknown or unavailable route in mix: {name}", file=sys.stderr)
+            continue
+        mix[name] = float(weight or 1)
+    if not mix:
+        sys.exit("Traffic mix is empty")
+    return mix
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def boot_server(port: int, workers: int, show_logs: bool) -> subprocess.Popen:
+    env = dict(os.environ)
+    # All load comes from one client address; keep per-IP limits out of the numbers
+    env.setdefault("RATE_LIMIT_PER_MINUTE", "1000000")
+    env.setdefault("RATE_LIMIT_VOICE_PER_MINUTE", "1000000")
+    env.setdefault("RATE_LIMIT_RECOMMENDATIONS_PER_MINUTE", "1000000")
+    output = None if show_logs else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=output, stderr=output,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit("Server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    sys.exit("Server did not become healthy within 30s")
+
+async def run_load(base_url, routes, mix, rate, duration, timeout, headers):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {
+        name: {"requests": 0, "latencies": [], "errors": 0, "client_errors": 0, "statuses": {}}
+        for name in names
+    }
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=1000)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, headers=headers) as client:
+        async def fire(route: Route, scheduled: float):
+            method, path, kwargs = route.build()
+            result = results[route.name]
+            failed = True
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+                if response.status_code >= 500:
+                    result["errors"] += 1
+                elif response.status_code >= 400:
+                    # 429s and 401s are failures too, or a throttled run would pass
+                    result["client_errors"] += 1
+                else:
+                    failed = False
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+                result["errors"] += 1
+            if not failed:
+                result["latencies"].append((time.perf_counter() - scheduled) * 1000)
+            result["requests"] += 1
+            result["statuses"][status] = result["statuses"].get(status, 0) + 1
+
+        tasks = []
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            route = routes[random.choices(names, weights)[0]]
+            tasks.append(asyncio.create_task(fire(route, next_at)))
+            next_at += random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+def summarize(results, elapsed, slo_p95_ms, slo_error_rate):
+    routes = {}
+    all_latencies = []
+    total = 0
+    total_failures = 0
+    for name, result in results.items():
+        latencies = sorted(result["latencies"])
+        all_latencies.extend(latencies)
+        count = result["requests"]
+        failures = result["errors"] + result["client_errors"]
+        error_rate = failures / count if count else 0.0
+        p95 = percentile(latencies, 95)
+        total += count
+        total_failures += failures
+        routes[name] = {
+            "requests": count,
+            "throughput_rps": count / elapsed,
+            "errors": result["errors"],
+            "client_errors": result["client_errors"],
+            "error_rate": error_rate,
+            "statuses": result["statuses"],
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": p95,
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "slo": {
+                "p95_ms": slo_p95_ms,
+                "error_rate": slo_error_rate,
+                "passed": bool(latencies) and p95 <= slo_p95_ms and error_rate <= slo_error_rate,
+            },
+        }
+
+    all_latencies.sort()
+    return {
+        "requests": total,
+        "duration_s": elapsed,
+        "throughput_rps": total / elapsed,
+        "error_rate": total_failures / total if total else 0.0,
+        "latency_ms": {
+            "p50": percentile(all_latencies, 50),
+            "p95": percentile(all_latencies, 95),
+            "p99": percentile(all_latencies, 99),
+        },
+        "slo_passed": all(route["slo"]["passed"] for route in routes.values()),
+        "routes": routes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--boot", action="store_true", help="start the app locally with uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when booting")
+    parser.add_argument("--server-logs", action="store_true", help="show the booted server's output")
+    parser.add_argument("--seed", action="store_true", help="run scripts/seed-data.py before starting")
+    parser.add_argument("--rate", type=float, default=50.0, help="arrival rate in requests/second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight pairs, comma separated")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--token", help="bearer token for authenticated routes")
+    parser.add_argument("--slo-p95-ms", type=float, default=DEFAULT_SLO_P95_MS)
+    parser.add_argument("--slo-error-rate", type=float, default=DEFAULT_SLO_ERROR_RATE)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.seed:
+        subprocess.run([sys.executable, SEED_SCRIPT], check=True, stdout=sys.stderr)
+
+    server = None
+    base_url = args.base_url
+    if args.boot:
+        port = free_port()
+        server = boot_server(port, args.workers, args.server_logs)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        page = httpx.get(f"{base_url}/api/v1/schemes/", params={"limit": 100}, timeout=args.timeout)
+        scheme_ids = [s["id"] for s in page.json().get("schemes", [])] if page.status_code == 200 else []
+        routes = build_routes(scheme_ids)
+        mix = parse_mix(args.mix, routes)
+        authenticated = [name for name in mix if routes[name].authenticated]
+        if authenticated and not args.token:
+            sys.exit(f"--token is required for authenticated routes in the mix: {', '.join(authenticated)}")
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        if authenticated:
+            # Recommendations need a profile; create one before measuring
+            setup = httpx.post(f"{base_url}/api/v1/profile/", json=random_profile(), headers=headers, timeout=args.timeout)
+            if setup.status_code != 200:
+                sys.exit(f"Could not create a profile for the token: {setup.status_code} {setup.text}")
+
+        results, elapsed = asyncio.run(
+            run_load(base_url, routes, mix, args.rate, args.duration, args.timeout, headers)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "config": {
+            "base_url": base_url,
+            "rate_rps": args.rate,
+            "duration_s": args.duration,
+            "mix": mix,
+            "workers": args.workers if args.boot else None,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        **summarize(results, elapsed, args.slo_p95_ms, args.slo_error_rate),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(0 if report["slo_passed"] else 1)
+
+if __name__ == "__main__":
+    main()